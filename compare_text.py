@@ -1,237 +1,417 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
-"""
-@file compare_text.py
-@brief Main script for comparing two files with various comparison methods
-@author Xiaotong Wang
-@date 2025
-"""
-
-import sys
-import os
-import argparse
-import logging
-from pathlib import Path
-from file_comparator.factory import ComparatorFactory
-from file_comparator.result import ComparisonResult
-
-def configure_logging():
-    """
-    @brief Configure logging settings for the application
-    @details Sets up a logger with console handler and formatter
-    @return logging.Logger: Configured logger instance
-    """
-    logger = logging.getLogger("file_comparator")
-    logger.setLevel(logging.INFO)
-    
-    # Create console handler
-    ch = logging.StreamHandler()
-    ch.setLevel(logging.INFO)
-    
-    # Create formatter
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    
-    # Add formatter to ch
-    ch.setFormatter(formatter)
-    
-    # Add ch to logger
-    logger.addHandler(ch)
-    
-    return logger
-
-def parse_arguments():
-    """
-    @brief Parse command line arguments
-    @details Sets up argument parser with all necessary options for file comparison
-    @return argparse.Namespace: Parsed command line arguments
-    """
-    parser = argparse.ArgumentParser(description="Compare two files.")
-    parser.add_argument("file1", help="Path to the first file")
-    parser.add_argument("file2", help="Path to the second file")
-    parser.add_argument("--start-line", type=int, default=1, help="Starting line number (1-based)")
-    parser.add_argument("--end-line", type=int, help="Ending line number (1-based)")
-    parser.add_argument("--start-column", type=int, default=1, help="Starting column number (1-based)")
-    parser.add_argument("--end-column", type=int, help="Ending column number (1-based)")
-    parser.add_argument("--file-type", help="Type of the files to compare", default="auto")
-    parser.add_argument("--encoding", default="utf-8", help="File encoding for text files")
-    parser.add_argument("--chunk-size", type=int, default=8192, help="Chunk size for binary comparison")
-    parser.add_argument("--output-format", choices=["text", "json", "html"], default="text",
-                        help="Output format for the comparison result")
-    parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose output")
-    parser.add_argument("--debug", action="store_true", help="Enable debug mode with detailed logging")
-    parser.add_argument("--similarity", action="store_true",
-                        help="When comparing binary files, compute and show similarity index")
-    parser.add_argument("--num-threads", type=int, default=4, help="Number of threads for parallel processing")
-    
-    # Add JSON-specific comparison options
-    json_group = parser.add_argument_group('JSON comparison options')
-    json_group.add_argument("--json-compare-mode", choices=["exact", "key-based"], default="exact",
-                      help="JSON comparison mode: exact (default) or key-based")
-    json_group.add_argument("--json-key-field", help="Key field(s) to use for key-based JSON comparison (comma-separated for compound keys)")
-    
-    # Add H5-specific comparison options
-    h5_group = parser.add_argument_group('HDF5 comparison options')
-    h5_group.add_argument("--h5-table", help="Comma-separated list of table names to compare in HDF5 files")
-    h5_group.add_argument("--h5-table-regex", help="Regular expression pattern to match table names in HDF5 files")
-    h5_group.add_argument("--h5-structure-only", action="store_true", 
-                         help="Only compare HDF5 file structure without comparing content")
-    h5_group.add_argument("--h5-show-content-diff", action="store_true",
-                         help="Show detailed content differences when content differs")
-    h5_group.add_argument("--h5-rtol", type=float, default=1e-5,
-                         help="Relative tolerance for numerical comparison in HDF5 files")
-    h5_group.add_argument("--h5-atol", type=float, default=1e-8,
-                         help="Absolute tolerance for numerical comparison in HDF5 files")
-    
-    return parser.parse_args()
-
-def main():
-    """
-    @brief Main entry point of the application
-    @details Handles the main workflow of file comparison including:
-             - Setting up logging
-             - Parsing arguments
-             - Creating appropriate comparator
-             - Performing comparison
-             - Outputting results
-    """
-    logger = configure_logging()
-
-    try:
-        args = parse_arguments()
-        
-        # Set debug level if requested
-        if args.debug:
-            logger.setLevel(logging.DEBUG)
-            logger.debug("Debug mode enabled")
-
-        # Adjust for 0-based indexing
-        start_line = max(0, args.start_line - 1)
-        end_line = None if args.end_line is None else max(0, args.end_line - 1)
-        start_column = max(0, args.start_column - 1)
-        end_column = None if args.end_column is None else max(0, args.end_column - 1)
-
-        # Resolve file paths
-        file1_path = Path(args.file1).resolve()
-        file2_path = Path(args.file2).resolve()
-
-        # Check if files exist
-        if not file1_path.exists():
-            raise ValueError(f"File not found: {file1_path}")
-        if not file2_path.exists():
-            raise ValueError(f"File not found: {file2_path}")
-
-        # Determine file type
-        file_type = args.file_type
-        if file_type == "auto":
-            # Auto-detect file type based on extension
-            file_type = detect_file_type(file1_path)
-            logger.info(f"Auto-detected file type: {file_type}")
-
-        # Prepare comparator kwargs based on file type and arguments
-        comparator_kwargs = {
-            "encoding": args.encoding,
-            "chunk_size": args.chunk_size,
-            "verbose": args.verbose or args.debug,  # Enable verbose mode if debug is enabled
-            "num_threads": args.num_threads
-        }
-        
-        # Add file type specific arguments
-        if file_type == "json" and args.json_compare_mode:
-            comparator_kwargs["compare_mode"] = args.json_compare_mode
-            if args.json_key_field:
-                key_fields = [field.strip() for field in args.json_key_field.split(',')]
-                comparator_kwargs["key_field"] = key_fields[0] if len(key_fields) == 1 else key_fields
-                logger.info(f"Using key field(s): {comparator_kwargs['key_field']} for JSON comparison")
-        
-        if file_type == "h5":
-            if args.h5_table:
-                tables = [table.strip() for table in args.h5_table.split(',')]
-                comparator_kwargs["tables"] = tables
-                logger.info(f"Comparing HDF5 tables: {tables}")
-            if args.h5_table_regex:
-                comparator_kwargs["table_regex"] = args.h5_table_regex
-                logger.info(f"Using table regex pattern: {args.h5_table_regex}")
-            comparator_kwargs["structure_only"] = args.h5_structure_only
-            comparator_kwargs["show_content_diff"] = args.h5_show_content_diff
-            comparator_kwargs["rtol"] = args.h5_rtol
-            comparator_kwargs["atol"] = args.h5_atol
-            if args.h5_structure_only:
-                logger.info("Only comparing HDF5 file structure")
-            logger.info(f"Using numerical comparison tolerances: rtol={args.h5_rtol}, atol={args.h5_atol}")
-            comparator_kwargs["debug"] = args.debug
-        
-        if file_type == "binary":
-            comparator_kwargs["similarity"] = args.similarity
-
-        # Create comparator instance
-        comparator = ComparatorFactory.create_comparator(
-            file_type,
-            **comparator_kwargs
-        )
-
-        # Perform the comparison
-        result = comparator.compare_files(
-            file1_path,
-            file2_path,
-            start_line,
-            end_line,
-            start_column,
-            end_column
-        )
-
-        # Format and output the result
-        output = format_result(result, args.output_format)
-        print(output)
-
-        # Exit with appropriate status code
-        sys.exit(0 if result.identical else 1)
-
-    except ValueError as ve:
-        logger.error(f"ValueError: {ve}")
-        sys.exit(1)
-    except Exception as e:
-        logger.exception(f"An unexpected error occurred")
-        sys.exit(1)
-
-def detect_file_type(file_path):
-    """
-    @brief Detect the type of file based on its extension
-    @param file_path Path to the file to analyze
-    @return str: Detected file type ('text', 'json', 'xml', 'csv', 'h5', or 'binary')
-    """
-    # Auto-detect file type based on extension
-    extension = file_path.suffix.lower()
-
-    if extension in ['.txt', '.md', '.py', '.java', '.c', '.cpp', '.h', '.js', '.html', '.css', '.bdf', '.f06']:
-        return 'text'
-    elif extension in ['.json']:
-        return 'json'
-    elif extension in ['.xml', '.html']:
-        return 'xml'
-    elif extension in ['.csv']:
-        return 'csv'
-    elif extension in ['.h5', '.hdf5', '.he5']:
-        return 'h5'
-    else:
-        # Default to binary comparison for unknown extensions
-        return 'binary'
-
-def format_result(result, output_format):
-    """
-    @brief Format the comparison result according to the specified output format
-    @param result ComparisonResult object containing the comparison results
-    @param output_format Desired output format ('text', 'json', or 'html')
-    @return str: Formatted comparison result
-    """
-    # Format the comparison result according to the requested output format
-    if output_format == "json":
-        import json
-        return json.dumps(result.to_dict(), indent=2)
-    elif output_format == "html":
-        return result.to_html()
-    else:
-        return str(result)
-
-if __name__ == "__main__":
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file compare_text.py
+@brief Main script for comparing two files with various comparison methods
+@author Xiaotong Wang
+@date 2025
+"""
+
+import sys
+import os
+import argparse
+import logging
+from pathlib import Path
+from file_comparator.factory import ComparatorFactory
+from file_comparator.result import ComparisonResult
+
+def configure_logging():
+    """
+    @brief Configure logging settings for the application
+    @details Sets up a logger with console handler and formatter
+    @return logging.Logger: Configured logger instance
+    """
+    logger = logging.getLogger("file_comparator")
+    logger.setLevel(logging.INFO)
+    
+    # Create console handler
+    ch = logging.StreamHandler()
+    ch.setLevel(logging.INFO)
+    
+    # Create formatter
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    # Add formatter to ch
+    ch.setFormatter(formatter)
+    
+    # Add ch to logger
+    logger.addHandler(ch)
+    
+    return logger
+
+def parse_arguments():
+    """
+    @brief Parse command line arguments
+    @details Sets up argument parser with all necessary options for file comparison
+    @return argparse.Namespace: Parsed command line arguments
+    """
+    parser = argparse.ArgumentParser(description="Compare two files.")
+    parser.add_argument("file1", help="Path to the first file")
+    parser.add_argument("file2", help="Path to the second file")
+    parser.add_argument("--start-line", type=int, default=1, help="Starting line number (1-based)")
+    parser.add_argument("--end-line", type=int, help="Ending line number (1-based)")
+    parser.add_argument("--start-column", type=int, default=1, help="Starting column number (1-based)")
+    parser.add_argument("--end-column", type=int, help="Ending column number (1-based)")
+    parser.add_argument("--file-type", help="Type of the files to compare", default="auto")
+    parser.add_argument("--encoding", default="utf-8", help="File encoding for text files")
+    parser.add_argument("--chunk-size", type=int, default=8192, help="Chunk size for binary comparison")
+    parser.add_argument("--output-format", choices=["text", "json", "html"], default="text",
+                        help="Output format for the comparison result")
+    parser.add_argument("--verbose", "-v", action="store_true", help="Enable verbose output")
+    parser.add_argument("--debug", action="store_true", help="Enable debug mode with detailed logging")
+    parser.add_argument("--similarity", action="store_true",
+                        help="When comparing binary files, compute and show similarity index")
+    parser.add_argument("--similarity-mode", choices=["exact", "approx"], default="exact",
+                        help="Similarity index from an exact LCS (default) or estimated from MinHash sketches "
+                             "saved next to the files (<file>.minhash)")
+    parser.add_argument("--binary-diff", choices=["positional", "cdc"], default="positional",
+                        help="Binary comparison: bytes at equal offsets (default) or content-defined chunks "
+                             "matched wherever they are, reporting inserted, deleted and moved regions")
+    parser.add_argument("--merkle", action="store_true",
+                        help="When comparing binary files, skip equal blocks through Merkle trees of block hashes, "
+                             "hashed in parallel and saved next to the files (<file>.merkle)")
+    parser.add_argument("--num-threads", type=int, default=4, help="Number of threads for parallel processing")
+    parser.add_argument("--line-index", action="store_true",
+                        help="Seek to --start-line through a sidecar line offset index (<file>.lineidx), built on first use")
+    parser.add_argument("--max-differences", type=int, default=10,
+                        help="Maximum number of differences listed in the result; all differences are still counted")
+    parser.add_argument("--count-only", action="store_true",
+                        help="Only report the number of differences without listing them")
+    parser.add_argument("--fail-fast", action="store_true",
+                        help="Stop at the first difference; only report whether the files differ and where first")
+    
+    # Add text-specific comparison options
+    text_group = parser.add_argument_group('Text comparison options')
+    text_group.add_argument("--diff-algorithm", choices=["myers", "difflib"], default="myers",
+                      help="Line diff algorithm for text files: myers (default) or difflib")
+    text_group.add_argument("--text-numeric", action="store_true",
+                      help="Compare numbers inside text lines with tolerance instead of character by character")
+    text_group.add_argument("--text-rtol", type=float, default=1e-5,
+                      help="Relative tolerance for numbers in text files (with --text-numeric)")
+    text_group.add_argument("--text-atol", type=float, default=1e-8,
+                      help="Absolute tolerance for numbers in text files (with --text-numeric)")
+    
+    # Add BDF-specific comparison options
+    bdf_group = parser.add_argument_group('Nastran BDF comparison options')
+    bdf_group.add_argument("--bdf-rtol", type=float, default=1e-5,
+                      help="Relative tolerance for real fields in Nastran bulk data cards")
+    bdf_group.add_argument("--bdf-atol", type=float, default=1e-8,
+                      help="Absolute tolerance for real fields in Nastran bulk data cards")
+    
+    # Add F06-specific comparison options
+    f06_group = parser.add_argument_group('Nastran F06 comparison options')
+    f06_group.add_argument("--f06-rtol", type=float, default=1e-5,
+                      help="Relative tolerance for values in Nastran F06 result tables")
+    f06_group.add_argument("--f06-atol", type=float, default=1e-8,
+                      help="Absolute tolerance for values in Nastran F06 result tables")
+    
+    # Add JSON-specific comparison options
+    json_group = parser.add_argument_group('JSON comparison options')
+    json_group.add_argument("--json-compare-mode", choices=["exact", "key-based"], default="exact",
+                      help="JSON comparison mode: exact (default) or key-based")
+    json_group.add_argument("--json-key-field", help="Key field(s) to use for key-based JSON comparison (comma-separated for compound keys)")
+    json_group.add_argument("--json-streaming", action="store_true",
+                      help="Read both JSON documents incrementally and compare them value by value instead of loading them whole")
+    
+    # Add CSV-specific comparison options
+    csv_group = parser.add_argument_group('CSV comparison options')
+    csv_group.add_argument("--csv-columns",
+                      help="Compare only these columns (comma-separated header names or 1-based numbers); the other columns are not parsed")
+    csv_group.add_argument("--csv-key-columns",
+                      help="Match rows by these key columns instead of by position (comma-separated header names or 1-based numbers)")
+    csv_group.add_argument("--csv-memory-rows", type=int, default=1000000,
+                      help="Rows of the first file indexed in memory for key matching before falling back to an external sort-merge join (default: 1000000)")
+    csv_group.add_argument("--csv-typed", action="store_true",
+                      help="Compare cells holding numbers as numbers with tolerances, column by column")
+    csv_group.add_argument("--csv-schema",
+                      help="Column types for --csv-typed as COLUMN:TYPE pairs (comma-separated, TYPE is number or string; default: number)")
+    csv_group.add_argument("--csv-rtol", type=float, default=1e-5,
+                      help="Relative tolerance for numeric cells with --csv-typed (default: 1e-5)")
+    csv_group.add_argument("--csv-atol", type=float, default=1e-8,
+                      help="Absolute tolerance for numeric cells with --csv-typed (default: 1e-8)")
+    csv_group.add_argument("--csv-column-tol", action="append", default=[],
+                      help="Tolerances of one column as COLUMN=RTOL[,ATOL]; may be repeated")
+    
+    # Add H5-specific comparison options
+    h5_group = parser.add_argument_group('HDF5 comparison options')
+    h5_group.add_argument("--h5-table", help="Comma-separated list of table names to compare in HDF5 files")
+    h5_group.add_argument("--h5-table-regex", help="Regular expression pattern to match table names in HDF5 files")
+    h5_group.add_argument("--h5-structure-only", action="store_true", 
+                         help="Only compare HDF5 file structure without comparing content")
+    h5_group.add_argument("--h5-show-content-diff", action="store_true",
+                         help="Show detailed content differences when content differs")
+    h5_group.add_argument("--h5-rtol", type=float, default=1e-5,
+                         help="Relative tolerance for numerical comparison in HDF5 files")
+    h5_group.add_argument("--h5-atol", type=float, default=1e-8,
+                         help="Absolute tolerance for numerical comparison in HDF5 files")
+
+    # Add options for binary files of fixed-size records
+    record_group = parser.add_argument_group('Binary record comparison options')
+    record_group.add_argument("--record-dtype",
+                              help="Compare binary files as arrays of records with this NumPy dtype, "
+                                   "e.g. '<i4,<f8' or 'id:<i4,xyz:(3,)<f8'")
+    record_group.add_argument("--record-header", type=int, default=0,
+                              help="Bytes before the first record, compared as raw bytes")
+    record_group.add_argument("--fortran-records", action="store_true",
+                              help="Records are framed by 4-byte Fortran sequential record markers")
+    record_group.add_argument("--record-rtol", type=float, default=1e-5,
+                              help="Relative tolerance for floating-point record fields")
+    record_group.add_argument("--record-atol", type=float, default=1e-8,
+                              help="Absolute tolerance for floating-point record fields")
+    record_group.add_argument("--record-field-tol", action="append", default=[],
+                              help="Tolerances of one field as FIELD=RTOL[,ATOL]; may be repeated")
+
+    return parser.parse_args()
+
+def main():
+    """
+    @brief Main entry point of the application
+    @details Handles the main workflow of file comparison including:
+             - Setting up logging
+             - Parsing arguments
+             - Creating appropriate comparator
+             - Performing comparison
+             - Outputting results
+    """
+    logger = configure_logging()
+
+    try:
+        args = parse_arguments()
+        
+        # Set debug level if requested
+        if args.debug:
+            logger.setLevel(logging.DEBUG)
+            logger.debug("Debug mode enabled")
+
+        # Adjust for 0-based indexing
+        start_line = max(0, args.start_line - 1)
+        end_line = None if args.end_line is None else max(0, args.end_line - 1)
+        start_column = max(0, args.start_column - 1)
+        end_column = None if args.end_column is None else max(0, args.end_column - 1)
+
+        # Resolve file paths
+        file1_path = Path(args.file1).resolve()
+        file2_path = Path(args.file2).resolve()
+
+        # Check if files exist
+        if not file1_path.exists():
+            raise ValueError(f"File not found: {file1_path}")
+        if not file2_path.exists():
+            raise ValueError(f"File not found: {file2_path}")
+
+        # Determine file type
+        file_type = args.file_type
+        if file_type == "auto":
+            # Auto-detect file type based on extension
+            file_type = detect_file_type(file1_path)
+            logger.info(f"Auto-detected file type: {file_type}")
+
+        # Prepare comparator kwargs based on file type and arguments
+        comparator_kwargs = {
+            "encoding": args.encoding,
+            "chunk_size": args.chunk_size,
+            "verbose": args.verbose or args.debug,  # Enable verbose mode if debug is enabled
+            "num_threads": args.num_threads,
+            "line_index": args.line_index,
+            "max_differences": args.max_differences,
+            "count_only": args.count_only,
+            "fail_fast": args.fail_fast
+        }
+        
+        # Add file type specific arguments
+        if file_type == "text":
+            comparator_kwargs["diff_algorithm"] = args.diff_algorithm
+            if args.text_numeric:
+                comparator_kwargs["numeric_tolerance"] = True
+                comparator_kwargs["rtol"] = args.text_rtol
+                comparator_kwargs["atol"] = args.text_atol
+                logger.info(f"Using numerical comparison tolerances: rtol={args.text_rtol}, atol={args.text_atol}")
+        
+        if file_type == "bdf":
+            comparator_kwargs["rtol"] = args.bdf_rtol
+            comparator_kwargs["atol"] = args.bdf_atol
+            logger.info(f"Using numerical comparison tolerances: rtol={args.bdf_rtol}, atol={args.bdf_atol}")
+        
+        if file_type == "f06":
+            comparator_kwargs["rtol"] = args.f06_rtol
+            comparator_kwargs["atol"] = args.f06_atol
+            logger.info(f"Using numerical comparison tolerances: rtol={args.f06_rtol}, atol={args.f06_atol}")
+        
+        if file_type == "json" and args.json_compare_mode:
+            comparator_kwargs["compare_mode"] = args.json_compare_mode
+            if args.json_key_field:
+                key_fields = [field.strip() for field in args.json_key_field.split(',')]
+                comparator_kwargs["key_field"] = key_fields[0] if len(key_fields) == 1 else key_fields
+                logger.info(f"Using key field(s): {comparator_kwargs['key_field']} for JSON comparison")
+        
+        if file_type == "json" and args.json_streaming:
+            comparator_kwargs["streaming"] = True
+            logger.info("Streaming JSON documents in lockstep")
+        
+        if file_type == "csv" and args.csv_columns:
+            columns = [column.strip() for column in args.csv_columns.split(',')]
+            comparator_kwargs["columns"] = columns
+            logger.info(f"Comparing CSV column(s): {columns}")
+        
+        if file_type == "csv" and args.csv_key_columns:
+            key_columns = [column.strip() for column in args.csv_key_columns.split(',')]
+            comparator_kwargs["key_columns"] = key_columns
+            comparator_kwargs["key_memory_rows"] = args.csv_memory_rows
+            logger.info(f"Using key column(s): {key_columns} for CSV comparison")
+        
+        if file_type == "csv" and args.csv_typed:
+            comparator_kwargs["typed"] = True
+            comparator_kwargs["column_types"] = parse_column_types(args.csv_schema)
+            comparator_kwargs["rtol"] = args.csv_rtol
+            comparator_kwargs["atol"] = args.csv_atol
+            comparator_kwargs["column_tolerances"] = parse_field_tolerances(
+                args.csv_column_tol, args.csv_rtol, args.csv_atol)
+            logger.info(f"Using numerical comparison tolerances: rtol={args.csv_rtol}, atol={args.csv_atol}")
+        
+        if file_type == "h5":
+            if args.h5_table:
+                tables = [table.strip() for table in args.h5_table.split(',')]
+                comparator_kwargs["tables"] = tables
+                logger.info(f"Comparing HDF5 tables: {tables}")
+            if args.h5_table_regex:
+                comparator_kwargs["table_regex"] = args.h5_table_regex
+                logger.info(f"Using table regex pattern: {args.h5_table_regex}")
+            comparator_kwargs["structure_only"] = args.h5_structure_only
+            comparator_kwargs["show_content_diff"] = args.h5_show_content_diff
+            comparator_kwargs["rtol"] = args.h5_rtol
+            comparator_kwargs["atol"] = args.h5_atol
+            if args.h5_structure_only:
+                logger.info("Only comparing HDF5 file structure")
+            logger.info(f"Using numerical comparison tolerances: rtol={args.h5_rtol}, atol={args.h5_atol}")
+            comparator_kwargs["debug"] = args.debug
+        
+        if file_type == "binary":
+            comparator_kwargs["similarity"] = args.similarity
+            comparator_kwargs["similarity_mode"] = args.similarity_mode
+            comparator_kwargs["diff_mode"] = args.binary_diff
+            comparator_kwargs["merkle"] = args.merkle
+            if args.record_dtype:
+                comparator_kwargs["record_dtype"] = args.record_dtype
+                comparator_kwargs["header_bytes"] = args.record_header
+                comparator_kwargs["fortran_records"] = args.fortran_records
+                comparator_kwargs["rtol"] = args.record_rtol
+                comparator_kwargs["atol"] = args.record_atol
+                comparator_kwargs["field_tolerances"] = parse_field_tolerances(
+                    args.record_field_tol, args.record_rtol, args.record_atol)
+                logger.info(f"Comparing records of dtype {args.record_dtype} with tolerances: "
+                            f"rtol={args.record_rtol}, atol={args.record_atol}")
+
+        # Create comparator instance
+        comparator = ComparatorFactory.create_comparator(
+            file_type,
+            **comparator_kwargs
+        )
+
+        # Perform the comparison
+        result = comparator.compare_files(
+            file1_path,
+            file2_path,
+            start_line,
+            end_line,
+            start_column,
+            end_column
+        )
+
+        # Format and output the result
+        output = format_result(result, args.output_format)
+        print(output)
+
+        # Exit with appropriate status code
+        sys.exit(0 if result.identical else 1)
+
+    except ValueError as ve:
+        logger.error(f"ValueError: {ve}")
+        sys.exit(1)
+    except Exception as e:
+        logger.exception(f"An unexpected error occurred")
+        sys.exit(1)
+
+def detect_file_type(file_path):
+    """
+    @brief Detect the type of file based on its extension
+    @param file_path Path to the file to analyze
+    @return str: Detected file type ('text', 'bdf', 'f06', 'json', 'xml', 'csv', 'h5', or 'binary')
+    """
+    # Auto-detect file type based on extension
+    extension = file_path.suffix.lower()
+
+    if extension in ['.txt', '.md', '.py', '.java', '.c', '.cpp', '.h', '.js', '.html', '.css']:
+        return 'text'
+    elif extension in ['.bdf', '.nas']:
+        return 'bdf'
+    elif extension in ['.f06']:
+        return 'f06'
+    elif extension in ['.json']:
+        return 'json'
+    elif extension in ['.xml', '.html']:
+        return 'xml'
+    elif extension in ['.csv']:
+        return 'csv'
+    elif extension in ['.h5', '.hdf5', '.he5']:
+        return 'h5'
+    else:
+        # Default to binary comparison for unknown extensions
+        return 'binary'
+
+def parse_field_tolerances(specs, rtol, atol):
+    """
+    @brief Parse per-field tolerance options
+    @param specs list: Options of the form FIELD=RTOL[,ATOL]
+    @param rtol float: Relative tolerance of fields without an override
+    @param atol float: Absolute tolerance used when an option gives only RTOL
+    @return dict: (rtol, atol) per field name
+    @throws ValueError: If an option is malformed
+    """
+    tolerances = {}
+    for spec in specs:
+        name, _, values = spec.partition("=")
+        try:
+            numbers = [float(value) for value in values.split(",")]
+        except ValueError:
+            numbers = []
+        if not name.strip() or len(numbers) not in (1, 2):
+            raise ValueError(f"Invalid field tolerance '{spec}', expected FIELD=RTOL[,ATOL]")
+        tolerances[name.strip()] = (numbers[0], numbers[1] if len(numbers) == 2 else atol)
+    return tolerances
+
+def parse_column_types(spec):
+    """
+    @brief Parse the column types of a typed CSV comparison
+    @param spec str: Comma-separated COLUMN:TYPE pairs, or None
+    @return dict: Type per column name or number
+    @throws ValueError: If a pair is malformed
+    """
+    column_types = {}
+    for pair in (spec or "").split(","):
+        if not pair.strip():
+            continue
+        column, _, column_type = pair.rpartition(":")
+        if not column.strip() or not column_type.strip():
+            raise ValueError(f"Invalid column type '{pair}', expected COLUMN:TYPE")
+        column_types[column.strip()] = column_type.strip()
+    return column_types
+
+def format_result(result, output_format):
+    """
+    @brief Format the comparison result according to the specified output format
+    @param result ComparisonResult object containing the comparison results
+    @param output_format Desired output format ('text', 'json', or 'html')
+    @return str: Formatted comparison result
+    """
+    # Format the comparison result according to the requested output format
+    if output_format == "json":
+        import json
+        return json.dumps(result.to_dict(), indent=2)
+    elif output_format == "html":
+        return result.to_html()
+    else:
+        return str(result)
+
+if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -1,107 +1,181 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
-"""
-@file base_comparator.py
-@brief Base abstract class for file comparison operations
-@author Xiaotong Wang
-@date 2025
-"""
-
-from abc import ABC, abstractmethod
-import logging
-from pathlib import Path
-from .result import ComparisonResult, Difference
-
-class BaseComparator(ABC):
-    """
-    @brief Base abstract class for all file comparators
-    @details This class defines the interface and common functionality for all file comparators.
-             It provides basic file comparison operations and logging capabilities.
-    """
-    
-    def __init__(self, encoding="utf-8", chunk_size=8192, verbose=False):
-        """
-        @brief Initialize the base comparator
-        @param encoding str: File encoding to use (default: "utf-8")
-        @param chunk_size int: Size of chunks for reading large files (default: 8192)
-        @param verbose bool: Enable verbose logging (default: False)
-        """
-        self.encoding = encoding
-        self.chunk_size = chunk_size
-        self.logger = logging.getLogger(f"file_comparator.{self.__class__.__name__}")
-        if verbose:
-            self.logger.setLevel(logging.DEBUG)
-    
-    @abstractmethod
-    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
-        """
-        @brief Read file content with specified range
-        @param file_path Path: Path to the file to read
-        @param start_line int: Starting line number (0-based)
-        @param end_line int: Ending line number (0-based, None for end of file)
-        @param start_column int: Starting column number (0-based)
-        @param end_column int: Ending column number (0-based, None for end of line)
-        @return object: File content in a format suitable for comparison
-        """
-        pass
-
-    @abstractmethod
-    def compare_content(self, content1, content2):
-        """
-        @brief Compare two content objects and return comparison details
-        @param content1 object: First content object to compare
-        @param content2 object: Second content object to compare
-        @return tuple: (bool, list) - (identical, differences)
-        """
-        pass
-
-    def compare_files(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
-        """
-        @brief Compare two files with the specified parameters
-        @param file1 Path: Path to the first file
-        @param file2 Path: Path to the second file
-        @param start_line int: Starting line number (0-based)
-        @param end_line int: Ending line number (0-based, None for end of file)
-        @param start_column int: Starting column number (0-based)
-        @param end_column int: Ending column number (0-based, None for end of line)
-        @return ComparisonResult: Result object containing comparison details
-        """
-        result = ComparisonResult(
-            file1=str(file1),
-            file2=str(file2),
-            start_line=start_line,
-            end_line=end_line,
-            start_column=start_column,
-            end_column=end_column
-        )
-        
-        try:
-            self.logger.info(f"Comparing files: {file1} and {file2}")
-            
-            # Record file metadata
-            file1_path = Path(file1)
-            file2_path = Path(file2)
-            result.file1_size = file1_path.stat().st_size
-            result.file2_size = file2_path.stat().st_size
-            
-            # Read content with specified ranges
-            self.logger.debug(f"Reading content from files")
-            content1 = self.read_content(file1, start_line, end_line, start_column, end_column)
-            content2 = self.read_content(file2, start_line, end_line, start_column, end_column)
-            
-            # Compare content
-            self.logger.debug(f"Comparing content")
-            identical, differences = self.compare_content(content1, content2)
-            
-            # Update result
-            result.identical = identical
-            result.differences = differences
-            
-            return result
-            
-        except Exception as e:
-            self.logger.error(f"Error during comparison: {str(e)}")
-            result.error = str(e)
-            result.identical = False
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file base_comparator.py
+@brief Base abstract class for file comparison operations
+@author Xiaotong Wang
+@date 2025
+"""
+
+from abc import ABC, abstractmethod
+import logging
+from pathlib import Path
+from .result import ComparisonResult, Difference, DifferenceCollector, FirstDifference
+
+class BaseComparator(ABC):
+    """
+    @brief Base abstract class for all file comparators
+    @details This class defines the interface and common functionality for all file comparators.
+             It provides basic file comparison operations and logging capabilities.
+    """
+    
+    def __init__(self, encoding="utf-8", chunk_size=8192, verbose=False, max_differences=10, count_only=False,
+                 fail_fast=False):
+        """
+        @brief Initialize the base comparator
+        @param encoding str: File encoding to use (default: "utf-8")
+        @param chunk_size int: Size of chunks for reading large files (default: 8192)
+        @param verbose bool: Enable verbose logging (default: False)
+        @param max_differences int: Number of differences listed in the result (default: 10)
+        @param count_only bool: Only count the differences, list none of them (default: False)
+        @param fail_fast bool: Stop at the first difference (default: False)
+        """
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+        self.max_differences = max_differences
+        self.count_only = count_only
+        self.fail_fast = fail_fast
+        self.difference_count = None  # Exact number of differences found by the last comparison
+        self.logger = logging.getLogger(f"file_comparator.{self.__class__.__name__}")
+        if verbose:
+            self.logger.setLevel(logging.DEBUG)
+    
+    @abstractmethod
+    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Read file content with specified range
+        @param file_path Path: Path to the file to read
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @param start_column int: Starting column number (0-based)
+        @param end_column int: Ending column number (0-based, None for end of line)
+        @return object: File content in a format suitable for comparison
+        """
+        pass
+
+    @abstractmethod
+    def compare_content(self, content1, content2):
+        """
+        @brief Compare two content objects and return comparison details
+        @param content1 object: First content object to compare
+        @param content2 object: Second content object to compare
+        @return tuple: (bool, list) - (identical, differences)
+        """
+        pass
+
+    @property
+    def difference_limit(self):
+        """
+        @brief Number of differences a comparison should build Difference objects for
+        @return int: 0 in count-only mode, at most 1 in fail-fast mode, max_differences otherwise
+        """
+        if self.count_only:
+            return 0
+        return min(self.max_differences, 1) if self.fail_fast else self.max_differences
+
+    def _new_collector(self):
+        """
+        @brief Create a collector that keeps as many differences as will be listed
+        @return DifferenceCollector: Empty collector, raising FirstDifference in fail-fast mode
+        """
+        return DifferenceCollector(self.difference_limit, self.fail_fast)
+
+    def _limit_differences(self, differences, total=None):
+        """
+        @brief Truncate a difference list to the reporting limit and record the exact total
+        @param differences list: Differences found, possibly already cut to the limit
+        @param total int: Exact number of differences (default: len(differences))
+        @return list: At most max_differences differences followed by a summary entry if
+                some were left out; empty in count-only mode
+        @details In fail-fast mode the comparison may have stopped before every difference
+                 was found, so no total is recorded and only the first difference is kept.
+        """
+        total = len(differences) if total is None else total
+        limit = self.difference_limit
+        if self.fail_fast:
+            return differences[:limit]
+        self.difference_count = total
+        if total > limit:
+            differences = differences[:limit]
+            if limit:
+                differences.append(Difference(
+                    position=None,
+                    expected=None,
+                    actual=None,
+                    diff_type=f"more differences not shown (total: {total})"
+                ))
+        return differences
+
+    def compare_paths(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Read two files and compare their content
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @param start_column int: Starting column number (0-based)
+        @param end_column int: Ending column number (0-based, None for end of line)
+        @return tuple: (bool, list) - (identical, differences)
+        @details Default implementation reads both files with read_content() and hands the
+                 results to compare_content(). Comparators that can decide faster by
+                 working on the files directly override this method. In fail-fast mode a
+                 FirstDifference raised by the comparison ends it with that difference.
+        """
+        self.logger.debug(f"Reading content from files")
+        content1 = self.read_content(file1, start_line, end_line, start_column, end_column)
+        content2 = self.read_content(file2, start_line, end_line, start_column, end_column)
+        
+        self.logger.debug(f"Comparing content")
+        try:
+            return self.compare_content(content1, content2)
+        except FirstDifference as stop:
+            self.logger.debug(f"Stopped at the first difference: {stop.difference}")
+            return False, self._limit_differences([stop.difference])
+
+    def compare_files(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Compare two files with the specified parameters
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @param start_column int: Starting column number (0-based)
+        @param end_column int: Ending column number (0-based, None for end of line)
+        @return ComparisonResult: Result object containing comparison details
+        """
+        result = ComparisonResult(
+            file1=str(file1),
+            file2=str(file2),
+            start_line=start_line,
+            end_line=end_line,
+            start_column=start_column,
+            end_column=end_column
+        )
+        
+        try:
+            self.logger.info(f"Comparing files: {file1} and {file2}")
+            
+            # Record file metadata
+            file1_path = Path(file1)
+            file2_path = Path(file2)
+            result.file1_size = file1_path.stat().st_size
+            result.file2_size = file2_path.stat().st_size
+            
+            # Read and compare content with specified ranges
+            self.difference_count = None
+            identical, differences = self.compare_paths(file1, file2, start_line, end_line, start_column, end_column)
+            
+            # Update result
+            result.identical = identical
+            result.differences = differences
+            result.total_differences = self.difference_count
+            result.stopped_early = self.fail_fast and not identical
+            
+            return result
+            
+        except Exception as e:
+            self.logger.error(f"Error during comparison: {str(e)}")
+            result.error = str(e)
+            result.identical = False
             return result
\ No newline at end of file
@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file bdf_comparator.py
+@brief Nastran bulk data (BDF) comparator that matches cards by type and ID
+@author Xiaotong Wang
+@date 2025
+"""
+
+import numpy as np
+from .text_comparator import TextComparator
+from .numeric import numbers_close, try_parse_numbers
+from .result import Difference
+
+class BdfComparator(TextComparator):
+    """
+    @brief Comparator for Nastran input decks with card-aware comparison
+    @details This class extends TextComparator to compare bulk data entries as cards
+             instead of lines:
+             - Small-field (8 character), large-field (16 character, '*') and
+               free-field (comma separated) cards, including continuation lines
+             - Cards matched through a hash index keyed by card type and ID, so
+               reordered or reformatted cards compare equal
+             - Field by field comparison with numeric tolerance for real fields
+             - Executive and case control sections diffed as text
+    """
+
+    # Content is parsed before comparison, so never diff raw lines
+    raw_line_compare = False
+
+    # Load and constraint cards that share a set ID are told apart by their grid ID
+    SECONDARY_KEY_CARDS = {'FORCE', 'FORCE1', 'FORCE2', 'MOMENT', 'MOMENT1', 'MOMENT2',
+                           'SPC', 'SPCD', 'TEMP', 'PLOAD4'}
+
+    def __init__(self, encoding="utf-8", chunk_size=8192, verbose=False, rtol=1e-5, atol=1e-8, line_index=False,
+                 max_differences=10, count_only=False,
+                 fail_fast=False):
+        """
+        @brief Initialize the BDF comparator
+        @param encoding str: File encoding (default: "utf-8")
+        @param chunk_size int: Size of chunks for reading large files (default: 8192)
+        @param verbose bool: Enable verbose logging (default: False)
+        @param rtol float: Relative tolerance for real fields (default: 1e-5)
+        @param atol float: Absolute tolerance for real fields (default: 1e-8)
+        @param line_index bool: Seek to start_line through a sidecar line offset index (default: False)
+        @param max_differences int: Number of differences listed in the result (default: 10)
+        @param count_only bool: Only count the differences, list none of them (default: False)
+        @param fail_fast bool: Stop at the first difference (default: False)
+        """
+        super().__init__(encoding, chunk_size, verbose, line_index=line_index,
+                         max_differences=max_differences, count_only=count_only, fail_fast=fail_fast)
+        self.rtol = rtol
+        self.atol = atol
+
+    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Read and parse a Nastran deck into its cards
+        @param file_path Path: Path to the BDF file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param start_column int: Starting column number (ignored, cards are fixed-format)
+        @param end_column int: Ending column number (ignored, cards are fixed-format)
+        @return dict: Parsed deck with the header lines and the bulk data cards
+        @details Lines before BEGIN BULK are kept as text. Bulk data lines are split into
+                 fields in a single pass and the fields of all cards are collected in one
+                 flat array, see _build_cards().
+        """
+        if start_column > 0 or end_column is not None:
+            self.logger.debug("Column range ignored for BDF files, cards are compared field by field")
+
+        header = []
+        in_bulk = False
+        numbered = enumerate(self.iter_lines(file_path, start_line, end_line), start_line)
+        for line_number, line in numbered:
+            upper = line.lstrip().upper()
+            if upper.startswith('BEGIN') and 'BULK' in upper:
+                in_bulk = True
+                break
+            header.append(line)
+
+        if not in_bulk:
+            # No BEGIN BULK in the selected range, treat it as bulk data only
+            self.logger.debug(f"No BEGIN BULK found in {file_path}, parsing all lines as bulk data")
+            numbered = enumerate(header, start_line)
+            header = []
+
+        names, card_lines, starts, fields = self._split_cards(numbered)
+        self.logger.debug(f"Parsed {len(names)} cards from {file_path}")
+        return self._build_cards(header, names, card_lines, starts, fields)
+
+    def _split_cards(self, numbered_lines):
+        """
+        @brief Split bulk data lines into cards and raw fields
+        @param numbered_lines iterable: (line index, line) pairs of the bulk data section
+        @return tuple: (list, list, list, list) - card names, first line of every card,
+                offset of every card's first field, flat list of all raw fields
+        @details Every line contributes a multiple of a fixed number of fields (8, or 4
+                 for large-field lines) so field numbers stay aligned across continuation
+                 lines. Free-field lines longer than one card are split into as many
+                 continuation lines, and tabs in fixed-format lines are expanded to the
+                 field boundaries.
+                 Comments and blank lines are skipped and parsing stops at ENDDATA.
+        """
+        names = []
+        card_lines = []
+        starts = []
+        fields = []
+        for line_number, line in numbered_lines:
+            if '$' in line:
+                line = line[:line.index('$')]
+            line = line.rstrip()
+            if not line:
+                continue
+
+            if ',' in line:
+                # Free-field: comma separated. A single field after the eighth (fourth) is
+                # a continuation marker; longer lines carry on as continuation lines.
+                parts = line.split(',')
+                name = parts[0].strip()
+                large = name.endswith('*')
+                width = 4 if large else 8
+                data = parts[1:]
+                if len(data) == width + 1:
+                    del data[width]
+            else:
+                if '\t' in line:
+                    line = self._expand_tabs(line)
+                name = line[:8].strip()
+                large = name.endswith('*')
+                width = 4 if large else 8
+                if large:
+                    data = [line[8:24], line[24:40], line[40:56], line[56:72]]
+                else:
+                    data = [line[8:16], line[16:24], line[24:32], line[32:40],
+                            line[40:48], line[48:56], line[56:64], line[64:72]]
+            if len(data) % width:
+                data.extend([''] * (width - len(data) % width))
+
+            if not name or name[0] in '+*':
+                if not starts:
+                    self.logger.debug(f"Skipping continuation without a parent card at line {line_number+1}")
+                    continue
+            else:
+                name = name.rstrip('*').upper()
+                if name == 'ENDDATA':
+                    break
+                names.append(name)
+                card_lines.append(line_number)
+                starts.append(len(fields))
+            fields.extend(data)
+        return names, card_lines, starts, fields
+
+    @staticmethod
+    def _expand_tabs(line):
+        """
+        @brief Expand the tabs of a fixed-format line to its field boundaries
+        @param line str: Bulk data line containing tabs
+        @return str: Line with every tab replaced by spaces up to the next field boundary
+        @details Fields are 8 characters wide, or 16 after the card name of a large-field
+                 line, so a tab may stand for any blank part of a field.
+        """
+        pieces = line.split('\t')
+        width = 16 if pieces[0].strip().endswith('*') else 8
+        expanded = pieces[0]
+        for piece in pieces[1:]:
+            if len(expanded) < 8:
+                stop = 8
+            else:
+                stop = 8 + ((len(expanded) - 8) // width + 1) * width
+            expanded = expanded.ljust(stop) + piece
+        return expanded
+
+    def _build_cards(self, header, names, card_lines, starts, fields):
+        """
+        @brief Turn the raw fields of a deck into arrays and a card index
+        @param header list: Lines before BEGIN BULK
+        @param names list: Card name of every card
+        @param card_lines list: Line index where every card starts
+        @param starts list: Offset of the first field of every card in fields
+        @param fields list: Raw fields of all cards, continuations included
+        @return dict: header, names, lines, fields (normalized), starts, lengths and index
+        @details Fields are stripped and upper-cased by vectorized string operations and
+                 trailing blank fields are trimmed per card with one reduceat call.
+                 The index maps (card type, ID[, grid ID], occurrence) to the card number.
+        """
+        values = np.array(fields, dtype=np.dtypes.StringDType())
+        values = np.strings.upper(np.strings.strip(values))
+        starts = np.asarray(starts, dtype=np.int64)
+
+        lengths = np.zeros(len(starts), dtype=np.int64)
+        if len(starts):
+            owner = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, len(values))))
+            position = np.arange(len(values)) - starts[owner] + 1
+            lengths = np.maximum.reduceat(np.where(values != '', position, 0), starts)
+
+        first = values[np.minimum(starts, len(values) - 1)].tolist() if len(values) else []
+        second = values[np.minimum(starts + 1, len(values) - 1)].tolist() if len(values) else []
+
+        index = {}
+        occurrences = {}
+        for card, name in enumerate(names):
+            card_id = first[card] if lengths[card] >= 1 else ''
+            if name in self.SECONDARY_KEY_CARDS:
+                key = (name, card_id, second[card] if lengths[card] >= 2 else '')
+            else:
+                key = (name, card_id)
+            occurrence = occurrences.get(key, 0)
+            occurrences[key] = occurrence + 1
+            index[key + (occurrence,)] = card
+
+        return {
+            "header": header,
+            "names": names,
+            "lines": np.asarray(card_lines, dtype=np.int64),
+            "fields": values,
+            "starts": starts,
+            "lengths": lengths,
+            "index": index
+        }
+
+    def compare_content(self, content1, content2):
+        """
+        @brief Compare two parsed decks card by card
+        @param content1 dict: First parsed deck
+        @param content2 dict: Second parsed deck
+        @return tuple: (bool, list) - (identical, differences)
+        @details The header sections are diffed as text. Bulk data cards are matched
+                 through their keys; the fields of all matched cards are gathered into two
+                 aligned arrays and compared in one pass. Fields that differ as text but
+                 are both real numbers are compared again with rtol/atol.
+                 All differing fields and cards are counted; Difference objects are only
+                 built for the first max_differences of each kind. In fail-fast mode a
+                 differing header or unmatched cards end the comparison before any field
+                 is compared.
+        """
+        differences = []
+        total = 0
+        limit = self.difference_limit
+        header1, header2 = content1["header"], content2["header"]
+        if header1 != header2:
+            opcodes, total = self._limit_opcodes(self._diff_lines(header1, header2))
+            differences.extend(self._opcodes_to_differences(opcodes, header1, header2))
+            if self.fail_fast:
+                return False, self._limit_differences(differences, total)
+
+        index2 = content2["index"]
+        pairs = [(card1, index2[key]) for key, card1 in content1["index"].items() if key in index2]
+        matched1 = np.array(sorted(pairs), dtype=np.int64).reshape(-1, 2)
+        cards1, cards2 = matched1[:, 0], matched1[:, 1]
+
+        missing = np.setdiff1d(np.arange(len(content1["names"])), cards1)
+        extra = np.setdiff1d(np.arange(len(content2["names"])), cards2)
+        if self.fail_fast and (len(missing) or len(extra)):
+            # Unmatched cards already decide the result
+            card_diffs, field_count = [], 0
+        else:
+            card_diffs, field_count = self._compare_fields(content1, content2, cards1, cards2)
+
+        for card in missing[:limit].tolist():
+            card_diffs.append((card, Difference(
+                position=f"{self._card_label(content1, card)} (line {content1['lines'][card]+1})",
+                expected=self._card_text(content1, card),
+                actual=None,
+                diff_type="missing_card"
+            )))
+        card_diffs.sort(key=lambda item: item[0])
+        differences.extend(diff for _, diff in card_diffs[:limit])
+
+        for card in extra[:limit].tolist():
+            differences.append(Difference(
+                position=f"{self._card_label(content2, card)} (file2 line {content2['lines'][card]+1})",
+                expected=None,
+                actual=self._card_text(content2, card),
+                diff_type="extra_card"
+            ))
+
+        total += field_count + len(missing) + len(extra)
+        if not total:
+            return True, []
+        return False, self._limit_differences(differences, total)
+
+    def _compare_fields(self, content1, content2, cards1, cards2):
+        """
+        @brief Compare the fields of matched cards in bulk
+        @param content1 dict: First parsed deck
+        @param content2 dict: Second parsed deck
+        @param cards1 np.ndarray: Card numbers in the first deck
+        @param cards2 np.ndarray: Matching card numbers in the second deck
+        @return tuple: (list, int) - (card number in first deck, Difference) for the first
+                difference_limit differing fields, and the number of differing fields
+        """
+        if not len(cards1):
+            return [], 0
+        lengths1 = content1["lengths"][cards1]
+        lengths2 = content2["lengths"][cards2]
+        widths = np.maximum(lengths1, lengths2)
+        total = int(widths.sum())
+        if total == 0:
+            return [], 0
+
+        # Field number within its card for every compared cell, padded to the longer card
+        pair = np.repeat(np.arange(len(cards1)), widths)
+        field = np.arange(total) - np.repeat(np.cumsum(widths) - widths, widths)
+        values1 = self._gather(content1, cards1[pair], field, lengths1[pair])
+        values2 = self._gather(content2, cards2[pair], field, lengths2[pair])
+
+        bad = np.flatnonzero(values1 != values2)
+        if len(bad):
+            # Real fields always carry a decimal point; integer IDs are never tolerance-compared
+            real = np.flatnonzero(np.strings.find(values1[bad], '.') >= 0)
+            real = real[np.strings.find(values2[bad[real]], '.') >= 0]
+            if len(real):
+                numbers1, valid1 = try_parse_numbers(values1[bad[real]].tolist())
+                numbers2, valid2 = try_parse_numbers(values2[bad[real]].tolist())
+                valid = valid1 & valid2
+                close = np.zeros(len(real), dtype=bool)
+                close[valid] = numbers_close(numbers1[valid], numbers2[valid], self.rtol, self.atol)
+                keep = np.ones(len(bad), dtype=bool)
+                keep[real[close]] = False
+                bad = bad[keep]
+        self.logger.debug(f"{len(bad)} fields differ in {len(cards1)} matched cards")
+
+        card_diffs = []
+        shown = bad[:self.difference_limit]
+        for cell, card1, number in zip(shown.tolist(), cards1[pair[shown]].tolist(), field[shown].tolist()):
+            card_diffs.append((card1, Difference(
+                position=(f"{self._card_label(content1, card1)}, field {number+2} "
+                          f"(line {content1['lines'][card1]+1})"),
+                expected=str(values1[cell]),
+                actual=str(values2[cell]),
+                diff_type="field_mismatch"
+            )))
+        return card_diffs, len(bad)
+
+    @staticmethod
+    def _gather(content, cards, field, lengths):
+        """
+        @brief Look up a batch of card fields, using blanks past the end of a card
+        @param content dict: Parsed deck
+        @param cards np.ndarray: Card number of every cell
+        @param field np.ndarray: Field number within the card of every cell
+        @param lengths np.ndarray: Length of the card of every cell
+        @return np.ndarray: Field values
+        """
+        values = content["fields"]
+        present = field < lengths
+        gathered = np.full(len(cards), '', dtype=values.dtype)
+        gathered[present] = values[content["starts"][cards[present]] + field[present]]
+        return gathered
+
+    def _card_label(self, content, card):
+        """
+        @brief Describe a card by its type and key fields
+        @param content dict: Parsed deck
+        @param card int: Card number
+        @return str: Label such as 'GRID 9' or 'FORCE 1 9'
+        """
+        name = content["names"][card]
+        key_fields = 2 if name in self.SECONDARY_KEY_CARDS else 1
+        start = content["starts"][card]
+        ids = content["fields"][start:start + min(key_fields, content["lengths"][card])].tolist()
+        return " ".join([name] + ids)
+
+    @staticmethod
+    def _card_text(content, card):
+        """
+        @brief Render a card as a free-field line for reports
+        @param content dict: Parsed deck
+        @param card int: Card number
+        @return str: Card name and fields joined by commas
+        """
+        start = content["starts"][card]
+        fields = content["fields"][start:start + content["lengths"][card]].tolist()
+        return ",".join([content["names"][card]] + fields)
@@ -1,242 +1,685 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
-"""
-@file binary_comparator.py
-@brief Binary file comparator implementation with efficient byte-level comparison
-@author Xiaotong Wang
-@date 2025
-"""
-
-import hashlib
-from .base_comparator import BaseComparator
-from .result import Difference
-from concurrent.futures import ThreadPoolExecutor
-
-class BinaryComparator(BaseComparator):
-    """
-    @brief Comparator for binary files with efficient byte-level comparison
-    @details This class implements binary file comparison with support for:
-             - Byte-level difference detection
-             - Similarity index calculation using LCS
-             - Parallel processing for large files
-             - File hash calculation
-    """
-    
-    def __init__(self, encoding="utf-8", chunk_size=8192, verbose=False, similarity=False, num_threads=4):
-        """
-        @brief Initialize the binary comparator
-        @param encoding str: File encoding (not used for binary files)
-        @param chunk_size int: Size of chunks for reading large files
-        @param verbose bool: Enable verbose logging
-        @param similarity bool: Enable similarity index calculation
-        @param num_threads int: Number of threads for parallel processing
-        """
-        super().__init__(encoding, chunk_size, verbose)
-        self.similarity = similarity
-        self.num_threads = num_threads
-
-    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
-        """
-        @brief Read binary content with specified range
-        @param file_path Path: Path to the binary file to read
-        @param start_line int: Starting byte offset (interpreted as bytes for binary files)
-        @param end_line int: Ending byte offset (interpreted as bytes for binary files)
-        @param start_column int: Ignored for binary files
-        @param end_column int: Ignored for binary files
-        @return bytes: Binary content within the specified range
-        @throws ValueError: If byte offsets are invalid
-        @throws FileNotFoundError: If file doesn't exist
-        @throws IOError: If there are other file reading errors
-        """
-        try:
-            self.logger.debug(f"Reading binary file: {file_path}")
-            
-            # For binary files, interpret start_line as byte offset
-            start_offset = start_line
-            end_offset = end_line
-            
-            with open(file_path, 'rb') as f:
-                if start_offset > 0:
-                    f.seek(start_offset)
-                
-                if end_offset is not None:
-                    if end_offset <= start_offset:
-                        raise ValueError("End offset must be greater than start offset")
-                    bytes_to_read = end_offset - start_offset
-                    content = f.read(bytes_to_read)
-                else:
-                    content = f.read()
-                    
-            return content
-                
-        except FileNotFoundError:
-            raise ValueError(f"File not found: {file_path}")
-        except IOError as e:
-            raise ValueError(f"Error reading file {file_path}: {str(e)}")
-    
-    def compare_content(self, content1, content2):
-        """
-        @brief Compare binary content efficiently
-        @param content1 bytes: First binary content to compare
-        @param content2 bytes: Second binary content to compare
-        @return tuple: (bool, list) - (identical, differences)
-        @details Performs efficient byte-level comparison of binary content.
-                 Reports differences with hex context and limits the number
-                 of differences to avoid overwhelming output.
-        """
-        self.logger.debug(f"Comparing binary content")
-        
-        if len(content1) != len(content2):
-            differences = [Difference(
-                position="file size",
-                expected=f"{len(content1)} bytes",
-                actual=f"{len(content2)} bytes",
-                diff_type="size"
-            )]
-            identical = False
-        elif content1 == content2:
-            differences = []
-            identical = True
-        else:
-            identical = False
-            differences = []
-            offset = 0
-            max_differences = 10  # Limit number of differences reported
-        
-            for i in range(0, len(content1), self.chunk_size):
-                chunk1 = content1[i:i+self.chunk_size]
-                chunk2 = content2[i:i+self.chunk_size]
-                
-                if chunk1 != chunk2:
-                    # Find the exact byte position where the difference starts
-                    for j in range(len(chunk1)):
-                        if j >= len(chunk2) or chunk1[j] != chunk2[j]:
-                            diff_pos = i + j
-                            # Show a few bytes before and after the difference for context
-                            context_size = 8
-                            start_ctx = max(0, diff_pos - context_size)
-                            end_ctx = min(len(content1), diff_pos + context_size)
-                            
-                            # Create hex representations of the differing sections
-                            expected_bytes = content1[start_ctx:end_ctx]
-                            actual_bytes = content2[start_ctx:min(len(content2), end_ctx)]
-                            
-                            expected_hex = ' '.join(f"{b:02x}" for b in expected_bytes)
-                            actual_hex = ' '.join(f"{b:02x}" for b in actual_bytes)
-                            
-                            differences.append(Difference(
-                                position=f"byte {diff_pos}",
-                                expected=expected_hex,
-                                actual=actual_hex,
-                                diff_type="content"
-                            ))
-                            break
-                            
-                    if len(differences) >= max_differences:
-                        differences.append(Difference(
-                            position=None,
-                            expected=None,
-                            actual=None,
-                            diff_type=f"more differences not shown"
-                        ))
-                        break
-        
-        return identical, differences
-
-    def compute_lcs_length(self, a: bytes, b: bytes) -> int:
-        """
-        @brief Compute the length of the longest common subsequence
-        @param a bytes: First binary sequence
-        @param b bytes: Second binary sequence
-        @return int: Length of the longest common subsequence
-        @details Uses dynamic programming with memory optimization to compute LCS.
-                 Supports parallel processing for large sequences.
-        """
-        if not a or not b:
-            return 0
-
-        def lcs_worker(start, end):
-            previous = [0] * (len(b) + 1)
-            for i in range(start, end):
-                current = [0] * (len(b) + 1)
-                for j in range(1, len(b) + 1):
-                    if a[i - 1] == b[j - 1]:
-                        current[j] = previous[j - 1] + 1
-                    else:
-                        current[j] = max(previous[j], current[j - 1])
-                previous = current
-            return previous[len(b)]
-
-        chunk_size = len(a) // self.num_threads
-        futures = []
-
-        with ThreadPoolExecutor(max_workers=self.num_threads) as executor:
-            for i in range(self.num_threads):
-                start = i * chunk_size
-                end = (i + 1) * chunk_size if i != self.num_threads - 1 else len(a)
-                futures.append(executor.submit(lcs_worker, start, end))
-
-        lcs_length = sum(f.result() for f in futures)
-        return lcs_length
-
-    def compare_files(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
-        """
-        @brief Compare two binary files with optional similarity calculation
-        @param file1 Path: Path to the first binary file
-        @param file2 Path: Path to the second binary file
-        @param start_line int: Starting byte offset
-        @param end_line int: Ending byte offset
-        @param start_column int: Ignored for binary files
-        @param end_column int: Ignored for binary files
-        @return ComparisonResult: Result object containing comparison details
-        """
-        from pathlib import Path
-        from .result import ComparisonResult
-        result = ComparisonResult(
-            file1=str(file1),
-            file2=str(file2),
-            start_line=start_line,
-            end_line=end_line,
-            start_column=start_column,
-            end_column=end_column
-        )
-        try:
-            self.logger.info(f"Comparing files: {file1} and {file2}")
-            file1_path = Path(file1)
-            file2_path = Path(file2)
-            result.file1_size = file1_path.stat().st_size
-            result.file2_size = file2_path.stat().st_size
-            self.logger.debug("Reading content from files")
-            content1 = self.read_content(file1, start_line, end_line, start_column, end_column)
-            content2 = self.read_content(file2, start_line, end_line, start_column, end_column)
-            self.logger.debug("Comparing content")
-            identical, differences = self.compare_content(content1, content2)
-            result.identical = identical
-            result.differences = differences
-            if self.similarity:
-                if (len(content1) + len(content2)) > 0:
-                    lcs_len = self.compute_lcs_length(content1, content2)
-                    similarity = 2 * lcs_len / (len(content1) + len(content2))
-                else:
-                    similarity = 1
-                result.similarity = similarity
-            return result
-        except Exception as e:
-            self.logger.error(f"Error during comparison: {str(e)}")
-            result.error = str(e)
-            result.identical = False
-            return result
-
-    def get_file_hash(self, file_path, chunk_size=8192):
-        """
-        @brief Calculate SHA-256 hash of a file efficiently
-        @param file_path Path: Path to the file to hash
-        @param chunk_size int: Size of chunks for reading large files
-        @return str: Hexadecimal representation of the file's SHA-256 hash
-        """
-        h = hashlib.sha256()
-        with open(file_path, 'rb') as f:
-            for chunk in iter(lambda: f.read(chunk_size), b''):
-                h.update(chunk)
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file binary_comparator.py
+@brief Binary file comparator implementation with efficient byte-level comparison
+@author Xiaotong Wang
+@date 2025
+"""
+
+import hashlib
+import os
+import numpy as np
+from .base_comparator import BaseComparator
+from .cdc import chunk_file, diff_chunks, trim_regions
+from .extents import data_extents, merge_extents
+from .lcs import lcs_length
+from .merkle import MERKLE_BLOCK, differing_blocks, load_tree
+from .numeric import new_error_statistics, numbers_close, update_error_statistics
+from .records import leaf_fields, map_records, parse_dtype, unwrap_records
+from .result import Difference
+from .sketch import MIN_SKETCH_HASHES, build_sketch, estimate_similarity, load_sketch
+
+# Byte ranges up to this size are compared exactly when their sketches are too sparse
+EXACT_SIMILARITY_BYTES = 1 << 16
+
+class BinaryComparator(BaseComparator):
+    """
+    @brief Comparator for binary files with efficient byte-level comparison
+    @details This class implements binary file comparison with support for:
+             - Byte-level difference detection, reported as runs of adjacent differing bytes
+             - Content-defined chunking diff that finds inserted, deleted, moved and
+               modified regions regardless of their offsets
+             - Merkle trees of block hashes, saved next to the files, to skip unchanged blocks
+             - Sparse file support: holes present in both files are skipped without reading
+             - Record mode: files of fixed-size structured records compared field by field
+               with tolerances
+             - Similarity index calculation using an exact bit-parallel LCS, or estimated
+               from MinHash sketches for files too large for it
+             - File hash calculation
+    """
+
+    # Bytes of a differing run shown in its Difference
+    MAX_RUN_BYTES = 16
+
+    # Bytes of records mapped and compared at once in record mode
+    RECORD_BLOCK_BYTES = 1 << 24
+    
+    def __init__(self, encoding="utf-8", chunk_size=8192, verbose=False, similarity=False, num_threads=4,
+                 max_differences=10, count_only=False, fail_fast=False, similarity_mode="exact",
+                 diff_mode="positional", merkle=False, record_dtype=None, header_bytes=0,
+                 fortran_records=False, rtol=1e-5, atol=1e-8, field_tolerances=None):
+        """
+        @brief Initialize the binary comparator
+        @param encoding str: File encoding (not used for binary files)
+        @param chunk_size int: Size of chunks for reading large files; average chunk size in "cdc" mode
+        @param verbose bool: Enable verbose logging
+        @param similarity bool: Enable similarity index calculation
+        @param num_threads int: Number of threads hashing the blocks of a Merkle tree
+        @param max_differences int: Number of differing chunks listed in the result
+        @param count_only bool: Only count the differing chunks, list none of them
+        @param fail_fast bool: Read both files chunk by chunk and stop at the first differing chunk;
+                    ignored in "cdc" mode
+        @param similarity_mode str: "exact" for the LCS-based index, "approx" to estimate it from sketches
+        @param diff_mode str: "positional" to compare bytes at equal offsets, "cdc" to match
+                              content-defined chunks wherever they are
+        @param merkle bool: Locate differing blocks of whole files through Merkle trees of block hashes
+        @param record_dtype str: Record specification (see parse_dtype()) that enables record mode
+        @param header_bytes int: Bytes before the first record, compared as raw bytes
+        @param fortran_records bool: Records are framed by Fortran sequential record markers
+        @param rtol float: Relative tolerance for floating-point fields in record mode
+        @param atol float: Absolute tolerance for floating-point fields in record mode
+        @param field_tolerances dict: Per-field (rtol, atol) overrides, keyed by dotted field name
+        @throws ValueError: If similarity_mode, diff_mode or record_dtype is not supported
+        """
+        super().__init__(encoding, chunk_size, verbose, max_differences, count_only, fail_fast)
+        if similarity_mode not in ("exact", "approx"):
+            raise ValueError(f"Unsupported similarity mode: {similarity_mode}")
+        if diff_mode not in ("positional", "cdc"):
+            raise ValueError(f"Unsupported diff mode: {diff_mode}")
+        self.similarity = similarity
+        self.similarity_mode = similarity_mode
+        self.diff_mode = diff_mode
+        self.merkle = merkle
+        self.record_dtype = None if record_dtype is None else parse_dtype(record_dtype)
+        self.header_bytes = header_bytes
+        self.fortran_records = fortran_records
+        self.rtol = rtol
+        self.atol = atol
+        self.field_tolerances = field_tolerances or {}
+        if self.record_dtype is not None:
+            names = {".".join(path) for path in leaf_fields(self.record_dtype)}
+            unknown = sorted(set(self.field_tolerances) - names)
+            if unknown:
+                raise ValueError(f"Tolerances given for unknown record fields: {', '.join(unknown)}")
+        self.field_statistics = None  # Per-field mismatch statistics of the last record comparison
+        self.num_threads = num_threads
+        self.differing_bytes = None  # Number of differing bytes found by the last comparison
+        if fail_fast and diff_mode == "cdc" and self.record_dtype is None:
+            # Both files are chunked whole before any region is known, so there is nothing
+            # to stop early; report every region instead of claiming an early stop
+            self.logger.warning("Fail-fast is not supported by the cdc diff, comparing the whole files")
+            self.fail_fast = False
+
+    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Read binary content with specified range
+        @param file_path Path: Path to the binary file to read
+        @param start_line int: Starting byte offset (interpreted as bytes for binary files)
+        @param end_line int: Ending byte offset (interpreted as bytes for binary files)
+        @param start_column int: Ignored for binary files
+        @param end_column int: Ignored for binary files
+        @return bytes: Binary content within the specified range
+        @throws ValueError: If byte offsets are invalid
+        @throws FileNotFoundError: If file doesn't exist
+        @throws IOError: If there are other file reading errors
+        """
+        try:
+            self.logger.debug(f"Reading binary file: {file_path}")
+            
+            # For binary files, interpret start_line as byte offset
+            start_offset = start_line
+            end_offset = end_line
+            
+            with open(file_path, 'rb') as f:
+                if start_offset > 0:
+                    f.seek(start_offset)
+                
+                if end_offset is not None:
+                    if end_offset <= start_offset:
+                        raise ValueError("End offset must be greater than start offset")
+                    bytes_to_read = end_offset - start_offset
+                    content = f.read(bytes_to_read)
+                else:
+                    content = f.read()
+                    
+            return content
+                
+        except FileNotFoundError:
+            raise ValueError(f"File not found: {file_path}")
+        except IOError as e:
+            raise ValueError(f"Error reading file {file_path}: {str(e)}")
+    
+    def compare_content(self, content1, content2):
+        """
+        @brief Compare binary content efficiently
+        @param content1 bytes: First binary content to compare
+        @param content2 bytes: Second binary content to compare
+        @return tuple: (bool, list) - (identical, differences)
+        @details Performs efficient byte-level comparison of binary content. The content
+                 is scanned in chunk_size slices by _compare_chunks(), which reports runs
+                 of adjacent differing bytes.
+        """
+        self.logger.debug(f"Comparing binary content")
+        
+        if len(content1) != len(content2):
+            differences = [Difference(
+                position="file size",
+                expected=f"{len(content1)} bytes",
+                actual=f"{len(content2)} bytes",
+                diff_type="size"
+            )]
+            return False, differences
+        if content1 == content2:
+            self.differing_bytes = 0
+            return True, []
+
+        chunks = ((offset, content1[offset:offset + self.chunk_size], content2[offset:offset + self.chunk_size])
+                  for offset in range(0, len(content1), self.chunk_size))
+        return self._compare_chunks(chunks)
+
+    def compare_paths(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Compare two binary files by streaming them in lockstep
+        @param file1 Path: Path to the first binary file
+        @param file2 Path: Path to the second binary file
+        @param start_line int: Starting byte offset
+        @param end_line int: Ending byte offset
+        @param start_column int: Ignored for binary files
+        @param end_column int: Ignored for binary files
+        @return tuple: (bool, list) - (identical, differences)
+        @details The sizes of the selected ranges are compared first. Both files are then
+                 read chunk_size bytes at a time into two preallocated buffers with
+                 readinto(), so memory use is two chunks whatever the file size, and the
+                 chunks are handed to _compare_chunks(). In "cdc" mode the files are
+                 compared by _compare_regions() instead.
+
+                 With merkle enabled, whole files of equal size are first compared
+                 through their Merkle trees (see load_tree()). Trees are hashed in
+                 parallel and saved next to the files, so an unchanged baseline is not
+                 read again, and only the blocks under differing subtrees are read and
+                 scanned. Otherwise only the data extents of the two files are read
+                 (see data_extents()): a range that is a hole in both is equal.
+
+                 In record mode the files are compared record by record by
+                 _compare_records() and the offsets select records instead of bytes.
+        """
+        if start_line < 0:
+            raise ValueError("Start offset cannot be negative")
+        if end_line is not None and end_line <= start_line:
+            raise ValueError("End offset must be greater than start offset")
+        if self.record_dtype is not None:
+            return self._compare_records(file1, file2, start_line, end_line)
+        if self.diff_mode == "cdc":
+            return self._compare_regions(file1, file2, start_line, end_line)
+
+        def range_size(file_path):
+            try:
+                size = os.path.getsize(file_path)
+            except FileNotFoundError:
+                raise ValueError(f"File not found: {file_path}")
+            return max(0, (size if end_line is None else min(size, end_line)) - start_line)
+
+        size1, size2 = range_size(file1), range_size(file2)
+        if size1 != size2:
+            return False, self._limit_differences([Difference(
+                position="file size",
+                expected=f"{size1} bytes",
+                actual=f"{size2} bytes",
+                diff_type="size"
+            )])
+
+        ranges = [(start_line, size1)]
+        if self.merkle and start_line == 0 and end_line is None:
+            self.logger.debug(f"Comparing Merkle trees of {file1} and {file2}")
+            blocks = differing_blocks(load_tree(file1, MERKLE_BLOCK, self.num_threads),
+                                      load_tree(file2, MERKLE_BLOCK, self.num_threads))
+            if not len(blocks):
+                self.differing_bytes = 0
+                return True, []
+            # Merge adjacent differing blocks into ranges
+            breaks = np.flatnonzero(np.diff(blocks) != 1) + 1
+            ranges = [(first * MERKLE_BLOCK, min((last + 1) * MERKLE_BLOCK, size1) - first * MERKLE_BLOCK)
+                      for first, last in zip(blocks[np.concatenate(([0], breaks))].tolist(),
+                                             blocks[np.concatenate((breaks - 1, [len(blocks) - 1]))].tolist())]
+        else:
+            extents1 = data_extents(file1, start_line, start_line + size1)
+            extents2 = data_extents(file2, start_line, start_line + size1)
+            if extents1 is not None and extents2 is not None:
+                ranges = [(start, end - start) for start, end in merge_extents(extents1, extents2)]
+
+        def read_chunks(f1, f2, view1, view2):
+            for range_start, range_size in ranges:
+                f1.seek(range_start)
+                f2.seek(range_start)
+                for offset in range(range_start, range_start + range_size, self.chunk_size):
+                    length = min(self.chunk_size, range_start + range_size - offset)
+                    if f1.readinto(view1[:length]) != length or f2.readinto(view2[:length]) != length:
+                        raise ValueError(f"Files changed while comparing {file1} and {file2}")
+                    if length == self.chunk_size:
+                        yield offset, buffer1, buffer2
+                    else:
+                        yield offset, bytes(view1[:length]), bytes(view2[:length])
+                # An equal (empty) pair ends the range, so no run is carried over the gap to the next one
+                yield range_start + range_size, b"", b""
+
+        self.logger.debug(f"Streaming {sum(size for _, size in ranges)} bytes in chunks of {self.chunk_size}")
+        buffer1 = bytearray(self.chunk_size)
+        buffer2 = bytearray(self.chunk_size)
+        with open(file1, 'rb') as f1, open(file2, 'rb') as f2, \
+                memoryview(buffer1) as view1, memoryview(buffer2) as view2:
+            return self._compare_chunks(read_chunks(f1, f2, view1, view2))
+
+    def _compare_records(self, file1, file2, start, end):
+        """
+        @brief Compare two files of structured records field by field
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start int: First record to compare
+        @param end int: End of the records to compare (exclusive, None for all)
+        @return tuple: (bool, list) - (identical, differences)
+        @details Both files are memory-mapped as arrays of records (see map_records()) and
+                 compared RECORD_BLOCK_BYTES at a time, so memory use stays bounded
+                 whatever the file size. Every leaf field of a block is compared in one
+                 vectorized operation: floating-point fields with np.isclose and the field's
+                 tolerances, all others exactly. Every differing field element counts as a
+                 difference, listed as "record N, field F[i]". Mismatch counts and the
+                 largest absolute and relative errors per field are kept in
+                 field_statistics. The headers are compared as raw bytes, and files
+                 with different numbers of records are compared over the common ones.
+                 With Fortran markers, a record is one WRITE statement of the files, for
+                 the range, the counts and the positions alike; a WRITE holding several
+                 records of the dtype lists them as "record N, item K, field F[i]".
+        """
+        differences = []
+        limit = self.difference_limit
+        total = 0
+        fields = leaf_fields(self.record_dtype)
+        statistics = {".".join(path): new_error_statistics() for path in fields}
+        self.field_statistics = statistics
+
+        if self.header_bytes:
+            with open(file1, 'rb') as f1, open(file2, 'rb') as f2:
+                header1, header2 = f1.read(self.header_bytes), f2.read(self.header_bytes)
+            if header1 != header2:
+                total += 1
+                differences.append(Difference(position="header", expected=header1.hex(' '),
+                                              actual=header2.hex(' '), diff_type="content"))
+                if self.fail_fast:
+                    return False, self._limit_differences(differences)
+
+        entries1, layout1 = map_records(file1, self.record_dtype, self.header_bytes, self.fortran_records)
+        entries2, layout2 = map_records(file2, self.record_dtype, self.header_bytes, self.fortran_records)
+        if layout1 != layout2:
+            raise ValueError(f"Fortran records of {file1} and {file2} have different lengths")
+        count1 = max(0, (len(entries1) if end is None else min(end, len(entries1))) - start)
+        count2 = max(0, (len(entries2) if end is None else min(end, len(entries2))) - start)
+        if count1 != count2:
+            total += 1
+            differences.append(Difference(position="record count", expected=f"{count1} records",
+                                          actual=f"{count2} records", diff_type="size"))
+        per_entry = layout1.fields['data'][0].shape[0] if self.fortran_records else 1
+        stop = start + min(count1, count2)
+        block = max(1, self.RECORD_BLOCK_BYTES // layout1.itemsize)
+
+        for first in range(start, stop, block):
+            records1 = unwrap_records(entries1[first:min(first + block, stop)], self.fortran_records, file1, first)
+            records2 = unwrap_records(entries2[first:min(first + block, stop)], self.fortran_records, file2, first)
+            found = []  # (record, field number, element) of the differences listed from this block
+            for number, path in enumerate(fields):
+                values1, values2 = records1, records2
+                for name in path:
+                    values1, values2 = values1[name], values2[name]
+                mismatch = self._field_mismatch(".".join(path), values1, values2)
+                flat = np.flatnonzero(mismatch)
+                if not len(flat):
+                    continue
+                total += len(flat)
+                update_error_statistics(statistics[".".join(path)], values1[mismatch], values2[mismatch])
+                for index in flat[:max(0, limit - len(differences))].tolist():
+                    record, element = divmod(index, mismatch[0].size)
+                    found.append((record, number, element))
+            for record, number, element in sorted(found)[:max(0, limit - len(differences))]:
+                differences.append(self._record_difference(records1, records2, record, fields[number], element,
+                                                           first, per_entry))
+            if self.fail_fast and total:
+                break
+
+        if not total:
+            return True, []
+        return False, self._limit_differences(differences, total)
+
+    def _field_mismatch(self, name, values1, values2):
+        """
+        @brief Compare one field of two blocks of records
+        @param name str: Dotted field name, used to look up its tolerances
+        @param values1 np.ndarray: Field values of the first file, one row per record
+        @param values2 np.ndarray: Field values of the second file
+        @return np.ndarray: Boolean array of the values' shape, True where they differ
+        @details Values are compared exactly first; the tolerance check, which is several
+                 times slower, only runs on the values that are not bit-for-bit equal.
+        """
+        mismatch = values1 != values2
+        if values1.dtype.kind in 'fc':
+            candidates = np.flatnonzero(mismatch)
+            if len(candidates):
+                rtol, atol = self.field_tolerances.get(name, (self.rtol, self.atol))
+                close = numbers_close(values1.reshape(-1)[candidates], values2.reshape(-1)[candidates],
+                                      rtol=rtol, atol=atol)
+                mismatch.reshape(-1)[candidates[close]] = False
+        return mismatch
+
+    def _record_difference(self, records1, records2, record, path, element, base, per_entry=1):
+        """
+        @brief Describe a differing field element
+        @param records1 np.ndarray: Block of records of the first file
+        @param records2 np.ndarray: Block of records of the second file
+        @param record int: Index of the record in the block
+        @param path tuple: Field names down to the leaf field
+        @param element int: Flat index of the element within an array field
+        @param base int: Number of the first entry of the block (Fortran record in Fortran mode)
+        @param per_entry int: Records of the dtype in one entry
+        @return Difference: Content difference at "record N, field F[i]", with ", item K"
+                after N if an entry holds several records
+        """
+        value1, value2 = records1[record], records2[record]
+        for name in path:
+            value1, value2 = value1[name], value2[name]
+        entry, item = divmod(record, per_entry)
+        position = f"record {base + entry}"
+        if per_entry > 1:
+            position += f", item {item}"
+        position += f", field {'.'.join(path)}"
+        if np.ndim(value1):
+            index = np.unravel_index(element, np.shape(value1))
+            position += f"[{','.join(str(i) for i in index)}]"
+            value1, value2 = value1[index], value2[index]
+        return Difference(position=position, expected=str(value1), actual=str(value2), diff_type="content")
+
+    def _compare_regions(self, file1, file2, start, end):
+        """
+        @brief Compare two byte ranges by matching content-defined chunks
+        @param file1 Path: Path to the first binary file
+        @param file2 Path: Path to the second binary file
+        @param start int: Starting byte offset
+        @param end int: Ending byte offset (None for end of file)
+        @return tuple: (bool, list) - (identical, differences)
+        @details Both ranges are split into chunks of chunk_size bytes on average whose
+                 boundaries depend on the content only (see chunk_file()), so an inserted
+                 byte shifts the offsets of the following chunks without changing them.
+                 Identical chunks are matched by digest wherever they are, and the unmatched
+                 and out-of-order ones become inserted, deleted, modified and moved regions,
+                 refined to byte precision. Each file is read once, and then only around
+                 the edges of the regions.
+        """
+        for file_path in (file1, file2):
+            if not os.path.exists(file_path):
+                raise ValueError(f"File not found: {file_path}")
+        self.logger.debug(f"Chunking both files with an average chunk size of {self.chunk_size}")
+        regions = diff_chunks(chunk_file(file1, start, end, self.chunk_size),
+                              chunk_file(file2, start, end, self.chunk_size))
+        regions = trim_regions(file1, file2, regions)
+        if not regions:
+            return True, []
+
+        differences = []
+        with open(file1, 'rb') as f1, open(file2, 'rb') as f2:
+            for kind, start1, length1, start2, length2 in regions[:self.difference_limit]:
+                f1.seek(start1)
+                f2.seek(start2)
+                bytes1 = f1.read(min(length1, self.MAX_RUN_BYTES))
+                bytes2 = f2.read(min(length2, self.MAX_RUN_BYTES))
+                differences.append(self._region_difference(kind, start1, length1, start2, length2, bytes1, bytes2))
+        return False, self._limit_differences(differences, len(regions))
+
+    def _region_difference(self, kind, start1, length1, start2, length2, bytes1, bytes2):
+        """
+        @brief Describe a region found by the content-defined chunking diff
+        @param kind str: "deleted", "inserted", "modified" or "moved"
+        @param start1 int: Offset of the region in the first file
+        @param length1 int: Length of the region in the first file
+        @param start2 int: Offset of the region in the second file
+        @param length2 int: Length of the region in the second file
+        @param bytes1 bytes: Up to MAX_RUN_BYTES bytes of the region in the first file
+        @param bytes2 bytes: Up to MAX_RUN_BYTES bytes of the region in the second file
+        @return Difference: Deleted bytes are missing at their offset in the first file,
+                inserted bytes extra at their offset in the second file
+        """
+        def preview(data, length):
+            return ' '.join(f"{b:02x}" for b in data) + (" ..." if length > len(data) else "")
+
+        span1 = self._byte_span(start1, length1)
+        if kind == "deleted":
+            return Difference(position=span1, expected=preview(bytes1, length1), diff_type="missing")
+        if kind == "inserted":
+            return Difference(position=self._byte_span(start2, length2), actual=preview(bytes2, length2),
+                              diff_type="extra")
+        if kind == "moved":
+            return Difference(position=span1, actual=f"byte {start2}", diff_type="moved")
+        if length1 != length2:
+            span1 += f", now {self._byte_span(start2, length2)}"
+        elif start1 != start2:
+            span1 += f", now at byte {start2}"
+        return Difference(position=span1, expected=preview(bytes1, length1), actual=preview(bytes2, length2),
+                          diff_type="content")
+
+    @staticmethod
+    def _byte_span(start, length):
+        """
+        @brief Format a range of bytes
+        @param start int: Offset of the first byte
+        @param length int: Number of bytes
+        @return str: "byte N" for a single byte, "bytes A-B (L bytes)" otherwise
+        """
+        return f"byte {start}" if length == 1 else f"bytes {start}-{start + length - 1} ({length} bytes)"
+
+    def _compare_chunks(self, chunks):
+        """
+        @brief Find the runs of differing bytes in a sequence of aligned chunks
+        @param chunks iterable: (offset, chunk1, chunk2) tuples of equal-length byte buffers
+        @return tuple: (bool, list) - (identical, differences)
+        @details Equal chunks are skipped with a plain buffer comparison. Inside a differing
+                 chunk every mismatching offset is found with one vectorized != and the
+                 offsets are merged into (start, length) runs, carrying a run that touches
+                 the end of a chunk over into the next one together with its preview bytes,
+                 so the report does not depend on the chunk size. Every run counts as one
+                 difference; Difference objects are built for the first max_differences
+                 runs and the number of differing bytes is kept in differing_bytes. In
+                 fail-fast mode scanning stops after the first differing chunk.
+        """
+        differences = []
+        limit = self.difference_limit
+        runs = 0
+        differing = 0
+        open_run = None  # [start, length, bytes1, bytes2] of a run reaching the end of the last chunk
+
+        def finish(run):
+            if len(differences) < limit:
+                differences.append(self._run_difference(*run))
+
+        for offset, chunk1, chunk2 in chunks:
+            if chunk1 == chunk2:
+                if open_run is not None:
+                    finish(open_run)
+                    open_run = None
+                continue
+
+            length = len(chunk1)
+            mismatch = np.flatnonzero(np.frombuffer(chunk1, dtype=np.uint8) != np.frombuffer(chunk2, dtype=np.uint8))
+            differing += len(mismatch)
+            breaks = np.flatnonzero(np.diff(mismatch) > 1) + 1
+            starts = mismatch[np.concatenate(([0], breaks))].tolist()
+            stops = (mismatch[np.concatenate((breaks - 1, [len(mismatch) - 1]))] + 1).tolist()
+
+            first = 0
+            if open_run is not None:
+                if starts[0] == 0:
+                    # The run of the previous chunk continues here; complete its preview
+                    open_run[1] += stops[0]
+                    missing = self.MAX_RUN_BYTES - len(open_run[2])
+                    if missing > 0:
+                        open_run[2] += bytes(chunk1[:missing])
+                        open_run[3] += bytes(chunk2[:missing])
+                    first = 1
+                if first == 0 or stops[0] < length:
+                    finish(open_run)
+                    open_run = None
+
+            runs += len(starts) - first
+            closed = len(starts) - 1 if stops[-1] == length else len(starts)
+            for k in range(first, min(closed, first + max(0, limit - len(differences)))):
+                finish((offset + starts[k], stops[k] - starts[k],
+                        chunk1[starts[k]:starts[k] + self.MAX_RUN_BYTES],
+                        chunk2[starts[k]:starts[k] + self.MAX_RUN_BYTES]))
+            if closed < len(starts) and closed >= first:
+                start = starts[-1]
+                open_run = [offset + start, length - start,
+                            bytes(chunk1[start:start + self.MAX_RUN_BYTES]),
+                            bytes(chunk2[start:start + self.MAX_RUN_BYTES])]
+
+            if self.fail_fast:
+                break
+
+        if open_run is not None:
+            finish(open_run)
+        self.differing_bytes = differing
+        if not runs:
+            return True, []
+        return False, self._limit_differences(differences, runs)
+
+    def _run_difference(self, start, length, bytes1, bytes2):
+        """
+        @brief Describe a run of differing bytes
+        @param start int: File offset of the first differing byte
+        @param length int: Number of adjacent differing bytes
+        @param bytes1 bytes: Bytes of the first file from the start of the run
+        @param bytes2 bytes: Bytes of the second file from the start of the run
+        @return Difference: Content difference with the hex of up to MAX_RUN_BYTES bytes of the run
+        """
+        shown = min(length, self.MAX_RUN_BYTES, len(bytes1))
+        more = " ..." if length > shown else ""
+        return Difference(
+            position=self._byte_span(start, length),
+            expected=' '.join(f"{b:02x}" for b in bytes1[:shown]) + more,
+            actual=' '.join(f"{b:02x}" for b in bytes2[:shown]) + more,
+            diff_type="content"
+        )
+
+    def compute_lcs_length(self, a: bytes, b: bytes) -> int:
+        """
+        @brief Compute the length of the longest common subsequence
+        @param a bytes: First binary sequence
+        @param b bytes: Second binary sequence
+        @return int: Exact length of the longest common subsequence
+        @details Delegates to lcs_length(), which strips common ends and uses an O(ND)
+                 search for similar inputs and a bit-parallel algorithm otherwise.
+        """
+        return lcs_length(a, b)
+
+    def estimate_similarity(self, file1, file2, start_line=0, end_line=None):
+        """
+        @brief Estimate the similarity index of two byte ranges from MinHash sketches
+        @param file1 Path: Path to the first binary file
+        @param file2 Path: Path to the second binary file
+        @param start_line int: Starting byte offset
+        @param end_line int: Ending byte offset
+        @return tuple: (float, float) - Estimated similarity and the half-width of its 95%
+                interval, which is None when the similarity was computed exactly
+        @details Each range is read once in a single streaming pass. Sketches of whole files
+                 are saved next to them and reused while the files are unchanged, so
+                 comparing one file against many others sketches it only once.
+                 Short or low-entropy data has too few anchors for a useful sketch: ranges
+                 of up to EXACT_SIMILARITY_BYTES are then compared exactly, longer ones are
+                 sketched again with a shingle at every position.
+        """
+        if start_line == 0 and end_line is None:
+            sketch1, sketch2 = load_sketch(file1), load_sketch(file2)
+        else:
+            sketch1 = build_sketch(file1, start_line, end_line)
+            sketch2 = build_sketch(file2, start_line, end_line)
+        if min(len(sketch1), len(sketch2)) >= MIN_SKETCH_HASHES:
+            return estimate_similarity(sketch1, sketch2)
+
+        sizes = [os.path.getsize(path) for path in (file1, file2)]
+        if end_line is not None:
+            sizes = [min(size, end_line) for size in sizes]
+        sizes = [max(0, size - start_line) for size in sizes]
+        if max(sizes) <= EXACT_SIMILARITY_BYTES:
+            self.logger.info("Sketches too sparse for an estimate, computing the exact similarity index")
+            content1 = self.read_content(file1, start_line, end_line)
+            content2 = self.read_content(file2, start_line, end_line)
+            if not content1 and not content2:
+                return 1.0, None
+            return 2 * self.compute_lcs_length(content1, content2) / (len(content1) + len(content2)), None
+
+        self.logger.info("Sketches too sparse for an estimate, hashing the shingles at every position")
+        sketch1 = build_sketch(file1, start_line, end_line, dense=True)
+        sketch2 = build_sketch(file2, start_line, end_line, dense=True)
+        return estimate_similarity(sketch1, sketch2)
+
+    def compare_files(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Compare two binary files with optional similarity calculation
+        @param file1 Path: Path to the first binary file
+        @param file2 Path: Path to the second binary file
+        @param start_line int: Starting byte offset
+        @param end_line int: Ending byte offset
+        @param start_column int: Ignored for binary files
+        @param end_column int: Ignored for binary files
+        @return ComparisonResult: Result object containing comparison details
+        """
+        from pathlib import Path
+        from .result import ComparisonResult
+        result = ComparisonResult(
+            file1=str(file1),
+            file2=str(file2),
+            start_line=start_line,
+            end_line=end_line,
+            start_column=start_column,
+            end_column=end_column
+        )
+        try:
+            self.logger.info(f"Comparing files: {file1} and {file2}")
+            file1_path = Path(file1)
+            file2_path = Path(file2)
+            result.file1_size = file1_path.stat().st_size
+            result.file2_size = file2_path.stat().st_size
+            self.difference_count = None
+            self.differing_bytes = None
+            self.field_statistics = None
+            if self.similarity and self.similarity_mode == "exact":
+                self.logger.debug("Reading content from files")
+                content1 = self.read_content(file1, start_line, end_line, start_column, end_column)
+                content2 = self.read_content(file2, start_line, end_line, start_column, end_column)
+            if self.similarity and self.similarity_mode == "exact" and self.diff_mode == "positional":
+                self.logger.debug("Comparing content")
+                identical, differences = self.compare_content(content1, content2)
+            else:
+                identical, differences = self.compare_paths(file1, file2, start_line, end_line, start_column, end_column)
+            result.identical = identical
+            result.differences = differences
+            result.total_differences = self.difference_count
+            result.stopped_early = self.fail_fast and not identical
+            if self.record_dtype is not None:
+                result.range_unit = "records"
+            result.differing_bytes = self.differing_bytes
+            result.field_statistics = self.field_statistics
+            if self.similarity and self.similarity_mode == "approx":
+                result.similarity, result.similarity_error = self.estimate_similarity(file1, file2, start_line, end_line)
+            elif self.similarity:
+                if (len(content1) + len(content2)) > 0:
+                    lcs_len = self.compute_lcs_length(content1, content2)
+                    similarity = 2 * lcs_len / (len(content1) + len(content2))
+                else:
+                    similarity = 1
+                result.similarity = similarity
+            return result
+        except Exception as e:
+            self.logger.error(f"Error during comparison: {str(e)}")
+            result.error = str(e)
+            result.identical = False
+            return result
+
+    def get_file_hash(self, file_path, chunk_size=MERKLE_BLOCK):
+        """
+        @brief Calculate SHA-256 hash of a file efficiently
+        @param file_path Path: Path to the file to hash
+        @param chunk_size int: Size of chunks for reading large files
+        @return str: Hexadecimal representation of the file's SHA-256 hash
+        """
+        h = hashlib.sha256()
+        with open(file_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(chunk_size), b''):
+                h.update(chunk)
         return h.hexdigest()
\ No newline at end of file
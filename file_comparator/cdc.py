@@ -0,0 +1,356 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file cdc.py
+@brief Content-defined chunking (FastCDC) and chunk matching for offset-independent binary diffs
+@author Xiaotong Wang
+@date 2025
+"""
+
+import bisect
+import hashlib
+import os
+import numpy as np
+
+# Smallest average chunk size accepted; the minimum chunk must cover a full gear hash window
+MIN_AVERAGE_CHUNK = 256
+
+# Size of the blocks a file is read in
+_READ_BLOCK = 1 << 24
+
+# Bytes read at a time while trimming the common ends of a modified region
+_TRIM_STEP = 1 << 16
+
+# Width of the gear hash window in bytes; byte i - k enters the hash shifted left by k bits
+_WINDOW = 32
+
+def _gear_hashes(block):
+    """
+    @brief Compute the gear rolling hash at every offset of a block
+    @param block np.ndarray: uint8 data
+    @return np.ndarray: uint32 hashes; entry i covers bytes i - 31 to i
+    @details The gear value G[b] of a byte is a fixed 32-bit mix of its value, computed
+             arithmetically because that is faster than a table lookup per byte. The
+             rolling update h = (h << 1) + G[b] is unrolled into
+             h[i] = sum(G[b[i - k]] << k for k < 32), which is built by doubling the
+             window five times: h2w[i] = (hw[i - w] << w) + hw[i]. The first 31 entries
+             cover fewer bytes and are never used as cut points.
+    """
+    hashes = block.astype(np.uint32)
+    hashes += np.uint32(1)
+    hashes *= np.uint32(0x9E3779B1)
+    hashes ^= hashes >> np.uint32(15)
+    hashes *= np.uint32(0x85EBCA6B)
+
+    shifted = np.empty_like(hashes)
+    width = 1
+    while width < _WINDOW:
+        np.left_shift(hashes[:-width], np.uint32(width), out=shifted[width:])
+        np.add(hashes[width:], shifted[width:], out=hashes[width:])
+        width *= 2
+    return hashes
+
+def _cut_bounds(average):
+    """
+    @brief Build the normalized-chunking thresholds for an average chunk size
+    @param average int: Target average chunk size, rounded to a power of two
+    @return tuple: (int, int) - Bounds for the strict test used below the average size and
+            the loose test used above it
+    @details An offset passes a test when its hash is below the bound, i.e. its high bits
+             are zero; the high bits depend on the whole window. Two bits more before the
+             average and two bits fewer after it narrow the chunk size distribution
+             (FastCDC normalization level 2).
+    """
+    bits = max(average, MIN_AVERAGE_CHUNK).bit_length() - 1
+    return 1 << (32 - (bits + 2)), 1 << (32 - (bits - 2))
+
+def chunk_file(file_path, start=0, end=None, average=8192):
+    """
+    @brief Split a byte range of a file into content-defined chunks
+    @param file_path Path: File to chunk
+    @param start int: First byte of the range
+    @param end int: End of the range (exclusive, None for end of file)
+    @param average int: Target average chunk size (rounded down to a power of two, at least MIN_AVERAGE_CHUNK)
+    @return tuple: (np.ndarray, np.ndarray, np.ndarray) - int64 offsets, int64 lengths and uint64 digests
+    @details FastCDC: after a cut, the next one is the first offset past average / 4 bytes
+             whose gear hash passes the strict test of _cut_bounds(), or past average bytes
+             the loose one, and at most 8 * average bytes after it. Cut points
+             depend only on the bytes just before them, so an insertion changes the chunks
+             around it and leaves all others intact. Candidate offsets are found with
+             vectorized tests per block; only the walk from cut to cut is a loop.
+             Chunks are identified by a 64-bit BLAKE2b digest.
+    """
+    average = 1 << (max(average, MIN_AVERAGE_CHUNK).bit_length() - 1)
+    minimum, maximum = average // 4, average * 8
+    strict, loose = (np.uint32(bound) for bound in _cut_bounds(average))
+
+    offsets, lengths, digests = [], [], []
+    carry = b""
+    base = start  # File offset of the first byte of carry
+    remaining = None if end is None else max(0, end - start)
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        at_end = False
+        while not at_end:
+            data = f.read(_READ_BLOCK if remaining is None else min(_READ_BLOCK, remaining))
+            if remaining is not None:
+                remaining -= len(data)
+            at_end = not data or remaining == 0
+            block = carry + data
+            n = len(block)
+            hashes = _gear_hashes(np.frombuffer(block, dtype=np.uint8))
+            # Every strict candidate is also a loose one
+            loose_cuts = np.flatnonzero(hashes < loose)
+            strict_cuts = loose_cuts[hashes[loose_cuts] < strict]
+            del hashes
+
+            chunk_start = 0
+            while chunk_start < n:
+                # Index of the last byte of the chunk, or None if more data is needed
+                low = chunk_start + minimum - 1
+                middle = chunk_start + average - 1
+                high = chunk_start + maximum - 1
+                k = np.searchsorted(strict_cuts, low)
+                if k < len(strict_cuts) and strict_cuts[k] < min(middle, n):
+                    cut = int(strict_cuts[k])
+                elif middle >= n:
+                    cut = n - 1 if at_end else None
+                else:
+                    k = np.searchsorted(loose_cuts, middle)
+                    if k < len(loose_cuts) and loose_cuts[k] <= min(high, n - 1):
+                        cut = int(loose_cuts[k])
+                    elif high < n:
+                        cut = high
+                    else:
+                        cut = n - 1 if at_end else None
+                if cut is None:
+                    break
+                offsets.append(base + chunk_start)
+                lengths.append(cut + 1 - chunk_start)
+                digests.append(hashlib.blake2b(memoryview(block)[chunk_start:cut + 1], digest_size=8).digest())
+                chunk_start = cut + 1
+            carry = block[chunk_start:]
+            base += chunk_start
+
+    return (np.array(offsets, dtype=np.int64), np.array(lengths, dtype=np.int64),
+            np.frombuffer(b"".join(digests), dtype=np.uint64))
+
+def _occurrence_ranks(digests):
+    """
+    @brief Number the repeated occurrences of every digest
+    @param digests np.ndarray: Chunk digests in file order
+    @return np.ndarray: For every chunk, how many earlier chunks have the same digest
+    """
+    order = np.argsort(digests, kind='stable')
+    ordered = digests[order]
+    group_start = np.flatnonzero(np.concatenate(([True], ordered[1:] != ordered[:-1])))
+    sizes = np.diff(np.append(group_start, len(ordered)))
+    ranks = np.empty(len(digests), dtype=np.int64)
+    ranks[order] = np.arange(len(ordered)) - np.repeat(group_start, sizes)
+    return ranks
+
+def _match_chunks(digests1, digests2):
+    """
+    @brief Pair identical chunks of two files regardless of their offsets
+    @param digests1 np.ndarray: Chunk digests of the first file
+    @param digests2 np.ndarray: Chunk digests of the second file
+    @return np.ndarray: For every chunk of the first file, the index of its partner in the second file or -1
+    @details The k-th occurrence of a digest in one file is paired with its k-th occurrence
+             in the other, found by one sort of the (digest, rank) keys of both files.
+    """
+    partner = np.full(len(digests1), -1, dtype=np.int64)
+    if not len(digests1) or not len(digests2):
+        return partner
+    digests = np.concatenate((digests1, digests2))
+    ranks = np.concatenate((_occurrence_ranks(digests1), _occurrence_ranks(digests2)))
+    source = np.concatenate((np.zeros(len(digests1), dtype=np.int8), np.ones(len(digests2), dtype=np.int8)))
+    index = np.concatenate((np.arange(len(digests1)), np.arange(len(digests2))))
+    order = np.lexsort((source, ranks, digests))
+    digests, ranks, source, index = digests[order], ranks[order], source[order], index[order]
+    # A chunk of the first file directly followed by the same key from the second file
+    pair = np.flatnonzero((source[:-1] == 0) & (source[1:] == 1) &
+                          (digests[:-1] == digests[1:]) & (ranks[:-1] == ranks[1:]))
+    partner[index[pair]] = index[pair + 1]
+    return partner
+
+def _in_order(values):
+    """
+    @brief Find a longest increasing subsequence
+    @param values list: Distinct integers
+    @return np.ndarray: Boolean mask of the values that belong to it
+    @details Patience sorting, O(n log n).
+    """
+    tails, tail_index = [], []
+    previous = [-1] * len(values)
+    for i, value in enumerate(values):
+        k = bisect.bisect_left(tails, value)
+        if k == len(tails):
+            tails.append(value)
+            tail_index.append(i)
+        else:
+            tails[k] = value
+            tail_index[k] = i
+        previous[i] = tail_index[k - 1] if k else -1
+    keep = np.zeros(len(values), dtype=bool)
+    i = tail_index[-1] if tail_index else -1
+    while i >= 0:
+        keep[i] = True
+        i = previous[i]
+    return keep
+
+def diff_chunks(chunks1, chunks2):
+    """
+    @brief Describe how the second file was derived from the first, in terms of chunks
+    @param chunks1 tuple: Offsets, lengths and digests of the chunks of the first file (see chunk_file)
+    @param chunks2 tuple: Offsets, lengths and digests of the chunks of the second file
+    @return list: (kind, start1, length1, start2, length2) regions ordered by position in the
+            first file, kind being "deleted", "inserted", "modified" or "moved"
+    @details Matched chunks whose order agrees in both files (a longest increasing
+             subsequence of partner indices) are unchanged and anchor the alignment. The
+             other matched chunks were moved; adjacent ones are merged. Between two anchors,
+             unmatched chunks of only the first file were deleted, of only the second file
+             inserted, and of both files modified. An inserted region has length1 0 and the
+             offset in the first file it was inserted at, a deleted region likewise in the
+             second file.
+    """
+    offsets1, lengths1, digests1 = chunks1
+    offsets2, lengths2, digests2 = chunks2
+    size1 = int(offsets1[-1] + lengths1[-1]) if len(offsets1) else 0
+    size2 = int(offsets2[-1] + lengths2[-1]) if len(offsets2) else 0
+    ends1 = np.append(offsets1, size1)
+    ends2 = np.append(offsets2, size2)
+
+    partner = _match_chunks(digests1, digests2)
+    matched = np.flatnonzero(partner >= 0)
+    anchored = matched[_in_order(partner[matched].tolist())]
+    moved = np.setdiff1d(matched, anchored, assume_unique=True)
+    regions = []
+
+    # Gap g lies between anchors g - 1 and g; gap ids of the unmatched chunks of both files
+    unmatched1 = np.flatnonzero(partner < 0)
+    matched2 = np.zeros(len(digests2), dtype=bool)
+    matched2[partner[matched]] = True
+    unmatched2 = np.flatnonzero(~matched2)
+    gap1 = np.searchsorted(anchored, unmatched1)
+    gap2 = np.searchsorted(partner[anchored], unmatched2)
+    gaps = np.union1d(gap1, gap2)
+    # Offsets of the gaps in both files: the end of the anchor before each of them
+    anchor_end1 = np.concatenate(([0], offsets1[anchored] + lengths1[anchored]))
+    anchor_end2 = np.concatenate(([0], offsets2[partner[anchored]] + lengths2[partner[anchored]]))
+    for gap in gaps.tolist():
+        left, right = np.searchsorted(gap1, [gap, gap + 1])
+        start1 = int(offsets1[unmatched1[left]]) if right > left else int(anchor_end1[gap])
+        end1 = int(ends1[unmatched1[right - 1] + 1]) if right > left else start1
+        left, right = np.searchsorted(gap2, [gap, gap + 1])
+        start2 = int(offsets2[unmatched2[left]]) if right > left else int(anchor_end2[gap])
+        end2 = int(ends2[unmatched2[right - 1] + 1]) if right > left else start2
+        kind = "modified" if end1 > start1 and end2 > start2 else "deleted" if end1 > start1 else "inserted"
+        regions.append((kind, start1, end1 - start1, start2, end2 - start2))
+
+    if len(moved):
+        # Merge chunks that are adjacent in both files
+        breaks = np.flatnonzero((np.diff(moved) != 1) | (np.diff(partner[moved]) != 1)) + 1
+        firsts = moved[np.concatenate(([0], breaks))]
+        lasts = moved[np.concatenate((breaks - 1, [len(moved) - 1]))]
+        for first, last in zip(firsts.tolist(), lasts.tolist()):
+            start1, end1 = int(offsets1[first]), int(ends1[last + 1])
+            start2 = int(offsets2[partner[first]])
+            regions.append(("moved", start1, end1 - start1, start2, end1 - start1))
+
+    regions.sort(key=lambda region: (region[1], region[3]))
+    return regions
+
+def _common_length(f1, f2, start1, start2, length, backward):
+    """
+    @brief Count the equal bytes at the start or end of two byte ranges
+    @param f1 file: First file, opened in binary mode
+    @param f2 file: Second file, opened in binary mode
+    @param start1 int: Start of the range in the first file
+    @param start2 int: Start of the range in the second file
+    @param length int: Number of bytes that may be compared
+    @param backward bool: Count from the end of the ranges instead of their start
+    @return int: Number of equal leading (or trailing) bytes
+    """
+    common = 0
+    while common < length:
+        step = min(_TRIM_STEP, length - common)
+        offset = length - common - step if backward else common
+        f1.seek(start1 + offset)
+        f2.seek(start2 + offset)
+        mismatch = np.flatnonzero(np.frombuffer(f1.read(step), dtype=np.uint8) !=
+                                  np.frombuffer(f2.read(step), dtype=np.uint8))
+        if len(mismatch):
+            return common + (step - 1 - int(mismatch[-1]) if backward else int(mismatch[0]))
+        common += step
+    return common
+
+def _subtract(start, length, spans):
+    """
+    @brief Remove byte spans from a range
+    @param start int: Start of the range
+    @param length int: Length of the range
+    @param spans list: Sorted (start, end) spans to remove
+    @return list: (start, length) pieces of the range outside all spans
+    """
+    pieces = []
+    end = start + length
+    for span_start, span_end in spans:
+        if span_end <= start or span_start >= end:
+            continue
+        if span_start > start:
+            pieces.append((start, span_start - start))
+        start = max(start, span_end)
+    if end > start:
+        pieces.append((start, end - start))
+    return pieces
+
+def trim_regions(file1, file2, regions):
+    """
+    @brief Shrink regions to the bytes that actually differ
+    @param file1 Path: First file
+    @param file2 Path: Second file
+    @param regions list: Regions returned by diff_chunks()
+    @return list: Regions at byte precision, ordered by position in the first file
+    @details Chunk boundaries only locate a change to within a chunk. Moved regions are
+             extended over the equal bytes around them, the common ends of modified
+             regions are removed, and the bytes of extended moved regions are cut out of
+             the other regions, so a moved block is not also reported as deleted and
+             inserted. A modified region left with bytes in one file only becomes a
+             deletion or insertion. Reads stop at the first differing byte from either
+             end, so only the edges of each region are read.
+    """
+    size1, size2 = os.path.getsize(file1), os.path.getsize(file2)
+    moved, changed = [], []
+    with open(file1, 'rb') as f1, open(file2, 'rb') as f2:
+        for kind, start1, length1, start2, length2 in regions:
+            if kind == "moved":
+                before = _common_length(f1, f2, start1 - min(start1, start2), start2 - min(start1, start2),
+                                        min(start1, start2), True)
+                after = _common_length(f1, f2, start1 + length1, start2 + length2,
+                                       min(size1 - start1 - length1, size2 - start2 - length2), False)
+                moved.append((start1 - before, length1 + before + after, start2 - before))
+                continue
+            if kind == "modified":
+                common = min(length1, length2)
+                prefix = _common_length(f1, f2, start1, start2, common, False)
+                start1, start2 = start1 + prefix, start2 + prefix
+                length1, length2 = length1 - prefix, length2 - prefix
+                common -= prefix
+                suffix = _common_length(f1, f2, start1 + length1 - common, start2 + length2 - common, common, True)
+                length1, length2 = length1 - suffix, length2 - suffix
+            changed.append((start1, length1, start2, length2))
+
+    spans1 = sorted((start1, start1 + length) for start1, length, _ in moved)
+    spans2 = sorted((start2, start2 + length) for _, length, start2 in moved)
+    trimmed = [("moved", start1, length, start2, length) for start1, length, start2 in moved]
+    for start1, length1, start2, length2 in changed:
+        pieces1 = _subtract(start1, length1, spans1)
+        pieces2 = _subtract(start2, length2, spans2)
+        if len(pieces1) == 1 and len(pieces2) == 1:
+            trimmed.append(("modified",) + pieces1[0] + pieces2[0])
+            continue
+        trimmed.extend(("deleted", start, length, start2, 0) for start, length in pieces1)
+        trimmed.extend(("inserted", start1, 0, start, length) for start, length in pieces2)
+    trimmed.sort(key=lambda region: (region[1], region[3]))
+    return trimmed
@@ -1,140 +1,974 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
-"""
-@file csv_comparator.py
-@brief CSV file comparator implementation with row and column comparison
-@author Xiaotong Wang
-@date 2025
-"""
-
-import csv
-import io
-from .text_comparator import TextComparator
-from .result import Difference
-
-class CsvComparator(TextComparator):
-    """
-    @brief Comparator for CSV files with row and column comparison
-    @details This class extends TextComparator to provide specialized CSV comparison
-             capabilities, including:
-             - Row count comparison
-             - Column count comparison
-             - Cell value comparison
-             - Configurable delimiter and quote character
-    """
-    
-    def __init__(self, encoding="utf-8", delimiter=",", quotechar='"', chunk_size=8192, verbose=False):
-        """
-        @brief Initialize CSV comparator with configuration
-        @param encoding str: File encoding (default: utf-8)
-        @param delimiter str: CSV field delimiter (default: comma)
-        @param quotechar str: Character used for quoting fields (default: double quote)
-        @param chunk_size int: Size of chunks for reading large files
-        @param verbose bool: Enable verbose output
-        """
-        super().__init__(encoding, chunk_size, verbose)
-        self.delimiter = delimiter
-        self.quotechar = quotechar
-    
-    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
-        """
-        @brief Read and parse CSV content from file
-        @param file_path Path: Path to the CSV file
-        @param start_line int: Starting line number
-        @param end_line int: Ending line number
-        @param start_column int: Starting column number
-        @param end_column int: Ending column number
-        @return list: List of rows, where each row is a list of cell values
-        @details Reads CSV content and parses it into a structured format,
-                 supporting line and column range selection
-        """
-        # First read the file as text
-        text_content = super().read_content(file_path, start_line, end_line, start_column, end_column)
-        
-        # Join the lines to create a CSV string
-        csv_text = ''.join(text_content)
-        
-        # Parse the CSV
-        csv_data = []
-        csv_reader = csv.reader(
-            io.StringIO(csv_text), 
-            delimiter=self.delimiter,
-            quotechar=self.quotechar
-        )
-        
-        for row in csv_reader:
-            # Apply column range if specified
-            if start_column > 0 or end_column is not None:
-                col_start = start_column
-                col_end = end_column if end_column is not None else len(row)
-                row = row[col_start:col_end+1]
-            csv_data.append(row)
-            
-        return csv_data
-    
-    def compare_content(self, content1, content2):
-        """
-        @brief Compare CSV content structurally
-        @param content1 list: First CSV data to compare (list of rows)
-        @param content2 list: Second CSV data to compare (list of rows)
-        @return tuple: (bool, list) - (identical, differences)
-        @details Performs structural comparison of CSV data, including:
-                 - Row count comparison
-                 - Column count comparison per row
-                 - Cell value comparison
-                 - Limits the number of reported differences
-        """
-        if content1 == content2:
-            return True, []
-            
-        differences = []
-        
-        # Check row count
-        if len(content1) != len(content2):
-            differences.append(Difference(
-                position="row count",
-                expected=f"{len(content1)} rows",
-                actual=f"{len(content2)} rows",
-                diff_type="row_count_mismatch"
-            ))
-        
-        # Compare rows
-        max_diffs = 10
-        for i, (row1, row2) in enumerate(zip(content1, content2)):
-            # Check column count in this row
-            if len(row1) != len(row2):
-                differences.append(Difference(
-                    position=f"row {i+1}",
-                    expected=f"{len(row1)} columns",
-                    actual=f"{len(row2)} columns",
-                    diff_type="column_count_mismatch"
-                ))
-                if len(differences) >= max_diffs:
-                    break
-            
-            # Compare column values
-            for j, (cell1, cell2) in enumerate(zip(row1, row2)):
-                if cell1 != cell2:
-                    differences.append(Difference(
-                        position=f"row {i+1}, column {j+1}",
-                        expected=cell1,
-                        actual=cell2,
-                        diff_type="cell_mismatch"
-                    ))
-                    if len(differences) >= max_diffs:
-                        break
-            
-            if len(differences) >= max_diffs:
-                break
-        
-        # Add a summary if there are more differences
-        if len(differences) >= max_diffs:
-            differences.append(Difference(
-                position=None,
-                expected=None,
-                actual=None,
-                diff_type=f"more differences not shown"
-            ))
-        
-        return False, differences
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file csv_comparator.py
+@brief CSV file comparator implementation with row and column comparison
+@author Xiaotong Wang
+@date 2025
+"""
+
+import csv
+import io
+import os
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice, repeat, zip_longest
+from operator import itemgetter, ne
+import numpy as np
+from .text_comparator import TextComparator
+from .result import Difference, DifferenceCollector, FirstDifference
+from .csv_ranges import aligned_ranges
+from .external_sort import external_sort, merge_join
+from .numeric import (merge_error_statistics, new_error_statistics, numbers_close, try_parse_numbers,
+                      update_error_statistics)
+
+# Rows of the first file indexed in memory for key-based comparison; beyond that both
+# files are sorted externally and merge-joined
+KEY_MEMORY_ROWS = 1000000
+
+# Records of each file compared per block in typed mode
+TYPED_BLOCK_ROWS = 65536
+
+# Column types of a typed comparison schema
+COLUMN_TYPES = ("number", "string")
+
+# Bounds of the byte ranges files are cut into for parallel comparison; in between,
+# ranges are sized to give every worker process about four of them
+CSV_RANGE_BYTES = 1 << 20
+CSV_MAX_RANGE_BYTES = 1 << 24
+
+def _compare_range(task):
+    """
+    @brief Compare one pair of aligned byte ranges of two CSV files (process pool worker)
+    @param task tuple: (comparator, file1, start1, end1, file2, start2, end2, first_record,
+                schema, columns, projection)
+    @return tuple: (differences, total, count1, count2, field_statistics) of the range
+    """
+    comparator, *arguments = task
+    return comparator._compare_byte_ranges(*arguments)
+
+class CsvComparator(TextComparator):
+    """
+    @brief Comparator for CSV files with row and column comparison
+    @details This class extends TextComparator to provide specialized CSV comparison
+             capabilities, including:
+             - Row count comparison
+             - Column count comparison
+             - Cell value comparison
+             - Configurable delimiter and quote character
+             - Rows matched by key columns instead of by position
+             - Typed comparison of numeric cells with per-column tolerances
+             - Parallel parsing of large files in aligned byte ranges
+             - Projection onto selected columns while parsing
+    """
+
+    # Content is parsed before comparison, so never diff raw lines
+    raw_line_compare = False
+    
+    def __init__(self, encoding="utf-8", delimiter=",", quotechar='"', chunk_size=8192, verbose=False,
+                 num_threads=1, line_index=False, max_differences=10, count_only=False, fail_fast=False, key_columns=None,
+                 key_memory_rows=KEY_MEMORY_ROWS, typed=False, column_types=None, rtol=1e-5, atol=1e-8,
+                 column_tolerances=None, columns=None):
+        """
+        @brief Initialize CSV comparator with configuration
+        @param encoding str: File encoding (default: utf-8)
+        @param delimiter str: CSV field delimiter (default: comma)
+        @param quotechar str: Character used for quoting fields (default: double quote)
+        @param chunk_size int: Size of chunks for reading large files
+        @param verbose bool: Enable verbose output
+        @param num_threads int: Worker processes parsing and comparing large files in parallel
+        @param line_index bool: Seek to start_line through a sidecar line offset index
+        @param max_differences int: Number of differences listed in the result
+        @param count_only bool: Only count the differences, list none of them
+        @param fail_fast bool: Stop reading at the first difference
+        @param key_columns list: Columns identifying a row, as header names or 1-based numbers;
+                          rows are then matched by key instead of by position
+        @param key_memory_rows int: Rows of the first file indexed in memory before the
+                          key-based comparison falls back to an external sort-merge join
+        @param typed bool: Compare cells holding numbers as numbers, with tolerances
+        @param column_types dict: "number" or "string" per column (header name or 1-based
+                          number) in typed mode; columns not listed are "number"
+        @param rtol float: Relative tolerance for numeric cells in typed mode
+        @param atol float: Absolute tolerance for numeric cells in typed mode
+        @param column_tolerances dict: (rtol, atol) per column (header name or 1-based number)
+        @param columns list: Columns compared, as header names or 1-based numbers, in the order
+                      given; the other columns are not parsed
+        @throws ValueError: If a column type is unknown or typed mode is combined with key columns
+        """
+        super().__init__(encoding, chunk_size, verbose, num_threads=num_threads, line_index=line_index,
+                         max_differences=max_differences, count_only=count_only, fail_fast=fail_fast)
+        self.delimiter = delimiter
+        self.quotechar = quotechar
+        self.key_columns = key_columns
+        self.key_memory_rows = key_memory_rows
+        self.typed = typed
+        self.column_types = column_types or {}
+        self.rtol = rtol
+        self.atol = atol
+        self.column_tolerances = column_tolerances or {}
+        self.columns = columns or None
+        self.field_statistics = None  # Per-column mismatch statistics of the last typed comparison
+        for column, column_type in self.column_types.items():
+            if column_type not in COLUMN_TYPES:
+                raise ValueError(f"Invalid type '{column_type}' of column {column}, expected one of {COLUMN_TYPES}")
+        if typed and key_columns:
+            raise ValueError("Typed comparison is not supported together with key columns")
+    
+    def compare_files(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Compare two CSV files, adding the per-column statistics of typed mode
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @param start_column int: Starting column number (0-based)
+        @param end_column int: Ending column number (0-based, None for end of line)
+        @return ComparisonResult: Result object containing comparison details
+        """
+        self.field_statistics = None
+        result = super().compare_files(file1, file2, start_line, end_line, start_column, end_column)
+        result.field_statistics = self.field_statistics
+        return result
+
+    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Read and parse CSV content from file
+        @param file_path Path: Path to the CSV file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param start_column int: Starting column number
+        @param end_column int: Ending column number
+        @return list: List of rows, where each row is a list of cell values
+        @details Reads CSV content and parses it into a structured format,
+                 supporting line and column range selection
+        """
+        return list(self.iter_rows(file_path, start_line, end_line, start_column, end_column))
+
+    def iter_rows(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Lazily parse the CSV rows within the specified range
+        @param file_path Path: Path to the CSV file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param start_column int: Starting column number
+        @param end_column int: Ending column number
+        @return generator: Rows as lists of cell values, projection and column range applied
+        @details The column range selects cells, so it is applied to the parsed rows and
+                 not to the characters of the lines. With selected columns it applies to
+                 the projected rows.
+        """
+        # Stream the selected lines straight into the CSV parser
+        text_lines = self.iter_lines(file_path, start_line, end_line)
+        indices = self._projection(file_path, start_line, end_line)
+        
+        for row in self._parse_rows(text_lines, indices):
+            yield self._select_columns(row, start_column, end_column)
+
+    def _projection(self, file_path, start_line=0, end_line=None):
+        """
+        @brief Resolve the selected columns of a file, reading its header if needed
+        @param file_path Path: Path to the CSV file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @return list: 0-based indices of the selected columns, None to keep all columns
+        @throws ValueError: If a selected column is not in the header
+        @details The first record of the range is the header. It is read on its own, so
+                 the rows parsed afterwards still include it.
+        """
+        if not self.columns:
+            return None
+        columns = [str(column).strip() for column in self.columns]
+        header = []
+        if not all(column.isdigit() for column in columns):
+            header = self._first_record(file_path, start_line, end_line)
+        return [self._column_index(column, header, file_path) for column in columns]
+
+    def _first_record(self, file_path, start_line=0, end_line=None):
+        """
+        @brief Parse the first record of a range of a file
+        @param file_path Path: Path to the CSV file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @return list: Cells of the first record, empty for an empty range
+        @details Only the lines of the record are read.
+        """
+        lines = self.iter_lines(file_path, start_line, end_line)
+        try:
+            return next(csv.reader(lines, delimiter=self.delimiter, quotechar=self.quotechar), [])
+        finally:
+            lines.close()
+
+    def _parse_rows(self, lines, indices=None):
+        """
+        @brief Parse CSV rows, keeping only the selected columns
+        @param lines iterable: Lines (or raw records) of a file
+        @param indices list: 0-based indices of the selected columns, None for all columns
+        @return iterator: Rows as lists of cell values; projected rows hold the selected
+                cells in the order of indices, empty for cells missing from short rows
+        @details A record without quote characters is cut with str.split, which stops
+                 after the last selected column, and only the selected cells are kept, so
+                 the cells of other columns are never built. Quoted records are parsed by
+                 the csv module.
+        """
+        if indices is None:
+            return csv.reader(lines, delimiter=self.delimiter, quotechar=self.quotechar)
+        return self._project_rows(lines, indices)
+
+    def _project_rows(self, lines, indices):
+        """
+        @brief Parse the selected cells of CSV records (see _parse_rows)
+        @param lines iterable: Lines (or raw records) of a file
+        @param indices list: 0-based indices of the selected columns
+        @return generator: Projected rows
+        """
+        delimiter, quotechar = self.delimiter, self.quotechar
+        maxsplit = max(indices) + 1
+        select = itemgetter(*indices) if len(indices) > 1 else lambda row: (row[indices[0]],)
+        for record in self._iter_records(lines):
+            if quotechar in record:
+                row = next(csv.reader([record], delimiter=delimiter, quotechar=quotechar), [])
+            else:
+                row = record.rstrip("\r\n").split(delimiter, maxsplit)
+            try:
+                yield list(select(row))
+            except IndexError:
+                yield self._project(row, indices)
+
+    @staticmethod
+    def _project(row, indices):
+        """
+        @brief Select cells of a parsed row
+        @param row list: Cell values
+        @param indices list: 0-based indices of the selected columns, None for all columns
+        @return list: Selected cells, empty for cells missing from short rows
+        """
+        if indices is None:
+            return row
+        return [row[i] if i < len(row) else "" for i in indices]
+
+    @staticmethod
+    def _select_columns(row, start_column=0, end_column=None):
+        """
+        @brief Apply a column range to a row
+        @param row list: Cell values
+        @param start_column int: Starting column number
+        @param end_column int: Ending column number
+        @return list: Cells within the range
+        """
+        if start_column > 0 or end_column is not None:
+            col_end = end_column if end_column is not None else len(row)
+            row = row[start_column:col_end+1]
+        return row
+
+    def compare_paths(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Compare two CSV files by streaming their rows in lockstep
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param start_column int: Starting column number
+        @param end_column int: Ending column number
+        @return tuple: (bool, list) - (identical, differences)
+        @details Rows of both files are parsed in lockstep and compared as they arrive,
+                 so only the current pair of rows is held in memory whatever the file
+                 sizes. Differences are reported as by compare_content(). In fail-fast
+                 mode parsing stops at the first differing row. With key columns rows
+                 are matched by key instead (see _compare_keyed), and in typed mode
+                 cells are compared as typed values (see _compare_typed_block). Large
+                 whole files are compared in parallel (see _compare_ranges). With
+                 selected columns only those are parsed (see _parse_rows); they are looked
+                 up in the header of each file, so the files may order them differently.
+        """
+        columns = (start_column, end_column)
+        projection = (self._projection(file1, start_line, end_line),
+                      self._projection(file2, start_line, end_line))
+        schema = None
+        try:
+            if self.key_columns:
+                return self._compare_keyed(file1, file2, start_line, end_line, start_column, end_column,
+                                           projection)
+            if self.typed:
+                schema = self._typed_schema(file1, start_line, end_line, projection[0])
+                self.field_statistics = self._new_field_statistics(schema, columns)
+            ranges = self._parallel_ranges(file1, file2, start_line, end_line)
+            if ranges:
+                return self._compare_ranges(file1, file2, ranges, schema, columns, projection)
+            collector = self._new_collector()
+            count1, count2 = self._compare_streams(collector, self.iter_lines(file1, start_line, end_line),
+                                                   self.iter_lines(file2, start_line, end_line), 0, schema, columns,
+                                                   projection)
+        except FirstDifference as stop:
+            self.logger.debug(f"Stopped at the first difference: {stop.difference}")
+            return False, self._limit_differences([stop.difference])
+        return self._row_results(collector, count1, count2)
+
+    def _compare_streams(self, collector, lines1, lines2, base, schema, columns, projection=(None, None)):
+        """
+        @brief Compare the rows of two streams of lines in lockstep
+        @param collector DifferenceCollector: Collector receiving the differences
+        @param lines1 iterable: Lines of the first file
+        @param lines2 iterable: Lines of the second file
+        @param base int: 0-based row number of the first row of the streams
+        @param schema tuple: Typed comparison schema (see _typed_schema), None to compare
+                      cells as text
+        @param columns tuple: (start_column, end_column) range of the compared cells
+        @param projection tuple: Selected column indices of both files (see _projection)
+        @return tuple: (int, int) - Number of rows of both streams
+        @throws FirstDifference: At the first differing row in fail-fast mode
+        """
+        count1 = count2 = 0
+        if schema is not None:
+            records1 = self._iter_records(lines1)
+            records2 = self._iter_records(lines2)
+            while True:
+                block1 = list(islice(records1, TYPED_BLOCK_ROWS))
+                block2 = list(islice(records2, TYPED_BLOCK_ROWS))
+                if not block1 and not block2:
+                    break
+                common = min(len(block1), len(block2))
+                if block1[:common] != block2[:common] or projection[0] != projection[1]:
+                    self._compare_typed_block(collector, base + count1, block1[:common], block2[:common],
+                                              schema, columns, projection)
+                count1 += len(block1)
+                count2 += len(block2)
+            return count1, count2
+
+        rows1 = self._parse_rows(lines1, projection[0])
+        rows2 = self._parse_rows(lines2, projection[1])
+        for i, (row1, row2) in enumerate(zip_longest(rows1, rows2), base):
+            if row1 is not None:
+                count1 += 1
+                row1 = self._select_columns(row1, *columns)
+            if row2 is not None:
+                count2 += 1
+                row2 = self._select_columns(row2, *columns)
+            if row1 != row2:
+                if self.fail_fast:
+                    raise FirstDifference(self._row_difference(i, row1, row2))
+                if row1 is not None and row2 is not None:
+                    self._compare_row(collector, f"row {i+1}", row1, row2)
+        return count1, count2
+
+    def _parallel_ranges(self, file1, file2, start_line, end_line):
+        """
+        @brief Decide whether to compare two files in parallel and cut them into ranges
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @return list: Aligned byte ranges (see aligned_ranges()), or None to compare serially
+        @details Only whole files of at least two ranges are split, with more than one
+                 worker, in an encoding where newlines and the quote character are single
+                 ASCII bytes, so record boundaries can be found on the raw bytes.
+        """
+        if self.num_threads <= 1 or start_line != 0 or end_line is not None or not self.quotechar.isascii():
+            return None
+        try:
+            if "\n".encode(self.encoding) != b"\n" or self.quotechar.encode(self.encoding) != self.quotechar.encode('ascii'):
+                return None
+        except (LookupError, UnicodeError):
+            return None
+        size = os.path.getsize(file1)
+        range_bytes = min(max(size // (4 * self.num_threads), CSV_RANGE_BYTES), CSV_MAX_RANGE_BYTES)
+        if size < 2 * range_bytes:
+            return None
+        ranges = aligned_ranges(file1, file2, range_bytes, self.quotechar)
+        return ranges if len(ranges) > 1 else None
+
+    def _compare_ranges(self, file1, file2, ranges, schema, columns, projection):
+        """
+        @brief Compare two files range by range on a pool of worker processes
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param ranges list: Aligned byte ranges (see aligned_ranges())
+        @param schema tuple: Typed comparison schema, None to compare cells as text
+        @param columns tuple: (start_column, end_column) range of the compared cells
+        @param projection tuple: Selected column indices of both files (see _projection)
+        @return tuple: (bool, list) - (identical, differences)
+        @details The ranges hold the same record numbers in both files, so each worker
+                 compares its pair on its own and numbers the rows from the first record
+                 of the range. The results are merged in file order: differences listed
+                 up to the limit, totals, row counts and per-column statistics summed. In
+                 fail-fast mode the first range with a difference ends the comparison.
+        """
+        self.logger.info(f"Comparing {len(ranges)} ranges on {self.num_threads} processes")
+        collector = DifferenceCollector(self.difference_limit)
+        count1 = count2 = 0
+        tasks = [(self, file1, start1, end1, file2, start2, end2, first, schema, columns, projection)
+                 for start1, end1, start2, end2, first in ranges]
+        with ProcessPoolExecutor(max_workers=self.num_threads) as executor:
+            for differences, total, range_count1, range_count2, statistics in executor.map(_compare_range, tasks):
+                collector.differences.extend(differences[:max(0, collector.limit - len(collector.differences))])
+                collector.add_count(total)
+                count1 += range_count1
+                count2 += range_count2
+                if statistics:
+                    merge_error_statistics(self.field_statistics, statistics)
+                if self.fail_fast and total:
+                    executor.shutdown(wait=False, cancel_futures=True)
+                    return False, self._limit_differences(collector.differences)
+        return self._row_results(collector, count1, count2)
+
+    def _compare_byte_ranges(self, file1, start1, end1, file2, start2, end2, first, schema, columns, projection):
+        """
+        @brief Compare one pair of aligned byte ranges
+        @param file1 Path: Path to the first file
+        @param start1 int: First byte of the range of the first file
+        @param end1 int: End of the range of the first file (exclusive)
+        @param file2 Path: Path to the second file
+        @param start2 int: First byte of the range of the second file
+        @param end2 int: End of the range of the second file (exclusive)
+        @param first int: 0-based number of the first row of both ranges
+        @param schema tuple: Typed comparison schema, None to compare cells as text
+        @param columns tuple: (start_column, end_column) range of the compared cells
+        @param projection tuple: Selected column indices of both files (see _projection)
+        @return tuple: (differences, total, count1, count2, field_statistics) of the range
+        """
+        self.field_statistics = None if schema is None else self._new_field_statistics(schema, columns)
+        collector = DifferenceCollector(self.difference_limit, self.fail_fast)
+        try:
+            count1, count2 = self._compare_streams(collector, self._read_range(file1, start1, end1),
+                                                   self._read_range(file2, start2, end2), first, schema, columns,
+                                                   projection)
+        except FirstDifference as stop:
+            return [stop.difference], 1, 0, 0, self.field_statistics
+        return collector.differences, collector.total, count1, count2, self.field_statistics
+
+    def _read_range(self, file_path, start, end):
+        """
+        @brief Read a byte range of a file as text lines
+        @param file_path Path: Path to the file
+        @param start int: First byte of the range, at the start of a line
+        @param end int: End of the range (exclusive)
+        @return io.TextIOWrapper: Lines of the range, decoded as the whole file would be
+        """
+        with open(file_path, 'rb') as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return io.TextIOWrapper(io.BytesIO(data), encoding=self.encoding)
+
+    def _key_indices(self, rows, file_path):
+        """
+        @brief Resolve the key columns of a file, reading its header row if needed
+        @param rows iterator: Rows of the file; the header row is consumed from it
+        @param file_path Path: File the rows come from, for error messages
+        @return tuple: (list, list) - 0-based key column indices and the header row (None
+                without header)
+        @throws ValueError: If a key column is not in the header
+        @details Numbers select columns by position. If any key column is given by name
+                 the first row of the range is the header and is not matched by key.
+        """
+        columns = [str(column).strip() for column in self.key_columns]
+        if all(column.isdigit() for column in columns):
+            return [self._column_index(column, (), file_path) for column in columns], None
+        header = next(rows, [])
+        return [self._column_index(column, header, file_path) for column in columns], header
+
+    @staticmethod
+    def _column_index(column, header, file_path):
+        """
+        @brief Resolve a column given by header name or 1-based number
+        @param column str: Header name or 1-based column number
+        @param header list: Header row of the file
+        @param file_path Path: File the header comes from, for error messages
+        @return int: 0-based column index
+        @throws ValueError: If the column is neither in the header nor a number from 1 on
+        """
+        column = str(column).strip()
+        if column in header:
+            return header.index(column)
+        if column.isdigit():
+            if int(column) < 1:
+                raise ValueError(f"Column numbers start at 1, got '{column}'")
+            return int(column) - 1
+        raise ValueError(f"Column '{column}' not found in header of {file_path}")
+
+    @staticmethod
+    def _keyed_rows(rows, indices):
+        """
+        @brief Pair every row with its key
+        @param rows iterable: Rows of a file
+        @param indices list: 0-based key column indices
+        @return generator: (key, row) tuples, the key being a tuple of cell values (empty
+                for cells missing from short rows)
+        """
+        for row in rows:
+            yield tuple(row[i] if i < len(row) else "" for i in indices), row
+
+    def _keyed_stream(self, file_path, start_line, end_line, indices):
+        """
+        @brief Parse the rows of a file paired with their keys
+        @param file_path Path: Path to the CSV file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param indices list: Selected column indices (see _projection), None for all columns
+        @return tuple: (generator, list) - (key, row) tuples of the rows after the header, and
+                the header row (None without header; projected with selected columns)
+        @details With selected columns only the key cells and the selected cells are parsed;
+                 the key cells are then split off the row again.
+        """
+        lines = iter(self.iter_lines(file_path, start_line, end_line))
+        # The header parser reads exactly the lines of the header record
+        key_indices, header = self._key_indices(
+            csv.reader(lines, delimiter=self.delimiter, quotechar=self.quotechar), file_path)
+        if indices is None:
+            return self._keyed_rows(self._parse_rows(lines), key_indices), header
+        count = len(key_indices)
+        rows = self._parse_rows(lines, key_indices + indices)
+        header = None if header is None else self._project(header, indices)
+        return ((tuple(row[:count]), row[count:]) for row in rows), header
+
+    def _compare_keyed(self, file1, file2, start_line, end_line, start_column, end_column, projection=(None, None)):
+        """
+        @brief Compare two CSV files with rows matched by their key columns
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param start_column int: Starting column number
+        @param end_column int: Ending column number
+        @param projection tuple: Selected column indices of both files (see _projection)
+        @return tuple: (bool, list) - (identical, differences)
+        @details The rows of the first file are indexed in a hash table by key, and the
+                 second file is streamed through it (see _hash_join), so inserted or deleted
+                 rows do not shift the rows after them. Rows with the same key are paired in
+                 file order, and differences are listed in key order. When the first file has more than key_memory_rows rows, both files
+                 are sorted by key in runs spilled to temporary files (in the directory
+                 named by TMPDIR) and merge-joined, so memory is bounded whatever the
+                 file sizes. Keys are read from whole rows; the selected columns and the
+                 column range select the cells that are compared.
+        """
+        keyed1, header1 = self._keyed_stream(file1, start_line, end_line, projection[0])
+        keyed2, header2 = self._keyed_stream(file2, start_line, end_line, projection[1])
+        collector = self._new_collector()
+        if header1 is not None and header1 != header2:
+            self._compare_row(collector, "header",
+                              self._select_columns(header1, start_column, end_column),
+                              self._select_columns(header2, start_column, end_column))
+        columns = (start_column, end_column)
+
+        index = {}
+        for count, (key, row) in enumerate(keyed1):
+            if count == self.key_memory_rows:
+                # Spill: the rows indexed so far go first, so equal keys keep their file order
+                self.logger.info(f"More than {self.key_memory_rows} rows, comparing by external "
+                                 f"sort and merge join")
+                indexed, index = index, None
+                rows1 = chain(((key, row) for key, rows in indexed.items() for row in rows),
+                              [(key, row)], keyed1)
+                sorted1 = external_sort(rows1, itemgetter(0), self.key_memory_rows)
+                sorted2 = external_sort(keyed2, itemgetter(0), self.key_memory_rows)
+                for key, group1, group2 in merge_join(sorted1, sorted2, itemgetter(0)):
+                    self._compare_key_group(collector, key, [row for _, row in group1],
+                                            [row for _, row in group2], columns)
+                break
+            index.setdefault(key, []).append(row)
+
+        if index is not None:
+            self._hash_join(collector, index, keyed2, columns)
+
+        if not collector.total:
+            return True, []
+        return False, self._limit_differences(collector.differences, collector.total)
+
+    def _hash_join(self, collector, index, keyed2, columns):
+        """
+        @brief Match the rows of the second file against the indexed rows of the first
+        @param collector DifferenceCollector: Collector receiving the differences
+        @param index dict: Rows of the first file by key, in file order; consumed
+        @param keyed2 iterable: (key, row) tuples of the second file
+        @param columns tuple: (start_column, end_column) range of the compared cells
+        @details Every difference is counted as the second file streams through the index,
+                 but only the rows of the difference_limit smallest differing keys are kept.
+                 They are compared again in key order at the end, so the listed
+                 differences are the same as those of the merge join. In fail-fast mode
+                 the first differing row found stops the comparison.
+        """
+        limit = self.difference_limit
+        counter = collector if self.fail_fast else DifferenceCollector(0)
+        kept = []  # (key, differences counted before, rows1, rows2) of differing rows
+        taken = {}  # Number of rows already paired, for keys with rows left in the index
+
+        def trim():
+            # Keep the rows of the `limit` smallest keys, equal keys in file order
+            kept.sort(key=itemgetter(0, 1))
+            keys = 0
+            for i, entry in enumerate(kept):
+                if i == 0 or entry[0] != kept[i - 1][0]:
+                    keys += 1
+                    if keys > limit:
+                        del kept[i:]
+                        break
+
+        def compare(key, rows1, rows2):
+            counted = counter.total
+            self._compare_key_group(counter, key, rows1, rows2, columns)
+            if counter is not collector and counter.total > counted and limit:
+                kept.append((key, counted, rows1, rows2))
+                if len(kept) > max(2 * limit, 1024):
+                    trim()
+
+        for key, row2 in keyed2:
+            matches = index.get(key)
+            if not matches:
+                compare(key, [], [row2])
+                continue
+            paired = taken.pop(key, 0)
+            if paired + 1 < len(matches):
+                taken[key] = paired + 1
+            else:
+                del index[key]
+            compare(key, [matches[paired]], [row2])
+        for key, rows in index.items():
+            compare(key, rows[taken.get(key, 0):], [])
+
+        if counter is not collector:
+            trim()
+            listed = collector.total
+            for key, _, rows1, rows2 in kept:
+                self._compare_key_group(collector, key, rows1, rows2, columns)
+            collector.add_count(counter.total - (collector.total - listed))
+
+    def _compare_key_group(self, collector, key, rows1, rows2, columns):
+        """
+        @brief Record the differences between the rows of both files sharing a key
+        @param collector DifferenceCollector: Collector receiving the differences
+        @param key tuple: Key of the rows
+        @param rows1 list: Rows of the first file with this key, in file order
+        @param rows2 list: Rows of the second file with this key, in file order
+        @param columns tuple: (start_column, end_column) range of the compared cells
+        @details Rows are paired in file order; unpaired rows are reported as removed
+                 (missing) or added (extra).
+        """
+        position = f"key {'|'.join(key)}"
+        for row1, row2 in zip_longest(rows1, rows2):
+            if row2 is None:
+                collector.add(
+                    position=position,
+                    expected=self.delimiter.join(self._select_columns(row1, *columns)),
+                    actual=None,
+                    diff_type="missing"
+                )
+            elif row1 is None:
+                collector.add(
+                    position=position,
+                    expected=None,
+                    actual=self.delimiter.join(self._select_columns(row2, *columns)),
+                    diff_type="extra"
+                )
+            else:
+                row1 = self._select_columns(row1, *columns)
+                row2 = self._select_columns(row2, *columns)
+                if row1 != row2:
+                    self._compare_row(collector, position, row1, row2)
+
+    def _iter_records(self, lines):
+        """
+        @brief Group lines into the raw text of whole CSV records
+        @param lines iterable: Lines of a file
+        @return generator: Text of every record, a quoted field spanning lines kept in one record
+        @details A line with an odd number of quote characters opens a quoted field that
+                 is closed by the next such line; doubled quotes inside quoted fields do not
+                 change the parity. Lines are taken in blocks, and blocks without any quote
+                 character are passed on whole.
+        """
+        quotechar = self.quotechar
+        lines = iter(lines)
+        pending = None
+        while True:
+            block = list(islice(lines, TYPED_BLOCK_ROWS))
+            if not block:
+                break
+            if pending is None and not any(map(str.count, block, repeat(quotechar))):
+                yield from block
+                continue
+            for line in block:
+                if pending is not None:
+                    pending += line
+                    if line.count(quotechar) % 2:
+                        yield pending
+                        pending = None
+                elif line.count(quotechar) % 2:
+                    pending = line
+                else:
+                    yield line
+        if pending is not None:
+            yield pending
+
+    def _typed_schema(self, file_path, start_line=0, end_line=None, indices=None):
+        """
+        @brief Build the typed comparison schema from the first record of a file
+        @param file_path Path: Path to the first file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param indices list: Selected column indices (see _projection), None for all columns
+        @return tuple: (number column mask, rtol, atol, statistics names) of the columns
+        @details The first record names the columns the schema and tolerances refer to.
+                 Its width, or the number of selected columns, is the width of the table
+                 typed blocks are parsed into, and its cells that are not numbers name the
+                 per-column statistics.
+        """
+        header = self._first_record(file_path, start_line, end_line)
+        if indices:
+            header += [""] * (max(indices) + 1 - len(header))
+        width = len(header)
+        numeric = np.ones(width, dtype=bool)
+        for column, column_type in self.column_types.items():
+            index = self._column_index(column, header, file_path)
+            if index < width:
+                numeric[index] = column_type == "number"
+        rtol = np.full(width, float(self.rtol))
+        atol = np.full(width, float(self.atol))
+        for column, (column_rtol, column_atol) in self.column_tolerances.items():
+            index = self._column_index(column, header, file_path)
+            if index < width:
+                rtol[index], atol[index] = column_rtol, column_atol
+        numbers, _ = try_parse_numbers(header)
+        names = [name if name and np.isnan(value) else f"column {j+1}"
+                 for j, (name, value) in enumerate(zip(header, numbers))]
+        if indices is not None:
+            return numeric[indices], rtol[indices], atol[indices], self._project(names, indices)
+        return numeric, rtol, atol, names
+
+    def _new_field_statistics(self, schema, columns):
+        """
+        @brief Create empty per-column statistics for a typed comparison
+        @param schema tuple: Typed comparison schema (see _typed_schema)
+        @param columns tuple: (start_column, end_column) range of the compared cells
+        @return dict: Statistics per compared column, keyed by name
+        """
+        return {name: new_error_statistics() for name in self._select_columns(schema[3], *columns)}
+
+    def _split_records(self, records, width):
+        """
+        @brief Split records without quoting into one flat list of cells
+        @param records list: Raw records
+        @param width int: Number of cells every record must have
+        @return list: Cells of all records, record after record, or None if a record is quoted
+                or has another number of cells
+        @details One str.split over the joined records replaces a CSV parse per record.
+        """
+        text = "".join(records)
+        if not width or self.quotechar in text or \
+                set(map(str.count, records, repeat(self.delimiter))) != {width - 1}:
+            return None
+        if not text.endswith("\n"):
+            text += "\n"
+        return text.replace("\n", self.delimiter).split(self.delimiter)[:-1]
+
+    def _compare_typed_block(self, collector, base, block1, block2, schema, columns, projection=(None, None)):
+        """
+        @brief Compare a block of records of both files as typed columns
+        @param collector DifferenceCollector: Collector receiving the differences
+        @param base int: Number of records before the block (0-based row of its first record)
+        @param block1 list: Raw records of the first file
+        @param block2 list: Raw records of the second file, as many as block1
+        @param schema tuple: (number column mask, rtol, atol, statistics names) of the header columns
+        @param columns tuple: (start_column, end_column) range of the compared cells
+        @param projection tuple: Selected column indices of both files (see _projection)
+        @details Only the records that differ as text are parsed, into one row-major table
+                 of cells per file, the columns of the header (or the selected columns)
+                 wide; where the files select different columns every record is parsed. Cells are compared as
+                 text in one pass over the table; the differing cells of number columns
+                 are then parsed in one call and compared with np.isclose and the
+                 tolerances of their columns, so 1.0 and 1.00 are equal. Cells that are not
+                 numbers on both sides differ. Of rows whose column counts differ, the
+                 cells both rows have are compared.
+        """
+        numeric_columns, rtol, atol, names = schema
+        width = len(names)
+        start_column, end_column = columns
+        end_column = None if end_column is None else end_column + 1
+        indices1, indices2 = projection
+        if indices1 == indices2:
+            differing = [k for k, (record1, record2) in enumerate(zip(block1, block2)) if record1 != record2]
+        else:
+            differing = list(range(len(block1)))
+        records1 = [block1[k] for k in differing]
+        records2 = [block2[k] for k in differing]
+        entries = []  # (row, column, Difference) of the differences to list
+
+        cells1 = self._split_records(records1, width) if indices1 is None else None
+        cells2 = self._split_records(records2, width) if cells1 is not None else None
+        if cells2 is None:
+            cells1, cells2 = [], []
+            reader1 = self._parse_rows(records1, indices1)
+            reader2 = self._parse_rows(records2, indices2)
+            for k, row1, row2 in zip(differing, reader1, reader2):
+                if not len(row1) == len(row2) == width:
+                    # Fit the cells both rows have into the table; the ones past it are text
+                    common = min(len(row1), len(row2))
+                    selected1 = len(self._select_columns(row1, *columns))
+                    selected2 = len(self._select_columns(row2, *columns))
+                    if selected1 != selected2:
+                        entries.append((base + k, -1, Difference(
+                            position=f"row {base+k+1}",
+                            expected=f"{selected1} columns",
+                            actual=f"{selected2} columns",
+                            diff_type="column_count_mismatch"
+                        )))
+                    entries.extend((base + k, j, Difference(
+                        position=f"row {base+k+1}, column {j-start_column+1}",
+                        expected=row1[j],
+                        actual=row2[j],
+                        diff_type="cell_mismatch"
+                    )) for j in range(max(width, start_column), common if end_column is None else min(common, end_column))
+                        if row1[j] != row2[j])
+                    padding = [None] * max(0, width - common)
+                    row1 = row1[:min(common, width)] + padding
+                    row2 = row2[:min(common, width)] + padding
+                cells1.extend(row1)
+                cells2.extend(row2)
+
+        count = len(cells1)
+        mismatch = np.fromiter(map(ne, cells1, cells2), dtype=bool, count=count).reshape(-1, width or 1)
+        mismatch[:, :start_column] = False
+        if end_column is not None:
+            mismatch[:, end_column:] = False
+        candidates = np.flatnonzero(mismatch)
+        column = candidates % width if width else candidates
+        numeric = candidates[numeric_columns[column]]
+        values1, valid1 = try_parse_numbers([cells1[i] for i in numeric.tolist()])
+        values2, valid2 = try_parse_numbers([cells2[i] for i in numeric.tolist()])
+        numeric_column = numeric % width if width else numeric
+        close = numbers_close(values1, values2, rtol[numeric_column], atol[numeric_column]) & valid1 & valid2
+        mismatch.reshape(-1)[numeric[close]] = False
+
+        # Statistics: errors of the numbers, counts of all other differing cells
+        measured = valid1 & valid2 & ~close
+        for j in np.unique(numeric_column[measured]).tolist():
+            selected = measured & (numeric_column == j)
+            update_error_statistics(self.field_statistics[names[j]], values1[selected], values2[selected])
+        unmeasured = np.ones(len(candidates), dtype=bool)
+        unmeasured[np.searchsorted(candidates, numeric[close | measured])] = False
+        for j, mismatches in enumerate(np.bincount(column[unmeasured], minlength=width).tolist()):
+            if mismatches:
+                self.field_statistics[names[j]]["mismatches"] += mismatches
+
+        # List the differences in row order; the ones that will not be listed only count
+        found = np.flatnonzero(mismatch)
+        total = len(found) + len(entries)
+        room = max(0, self.difference_limit - len(collector.differences))
+        for i in found[:room].tolist():
+            row, j = divmod(i, width)
+            entries.append((base + differing[row], j, Difference(
+                position=f"row {base+differing[row]+1}, column {j-start_column+1}",
+                expected=cells1[i],
+                actual=cells2[i],
+                diff_type="cell_mismatch"
+            )))
+        entries.sort(key=lambda entry: entry[:2])
+        for _, _, difference in entries[:room]:
+            collector.append(difference)
+        collector.add_count(total - min(room, len(entries)))
+
+    @staticmethod
+    def _row_difference(i, row1, row2):
+        """
+        @brief Describe the first difference between two rows
+        @param i int: Row number (0-based)
+        @param row1 list: Row of the first file, None past its end
+        @param row2 list: Row of the second file, None past its end
+        @return Difference: Missing row, column count or first cell difference
+        """
+        if row1 is None or row2 is None:
+            return Difference(
+                position=f"row {i+1}",
+                expected=None if row1 is None else f"{len(row1)} columns",
+                actual=None if row2 is None else f"{len(row2)} columns",
+                diff_type="row_count_mismatch"
+            )
+        if len(row1) != len(row2):
+            return Difference(
+                position=f"row {i+1}",
+                expected=f"{len(row1)} columns",
+                actual=f"{len(row2)} columns",
+                diff_type="column_count_mismatch"
+            )
+        j = next(j for j, (cell1, cell2) in enumerate(zip(row1, row2)) if cell1 != cell2)
+        return Difference(
+            position=f"row {i+1}, column {j+1}",
+            expected=row1[j],
+            actual=row2[j],
+            diff_type="cell_mismatch"
+        )
+    
+    def compare_content(self, content1, content2):
+        """
+        @brief Compare CSV content structurally
+        @param content1 list: First CSV data to compare (list of rows)
+        @param content2 list: Second CSV data to compare (list of rows)
+        @return tuple: (bool, list) - (identical, differences)
+        @details Performs structural comparison of CSV data, including:
+                 - Row count comparison
+                 - Column count comparison per row
+                 - Cell value comparison
+                 - Counts every differing cell, lists up to max_differences of them
+        """
+        if content1 == content2:
+            return True, []
+            
+        collector = self._new_collector()
+        
+        # Compare rows
+        for i, (row1, row2) in enumerate(zip(content1, content2)):
+            if row1 != row2:
+                self._compare_row(collector, f"row {i+1}", row1, row2)
+        
+        return self._row_results(collector, len(content1), len(content2))
+
+    def _compare_row(self, collector, position, row1, row2):
+        """
+        @brief Record the differences between two rows that are not equal
+        @param collector DifferenceCollector: Collector receiving the differences
+        @param position str: Position of the rows, such as "row 3" or "key 42"
+        @param row1 list: Row of the first file
+        @param row2 list: Row of the second file
+        """
+        # Check column count in this row
+        if len(row1) != len(row2):
+            collector.append(Difference(
+                position=position,
+                expected=f"{len(row1)} columns",
+                actual=f"{len(row2)} columns",
+                diff_type="column_count_mismatch"
+            ))
+        
+        # Once enough differences are listed, only count the differing cells
+        if collector.full:
+            collector.add_count(sum(map(ne, row1, row2)))
+            return
+        
+        # Compare column values
+        for j, (cell1, cell2) in enumerate(zip(row1, row2)):
+            if cell1 != cell2:
+                collector.append(Difference(
+                    position=f"{position}, column {j+1}",
+                    expected=cell1,
+                    actual=cell2,
+                    diff_type="cell_mismatch"
+                ))
+
+    def _row_results(self, collector, count1, count2):
+        """
+        @brief Build the comparison outcome from the collected row differences
+        @param collector DifferenceCollector: Differences of the rows both files have
+        @param count1 int: Number of rows of the first file
+        @param count2 int: Number of rows of the second file
+        @return tuple: (bool, list) - (identical, differences)
+        @details A row count difference is listed first, ahead of the cell differences.
+        """
+        differences = collector.differences
+        total = collector.total
+        if count1 != count2:
+            differences = [Difference(
+                position="row count",
+                expected=f"{count1} rows",
+                actual=f"{count2} rows",
+                diff_type="row_count_mismatch"
+            )] + differences[:max(0, self.difference_limit - 1)]
+            total += 1
+        if not total:
+            return True, []
+        return False, self._limit_differences(differences, total)
\ No newline at end of file
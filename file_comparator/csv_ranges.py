@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file csv_ranges.py
+@brief Splitting of CSV files into byte ranges on record boundaries, aligned by record number
+@author Xiaotong Wang
+@date 2025
+"""
+
+import os
+import numpy as np
+
+# Bytes scanned per read when locating record boundaries
+_SCAN_BLOCK = 1 << 24
+
+def record_ends(file_path, quotechar='"'):
+    """
+    @brief Locate the end of every CSV record of a file
+    @param file_path Path: CSV file in an ASCII-compatible encoding
+    @param quotechar str: Character used for quoting fields
+    @return generator: Per block read, a uint64 array of the offsets just past each newline
+            that ends a record
+    @details A newline ends a record unless an odd number of quote characters precede it,
+             i.e. unless it lies inside a quoted field; doubled quotes inside quoted fields
+             do not change the parity. The quote parity is carried from block to block, so
+             the boundaries are exact for the whole file. Blocks without quote characters
+             are scanned for newlines only.
+    """
+    quote = quotechar.encode('ascii')
+    parity = 0
+    base = 0
+    with open(file_path, 'rb') as f:
+        while True:
+            data = f.read(_SCAN_BLOCK)
+            if not data:
+                break
+            buffer = np.frombuffer(data, dtype=np.uint8)
+            newlines = np.flatnonzero(buffer == ord('\n'))
+            if quote in data:
+                quotes = np.flatnonzero(buffer == ord(quote))
+                newlines = newlines[(np.searchsorted(quotes, newlines) + parity) % 2 == 0]
+                parity = (parity + len(quotes)) % 2
+            yield newlines.astype(np.uint64) + np.uint64(base + 1)
+            base += len(data)
+
+def aligned_ranges(file1, file2, range_bytes, quotechar='"'):
+    """
+    @brief Cut two CSV files into ranges holding the same record numbers
+    @param file1 Path: First CSV file, cut every range_bytes bytes at the next record boundary
+    @param file2 Path: Second CSV file, cut after the same numbers of records
+    @param range_bytes int: Approximate size of the ranges of the first file
+    @param quotechar str: Character used for quoting fields
+    @return list: (start1, end1, start2, end2, first_record) per range, first_record being the
+            0-based number of the range's first record in both files
+    @details Each file is scanned once for record boundaries (see record_ends()), which is
+             far cheaper than parsing it. Where the second file has fewer records, its
+             ranges past its end are empty; its last range runs to the end of the file.
+    """
+    size1 = os.path.getsize(file1)
+    size2 = os.path.getsize(file2)
+    cuts1, records = [], []
+    target = range_bytes
+    count = 0
+    for ends in record_ends(file1, quotechar):
+        while target < size1:
+            index = int(np.searchsorted(ends, target))
+            if index == len(ends):
+                break
+            if int(ends[index]) < size1:
+                cuts1.append(int(ends[index]))
+                records.append(count + index + 1)
+            target = int(ends[index]) + range_bytes
+        count += len(ends)
+
+    cuts2 = []
+    count = 0
+    for ends in record_ends(file2, quotechar):
+        while len(cuts2) < len(records) and records[len(cuts2)] <= count + len(ends):
+            cuts2.append(int(ends[records[len(cuts2)] - count - 1]))
+        count += len(ends)
+    cuts2 += [size2] * (len(records) - len(cuts2))
+
+    starts1, starts2 = [0] + cuts1, [0] + cuts2
+    return [(start1, end1, start2, end2, first)
+            for start1, end1, start2, end2, first
+            in zip(starts1, cuts1 + [size1], starts2, cuts2 + [size2], [0] + records)]
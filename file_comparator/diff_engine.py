@@ -0,0 +1,380 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file diff_engine.py
+@brief Pluggable line diff engines producing difflib-style opcodes
+@author Xiaotong Wang
+@date 2025
+"""
+
+import difflib
+from bisect import bisect_left
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
+
+def intern_lines(lines1, lines2):
+    """
+    @brief Map the lines of two sequences to shared integer IDs
+    @param lines1 list: First sequence of lines
+    @param lines2 list: Second sequence of lines
+    @return tuple: (list, list) - Integer ID sequences for both inputs
+    @details Equal lines receive the same ID, so the diff algorithms only compare
+             small integers instead of (potentially long) strings.
+    """
+    table = {line: line_id for line_id, line in enumerate(dict.fromkeys(chain(lines1, lines2)))}
+    return list(map(table.__getitem__, lines1)), list(map(table.__getitem__, lines2))
+
+def blocks_to_opcodes(blocks, len1, len2):
+    """
+    @brief Convert matching blocks into difflib-style opcodes
+    @param blocks list: Ordered (i, j, size) matching blocks
+    @param len1 int: Length of the first sequence
+    @param len2 int: Length of the second sequence
+    @return list: (tag, i1, i2, j1, j2) tuples with tags 'equal', 'replace', 'delete', 'insert'
+    """
+    opcodes = []
+    i = j = 0
+    for ai, bj, size in list(blocks) + [(len1, len2, 0)]:
+        if i < ai and j < bj:
+            opcodes.append(('replace', i, ai, j, bj))
+        elif i < ai:
+            opcodes.append(('delete', i, ai, j, bj))
+        elif j < bj:
+            opcodes.append(('insert', i, ai, j, bj))
+        i, j = ai + size, bj + size
+        if size:
+            if opcodes and opcodes[-1][0] == 'equal':
+                _, ei1, _, ej1, _ = opcodes.pop()
+                opcodes.append(('equal', ei1, i, ej1, j))
+            else:
+                opcodes.append(('equal', ai, i, bj, j))
+    return opcodes
+
+# Number of elements compared at once when skipping over long common runs
+_RUN_STEP = 1024
+
+def _common_prefix(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    @brief Length of the common prefix of two ID ranges
+    @return int: Number of leading elements that are equal
+    @details Long equal runs are skipped with slice comparisons so that the element-wise
+             loop only runs over the last, partially matching step.
+    """
+    limit = min(a_hi - a_lo, b_hi - b_lo)
+    prefix = 0
+    while prefix + _RUN_STEP <= limit and \
+            a[a_lo + prefix:a_lo + prefix + _RUN_STEP] == b[b_lo + prefix:b_lo + prefix + _RUN_STEP]:
+        prefix += _RUN_STEP
+    while prefix < limit and a[a_lo + prefix] == b[b_lo + prefix]:
+        prefix += 1
+    return prefix
+
+def _common_suffix(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    @brief Length of the common suffix of two ID ranges
+    @return int: Number of trailing elements that are equal
+    """
+    limit = min(a_hi - a_lo, b_hi - b_lo)
+    suffix = 0
+    while suffix + _RUN_STEP <= limit and \
+            a[a_hi - suffix - _RUN_STEP:a_hi - suffix] == b[b_hi - suffix - _RUN_STEP:b_hi - suffix]:
+        suffix += _RUN_STEP
+    while suffix < limit and a[a_hi - suffix - 1] == b[b_hi - suffix - 1]:
+        suffix += 1
+    return suffix
+
+def _bisect(a, b, a_lo, a_hi, b_lo, b_hi):
+    """
+    @brief Find the middle snake of the shortest edit script (Myers, linear space)
+    @param a list: First ID sequence
+    @param b list: Second ID sequence
+    @param a_lo int: Start of the range in a
+    @param a_hi int: End of the range in a (exclusive)
+    @param b_lo int: Start of the range in b
+    @param b_hi int: End of the range in b (exclusive)
+    @return tuple: (x, y) split point relative to (a_lo, b_lo), or None if nothing matches
+    @details Runs the forward and reverse searches of the O(ND) algorithm at the same time
+             until they overlap. Only two diagonal vectors are kept, so memory is
+             O(N + M) whatever the number of differences.
+    """
+    n = a_hi - a_lo
+    m = b_hi - b_lo
+    max_d = (n + m + 1) // 2
+    v_offset = max_d
+    v_length = 2 * max_d + 2
+    v1 = [-1] * v_length
+    v2 = [-1] * v_length
+    v1[v_offset + 1] = 0
+    v2[v_offset + 1] = 0
+    delta = n - m
+    # If the total number of elements is odd, the forward path collides with the reverse path
+    front = delta % 2 != 0
+    k1start = k1end = k2start = k2end = 0
+
+    for d in range(max_d):
+        # Walk the forward path one step
+        for k1 in range(-d + k1start, d + 1 - k1end, 2):
+            k1_offset = v_offset + k1
+            if k1 == -d or (k1 != d and v1[k1_offset - 1] < v1[k1_offset + 1]):
+                x1 = v1[k1_offset + 1]
+            else:
+                x1 = v1[k1_offset - 1] + 1
+            y1 = x1 - k1
+            while x1 < n and y1 < m and a[a_lo + x1] == b[b_lo + y1]:
+                x1 += 1
+                y1 += 1
+            v1[k1_offset] = x1
+            if x1 > n:
+                k1end += 2
+            elif y1 > m:
+                k1start += 2
+            elif front:
+                k2_offset = v_offset + delta - k1
+                if 0 <= k2_offset < v_length and v2[k2_offset] != -1:
+                    # Mirror x2 onto the top-left coordinate system
+                    if x1 >= n - v2[k2_offset]:
+                        return x1, y1
+
+        # Walk the reverse path one step
+        for k2 in range(-d + k2start, d + 1 - k2end, 2):
+            k2_offset = v_offset + k2
+            if k2 == -d or (k2 != d and v2[k2_offset - 1] < v2[k2_offset + 1]):
+                x2 = v2[k2_offset + 1]
+            else:
+                x2 = v2[k2_offset - 1] + 1
+            y2 = x2 - k2
+            while x2 < n and y2 < m and a[a_hi - x2 - 1] == b[b_hi - y2 - 1]:
+                x2 += 1
+                y2 += 1
+            v2[k2_offset] = x2
+            if x2 > n:
+                k2end += 2
+            elif y2 > m:
+                k2start += 2
+            elif not front:
+                k1_offset = v_offset + delta - k2
+                if 0 <= k1_offset < v_length and v1[k1_offset] != -1:
+                    x1 = v1[k1_offset]
+                    y1 = v_offset + x1 - k1_offset
+                    if x1 >= n - x2:
+                        return x1, y1
+
+    return None
+
+def _myers_blocks(a, b, a_lo, a_hi, b_lo, b_hi, blocks):
+    """
+    @brief Recursively collect matching blocks between two ID ranges
+    @param a list: First ID sequence
+    @param b list: Second ID sequence
+    @param a_lo int: Start of the range in a
+    @param a_hi int: End of the range in a (exclusive)
+    @param b_lo int: Start of the range in b
+    @param b_hi int: End of the range in b (exclusive)
+    @param blocks list: Output list of (i, j, size) matching blocks, appended in order
+    """
+    # Strip the common prefix
+    prefix = _common_prefix(a, b, a_lo, a_hi, b_lo, b_hi)
+    if prefix:
+        blocks.append((a_lo, b_lo, prefix))
+        a_lo += prefix
+        b_lo += prefix
+
+    # Strip the common suffix
+    suffix = _common_suffix(a, b, a_lo, a_hi, b_lo, b_hi)
+    a_hi -= suffix
+    b_hi -= suffix
+
+    if a_lo < a_hi and b_lo < b_hi:
+        split = _bisect(a, b, a_lo, a_hi, b_lo, b_hi)
+        if split is not None:
+            x, y = split
+            _myers_blocks(a, b, a_lo, a_lo + x, b_lo, b_lo + y, blocks)
+            _myers_blocks(a, b, a_lo + x, a_hi, b_lo + y, b_hi, blocks)
+
+    if suffix:
+        blocks.append((a_hi, b_hi, suffix))
+
+def _expand_blocks(blocks, index1, index2):
+    """
+    @brief Map matching blocks of filtered sequences back to original positions
+    @param blocks list: (i, j, size) blocks in filtered coordinates
+    @param index1 list: Original position of every element of the first filtered sequence
+    @param index2 list: Original position of every element of the second filtered sequence
+    @return list: (i, j, size) blocks in original coordinates
+    @details A filtered block is split wherever dropped lines sit between its elements.
+             Positions are strictly increasing, so a run is contiguous exactly when its
+             end points are; runs are bisected until that holds, which keeps the cost
+             proportional to the number of gaps rather than to the block size.
+    """
+    expanded = []
+    for i, j, size in blocks:
+        pending = [(i, j, size)]
+        while pending:
+            bi, bj, bsize = pending.pop()
+            last = bsize - 1
+            if index1[bi + last] - index1[bi] == last and index2[bj + last] - index2[bj] == last:
+                expanded.append((index1[bi], index2[bj], bsize))
+            else:
+                half = bsize // 2
+                # Push the right half first so the left half is emitted first
+                pending.append((bi + half, bj + half, bsize - half))
+                pending.append((bi, bj, half))
+    return expanded
+
+def myers_opcodes(lines1, lines2):
+    """
+    @brief Diff two line sequences with Myers' O(ND) algorithm
+    @param lines1 list: First sequence of lines
+    @param lines2 list: Second sequence of lines
+    @return list: difflib-style (tag, i1, i2, j1, j2) opcodes
+    @details Lines are interned to integer IDs first. Runtime grows with the number of
+             differences rather than with the product of the input lengths, which keeps
+             large files with few changes fast.
+    """
+    a, b = intern_lines(lines1, lines2)
+    return blocks_to_opcodes(_myers_id_blocks(a, b), len(a), len(b))
+
+def _myers_id_blocks(a, b):
+    """
+    @brief Compute the matching blocks of two interned ID sequences
+    @param a list: First ID sequence
+    @param b list: Second ID sequence
+    @return list: Ordered (i, j, size) matching blocks
+    """
+    # Lines that occur on one side only can never be matched, drop them before the search
+    common = set(a).intersection(b)
+    if not common:
+        return []
+    index1 = [i for i, line_id in enumerate(a) if line_id in common]
+    index2 = [j for j, line_id in enumerate(b) if line_id in common]
+    if len(index1) == len(a) and len(index2) == len(b):
+        blocks = []
+        _myers_blocks(a, b, 0, len(a), 0, len(b), blocks)
+        return blocks
+
+    filtered1 = [a[i] for i in index1]
+    filtered2 = [b[j] for j in index2]
+    filtered_blocks = []
+    _myers_blocks(filtered1, filtered2, 0, len(filtered1), 0, len(filtered2), filtered_blocks)
+    return _expand_blocks(filtered_blocks, index1, index2)
+
+def difflib_opcodes(lines1, lines2):
+    """
+    @brief Diff two line sequences with difflib.SequenceMatcher
+    @param lines1 list: First sequence of lines
+    @param lines2 list: Second sequence of lines
+    @return list: difflib-style (tag, i1, i2, j1, j2) opcodes
+    @details Same matcher that difflib.unified_diff uses, kept as a reference engine
+             to cross-check the results of the faster algorithms.
+    """
+    return difflib.SequenceMatcher(None, lines1, lines2).get_opcodes()
+
+DIFF_ENGINES = {
+    "myers": myers_opcodes,
+    "difflib": difflib_opcodes,
+}
+
+def get_diff_engine(name):
+    """
+    @brief Look up a diff engine by name
+    @param name str: Name of the diff algorithm
+    @return callable: Function taking two line sequences and returning opcodes
+    @throws ValueError: If the algorithm is unknown
+    """
+    try:
+        return DIFF_ENGINES[name.lower()]
+    except KeyError:
+        raise ValueError(f"Unknown diff algorithm: {name}. Available: {', '.join(sorted(DIFF_ENGINES))}")
+
+def unique_anchors(a, b):
+    """
+    @brief Find patience-style anchor lines shared by two ID sequences
+    @param a list: First ID sequence
+    @param b list: Second ID sequence
+    @return list: (i, j) pairs, increasing in both i and j
+    @details Candidates are lines that occur exactly once in each sequence. The longest
+             chain of candidates that is ordered the same way on both sides (found by
+             patience sorting in O(n log n)) is returned; those lines are certain to be
+             matched and split the inputs into independent segments.
+    """
+    counts1 = Counter(a)
+    counts2 = Counter(b)
+    position2 = {line_id: j for j, line_id in enumerate(b) if counts2[line_id] == 1}
+    candidates = [(i, position2[line_id]) for i, line_id in enumerate(a)
+                  if counts1[line_id] == 1 and line_id in position2]
+
+    # Longest increasing subsequence of the j positions
+    tails = []
+    tail_index = []
+    previous = [-1] * len(candidates)
+    for k, (_, j) in enumerate(candidates):
+        pile = bisect_left(tails, j)
+        if pile == len(tails):
+            tails.append(j)
+            tail_index.append(k)
+        else:
+            tails[pile] = j
+            tail_index[pile] = k
+        previous[k] = tail_index[pile - 1] if pile > 0 else -1
+
+    anchors = []
+    k = tail_index[-1] if tail_index else -1
+    while k != -1:
+        anchors.append(candidates[k])
+        k = previous[k]
+    anchors.reverse()
+    return anchors
+
+def _segment_blocks(task):
+    """
+    @brief Diff one anchor-delimited segment (process pool worker)
+    @param task tuple: (algorithm, offset1, offset2, a_segment, b_segment)
+    @return list: (i, j, size) matching blocks in global coordinates
+    """
+    algorithm, offset1, offset2, a_segment, b_segment = task
+    if algorithm == "myers":
+        blocks = _myers_id_blocks(a_segment, b_segment)
+    else:
+        blocks = [(i1, j1, i2 - i1) for tag, i1, i2, j1, j2
+                  in get_diff_engine(algorithm)(a_segment, b_segment) if tag == 'equal']
+    return [(i + offset1, j + offset2, size) for i, j, size in blocks]
+
+def parallel_opcodes(lines1, lines2, algorithm="myers", num_workers=4, segments_per_worker=4):
+    """
+    @brief Diff two line sequences across a process pool
+    @param lines1 list: First sequence of lines
+    @param lines2 list: Second sequence of lines
+    @param algorithm str: Diff engine used for every segment
+    @param num_workers int: Number of worker processes
+    @param segments_per_worker int: Segments scheduled per worker, for load balancing
+    @return list: difflib-style (tag, i1, i2, j1, j2) opcodes with global line numbers
+    @details Unique anchor lines cut both inputs into aligned segments of roughly equal
+             size. Each segment is diffed independently in a worker and the matching
+             blocks are shifted back to global positions and stitched together.
+             Falls back to a single in-process diff when no anchors are found.
+    """
+    a, b = intern_lines(lines1, lines2)
+    anchors = unique_anchors(a, b)
+    num_segments = max(1, num_workers * segments_per_worker)
+    if not anchors or num_workers <= 1:
+        return blocks_to_opcodes(_segment_blocks((algorithm, 0, 0, a, b)), len(a), len(b))
+
+    # Pick evenly spaced anchors as cut points
+    cuts = [(0, 0)]
+    step = len(a) / num_segments
+    next_cut = step
+    for i, j in anchors:
+        if i >= next_cut:
+            cuts.append((i, j))
+            next_cut = i + step
+    cuts.append((len(a), len(b)))
+
+    tasks = [(algorithm, i1, j1, a[i1:i2], b[j1:j2])
+             for (i1, j1), (i2, j2) in zip(cuts, cuts[1:])]
+    blocks = []
+    with ProcessPoolExecutor(max_workers=num_workers) as executor:
+        for segment_blocks in executor.map(_segment_blocks, tasks):
+            blocks.extend(segment_blocks)
+    return blocks_to_opcodes(blocks, len(a), len(b))
\ No newline at end of file
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file extents.py
+@brief Data extents of sparse files, found with SEEK_DATA/SEEK_HOLE
+@author Xiaotong Wang
+@date 2025
+"""
+
+import errno
+import os
+
+def data_extents(file_path, start=0, end=None):
+    """
+    @brief List the parts of a byte range that hold data rather than holes
+    @param file_path Path: File to inspect
+    @param start int: First byte of the range
+    @param end int: End of the range (exclusive, None for end of file)
+    @return list: Sorted, disjoint (start, end) extents clipped to the range, or None if the
+            platform or filesystem cannot report holes
+    @details Holes read as zeros without touching the disk. Filesystems without hole
+             tracking report the whole file as one data extent, so the result is always
+             safe to use.
+    """
+    if not hasattr(os, "SEEK_DATA"):
+        return None
+    extents = []
+    fd = os.open(file_path, os.O_RDONLY)
+    try:
+        size = os.fstat(fd).st_size
+        end = size if end is None else min(end, size)
+        offset = start
+        while offset < end:
+            try:
+                data = os.lseek(fd, offset, os.SEEK_DATA)
+            except OSError as e:
+                if e.errno == errno.ENXIO:
+                    # No data after offset
+                    break
+                return None
+            if data >= end:
+                break
+            hole = os.lseek(fd, data, os.SEEK_HOLE)
+            extents.append((data, min(hole, end)))
+            offset = hole
+    finally:
+        os.close(fd)
+    return extents
+
+def merge_extents(*extent_lists):
+    """
+    @brief Merge the data extents of several files
+    @param extent_lists list: Extent lists as returned by data_extents()
+    @return list: Sorted, disjoint (start, end) extents covering every input extent;
+            outside of them all files have holes
+    """
+    merged = []
+    for start, end in sorted(extent for extents in extent_lists for extent in extents):
+        if merged and start <= merged[-1][1]:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
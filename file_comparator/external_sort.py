@@ -0,0 +1,122 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file external_sort.py
+@brief External merge sort spilling sorted runs to disk, and a merge join of sorted streams
+@author Xiaotong Wang
+@date 2025
+"""
+
+import heapq
+import pickle
+import tempfile
+from itertools import groupby, islice
+
+# Items pickled together when a run is written; larger batches pickle faster
+_BATCH_SIZE = 4096
+
+# Runs merged at once; more runs are first merged in groups, which bounds the number of
+# open files
+MAX_MERGE_RUNS = 64
+
+def _write_run(items, directory):
+    """
+    @brief Write sorted items to an anonymous temporary file
+    @param items iterable: Sorted items
+    @param directory str: Directory of the temporary file (None for the system default)
+    @return file: Temporary file positioned at its start, deleted when closed
+    """
+    run = tempfile.TemporaryFile(dir=directory)
+    items = iter(items)
+    while True:
+        batch = list(islice(items, _BATCH_SIZE))
+        if not batch:
+            break
+        pickle.dump(batch, run, pickle.HIGHEST_PROTOCOL)
+    run.seek(0)
+    return run
+
+def _read_run(run):
+    """
+    @brief Read back the items of a run written by _write_run()
+    @param run file: Temporary run file
+    @return generator: Items in their sorted order; the file is closed at the end
+    """
+    with run:
+        while True:
+            try:
+                batch = pickle.load(run)
+            except EOFError:
+                return
+            yield from batch
+
+def external_sort(items, key, run_size, directory=None):
+    """
+    @brief Sort a stream of items holding at most run_size of them in memory
+    @param items iterable: Items to sort
+    @param key callable: Sort key of an item
+    @param run_size int: Number of items sorted in memory at a time
+    @param directory str: Directory the runs are spilled to (None for the system default)
+    @return iterator: Items in key order, equal keys in their input order
+    @details Items are read in runs of run_size, each run sorted and written to a temporary
+             file, and the runs are merged lazily with a heap. When all items fit in one
+             run nothing is written to disk. Whenever MAX_MERGE_RUNS runs of the same
+             tier exist they are merged into one run of the next tier, so few files are
+             open at a time and every item is rewritten only a logarithmic number of times.
+    """
+    items = iter(items)
+    runs = []
+    while True:
+        chunk = list(islice(items, run_size))
+        chunk.sort(key=key)
+        if len(chunk) < run_size and not runs:
+            return iter(chunk)
+        if chunk:
+            runs.append((0, _write_run(chunk, directory)))
+        while len(runs) >= MAX_MERGE_RUNS and runs[-MAX_MERGE_RUNS][0] == runs[-1][0]:
+            tier = runs[-1][0] + 1
+            merged = _merge_runs([run for _, run in runs[-MAX_MERGE_RUNS:]], key)
+            runs[-MAX_MERGE_RUNS:] = [(tier, _write_run(merged, directory))]
+        if len(chunk) < run_size:
+            break
+    while len(runs) > MAX_MERGE_RUNS:
+        runs = [(0, _write_run(_merge_runs([run for _, run in runs[i:i + MAX_MERGE_RUNS]], key), directory))
+                for i in range(0, len(runs), MAX_MERGE_RUNS)]
+    return _merge_runs([run for _, run in runs], key)
+
+def _merge_runs(runs, key):
+    """
+    @brief Merge sorted runs lazily
+    @param runs list: Temporary run files, in input order
+    @param key callable: Sort key of an item
+    @return iterator: Items of all runs in key order
+    @details heapq.merge is stable across its inputs, so equal keys keep their input order
+             as long as only consecutive runs are merged together.
+    """
+    return heapq.merge(*(_read_run(run) for run in runs), key=key)
+
+def merge_join(sorted1, sorted2, key):
+    """
+    @brief Pair up the items of two streams sorted by the same key
+    @param sorted1 iterable: First stream, in key order
+    @param sorted2 iterable: Second stream, in key order
+    @param key callable: Key of an item
+    @return generator: (key, items1, items2) for every key of either stream, in key order;
+            items1 or items2 is empty when the key is missing from that stream
+    """
+    groups1 = groupby(sorted1, key)
+    groups2 = groupby(sorted2, key)
+    group1 = next(groups1, None)
+    group2 = next(groups2, None)
+    while group1 is not None or group2 is not None:
+        if group2 is None or (group1 is not None and group1[0] < group2[0]):
+            yield group1[0], list(group1[1]), []
+            group1 = next(groups1, None)
+        elif group1 is None or group2[0] < group1[0]:
+            yield group2[0], [], list(group2[1])
+            group2 = next(groups2, None)
+        else:
+            yield group1[0], list(group1[1]), list(group2[1])
+            group1 = next(groups1, None)
+            group2 = next(groups2, None)
@@ -0,0 +1,328 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file f06_comparator.py
+@brief Nastran F06 results comparator that compares result tables as arrays
+@author Xiaotong Wang
+@date 2025
+"""
+
+import re
+import numpy as np
+from .text_comparator import TextComparator
+from .numeric import numbers_close, try_parse_numbers
+from .result import Difference
+
+# A table title printed with spaced-out letters, e.g. 'D I S P L A C E M E N T   V E C T O R',
+# optionally followed by a number as in 'R E A L   E I G E N V E C T O R   N O .   1'
+_SPACED_WORD = r'[A-Z0-9()./,*-](?: [A-Z0-9()./,*-])+'
+_TABLE_TITLE = re.compile(rf'(?<!\S){_SPACED_WORD}(?: {{2,}}{_SPACED_WORD})*(?: +\d+)?(?!\S)')
+
+# A data row: after the carriage control column the first token is a number
+_ROW_START = re.compile(r' *[+-]?\.?\d')
+
+# Tokens of a data row that hold values; type codes such as 'G' or 'CEN/4' are dropped
+_NUMBER_START = frozenset('0123456789+-.')
+
+_SUBCASE = re.compile(r'\bSUBCASE\s+(\d+)')
+
+class F06Comparator(TextComparator):
+    """
+    @brief Comparator for Nastran F06 output files with table-aware comparison
+    @details This class extends TextComparator to compare the results printed in an
+             F06 file instead of its text:
+             - Page headers, dates, banners and echo sections are skipped
+             - Displacement, eigenvector, stress, force and eigenvalue tables are parsed
+               into NumPy arrays keyed by subcase, table title and entity ID
+             - Values are compared with rtol/atol and the largest deviations of every
+               table are reported
+             - Fatal messages are compared as text
+    """
+
+    # Content is parsed before comparison, so never diff raw lines
+    raw_line_compare = False
+
+    # Tables whose collapsed title contains one of these words are parsed
+    TABLE_KEYWORDS = ('DISPLACEMENT', 'EIGENVECTOR', 'EIGENVALUE', 'STRESS', 'FORCE')
+
+    # Number of largest deviations, missing and extra rows reported per table
+    MAX_TABLE_DIFFERENCES = 3
+
+    # Number of value tokens collected before they are converted to floats in one call
+    PARSE_BATCH = 1 << 20
+
+    def __init__(self, encoding="utf-8", chunk_size=8192, verbose=False, rtol=1e-5, atol=1e-8, line_index=False,
+                 max_differences=10, count_only=False,
+                 fail_fast=False):
+        """
+        @brief Initialize the F06 comparator
+        @param encoding str: File encoding (default: "utf-8")
+        @param chunk_size int: Size of chunks for reading large files (default: 8192)
+        @param verbose bool: Enable verbose logging (default: False)
+        @param rtol float: Relative tolerance for result values (default: 1e-5)
+        @param atol float: Absolute tolerance for result values (default: 1e-8)
+        @param line_index bool: Seek to start_line through a sidecar line offset index (default: False)
+        @param max_differences int: Number of differences listed in the result (default: 10)
+        @param count_only bool: Only count the differences, list none of them (default: False)
+        @param fail_fast bool: Stop at the first difference (default: False)
+        """
+        super().__init__(encoding, chunk_size, verbose, line_index=line_index,
+                         max_differences=max_differences, count_only=count_only, fail_fast=fail_fast)
+        self.rtol = rtol
+        self.atol = atol
+
+    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Stream an F06 file and collect its result tables
+        @param file_path Path: Path to the F06 file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param start_column int: Starting column number (ignored, tables are parsed by token)
+        @param end_column int: Ending column number (ignored, tables are parsed by token)
+        @return dict: 'tables' mapping (subcase, title) to row arrays, and 'fatal' messages
+        @details The file is read in a single pass. A page header (carriage control '1')
+                 closes the current table; the title repeated on the next page reopens it.
+                 Rows are numbered per entity ID so second fibers, corner points and
+                 repeated blocks keep distinct keys. Value tokens are converted to floats
+                 in batches, see _close_tables(); tokens that are not numbers become NaN.
+        """
+        if start_column > 0 or end_column is not None:
+            self.logger.debug("Column range ignored for F06 files, tables are compared value by value")
+
+        tables = {}
+        fatal = []
+        subcase = 0
+        table = None
+        entity = None
+        for line in self.iter_lines(file_path, start_line, end_line):
+            if line.startswith('1'):
+                # New page: header lines until the table title is repeated
+                table = None
+                continue
+            if 'SUBCASE' in line:
+                match = _SUBCASE.search(line)
+                if match:
+                    subcase = int(match.group(1))
+                continue
+            if 'FATAL' in line:
+                fatal.append(line.strip() + '\n')
+                continue
+
+            if table is not None and _ROW_START.match(line, 1):
+                tokens = [token for token in line[1:].split() if token[0] in _NUMBER_START]
+                if tokens[0].isdigit():
+                    entity = int(tokens[0])
+                    tokens = tokens[1:]
+                elif entity is None:
+                    continue
+                row = table["seen"].get(entity, 0)
+                table["seen"][entity] = row + 1
+                table["ids"].append(entity)
+                table["rows"].append(row)
+                table["counts"].append(len(tokens))
+                table["tokens"].extend(tokens)
+                if len(table["tokens"]) >= self.PARSE_BATCH:
+                    table["chunks"].append(try_parse_numbers(table["tokens"])[0])
+                    table["tokens"] = []
+                continue
+
+            match = _TABLE_TITLE.search(line)
+            if match:
+                title = " ".join(re.sub(r'(?<=\S) (?=\S)', '', word)
+                                 for word in re.split(r' {2,}', match.group(0)))
+                if sum(c.isalpha() for c in title) < 6:
+                    continue
+                entity = None
+                table = None
+                if any(keyword in title for keyword in self.TABLE_KEYWORDS):
+                    key = (subcase, title)
+                    if key not in tables:
+                        tables[key] = {"ids": [], "rows": [], "counts": [], "tokens": [],
+                                       "chunks": [], "seen": {}}
+                    table = tables[key]
+
+        self.logger.debug(f"Parsed {len(tables)} result tables from {file_path}")
+        return {"tables": self._close_tables(tables), "fatal": fatal}
+
+    @staticmethod
+    def _close_tables(tables):
+        """
+        @brief Turn the rows collected for every table into arrays
+        @param tables dict: Tables as collected by read_content()
+        @return dict: (subcase, title) -> dict of ids, rows, offsets and values arrays
+                such that the values of row i are values[offsets[i]:offsets[i+1]]
+        """
+        closed = {}
+        for key, table in tables.items():
+            chunks = table["chunks"] + [try_parse_numbers(table["tokens"])[0]]
+            offsets = np.zeros(len(table["counts"]) + 1, dtype=np.int64)
+            np.cumsum(table["counts"], out=offsets[1:])
+            closed[key] = {
+                "ids": np.asarray(table["ids"], dtype=np.int64),
+                "rows": np.asarray(table["rows"], dtype=np.int64),
+                "offsets": offsets,
+                "values": np.concatenate(chunks)
+            }
+        return closed
+
+    def compare_content(self, content1, content2):
+        """
+        @brief Compare the result tables of two F06 files
+        @param content1 dict: First parsed F06 file
+        @param content2 dict: Second parsed F06 file
+        @return tuple: (bool, list) - (identical, differences)
+        @details Fatal messages are diffed as text. Tables are matched by subcase and
+                 title, rows by entity ID and row number, and all values of a table are
+                 checked with one np.isclose call. Every value outside tolerance and every
+                 missing or extra row is counted, while only the largest deviations of each
+                 table are listed. In fail-fast mode no table is compared after the first
+                 difference.
+        """
+        differences = []
+        total = 0
+        fatal1, fatal2 = content1["fatal"], content2["fatal"]
+        if fatal1 != fatal2:
+            opcodes, total = self._limit_opcodes(self._diff_lines(fatal1, fatal2))
+            differences.extend(self._opcodes_to_differences(opcodes, fatal1, fatal2))
+
+        tables1, tables2 = content1["tables"], content2["tables"]
+        for key, table1 in tables1.items():
+            if self.fail_fast and total:
+                break
+            if key in tables2:
+                table_differences, count = self._compare_table(key, table1, tables2[key])
+                differences.extend(table_differences)
+                total += count
+            else:
+                total += 1
+                differences.append(Difference(
+                    position=self._table_label(key),
+                    expected=f"{len(table1['ids'])} rows",
+                    actual=None,
+                    diff_type="missing"
+                ))
+        for key, table2 in tables2.items():
+            if self.fail_fast and total:
+                break
+            if key not in tables1:
+                total += 1
+                differences.append(Difference(
+                    position=self._table_label(key),
+                    expected=None,
+                    actual=f"{len(table2['ids'])} rows",
+                    diff_type="extra"
+                ))
+
+        if not total:
+            return True, []
+        return False, self._limit_differences(differences, total)
+
+    def _compare_table(self, key, table1, table2):
+        """
+        @brief Compare one result table row by row
+        @param key tuple: (subcase, title) of the table
+        @param table1 dict: Table arrays of the first file
+        @param table2 dict: Table arrays of the second file
+        @return tuple: (list, int) - Difference objects for the largest deviations, missing and
+                extra rows, and the number of differing values and rows
+        """
+        ids1, rows1, offsets1, values1 = table1["ids"], table1["rows"], table1["offsets"], table1["values"]
+        ids2, rows2, offsets2, values2 = table2["ids"], table2["rows"], table2["offsets"], table2["values"]
+
+        # Row keys are unique within a table, so they can be matched as sorted integers
+        stride = max(int(rows1.max(initial=0)), int(rows2.max(initial=0))) + 1
+        _, matched1, matched2 = np.intersect1d(ids1 * stride + rows1, ids2 * stride + rows2,
+                                               assume_unique=True, return_indices=True)
+        matched1, matched2 = np.sort(matched1), matched2[np.argsort(matched1)]
+
+        differences = []
+        shown = min(self.MAX_TABLE_DIFFERENCES, self.difference_limit)
+
+        # Rows with a different number of values cannot be compared value by value
+        counts1 = np.diff(offsets1)[matched1]
+        counts2 = np.diff(offsets2)[matched2]
+        same = counts1 == counts2
+        for row1, row2 in zip(matched1[~same][:shown].tolist(),
+                              matched2[~same][:shown].tolist()):
+            differences.append(Difference(
+                position=self._row_label(key, ids1[row1], rows1[row1]),
+                expected=self._row_text(table1, row1),
+                actual=self._row_text(table2, row2),
+                diff_type="content"
+            ))
+
+        # Gather the values of all other matched rows into two aligned arrays
+        aligned1, aligned2, widths = matched1[same], matched2[same], counts1[same]
+        cell_row = np.repeat(np.arange(len(widths)), widths)
+        column = np.arange(len(cell_row)) - np.repeat(np.cumsum(widths) - widths, widths)
+        expected = values1[offsets1[aligned1][cell_row] + column]
+        actual = values2[offsets2[aligned2][cell_row] + column]
+
+        bad = np.flatnonzero(~numbers_close(expected, actual, self.rtol, self.atol))
+        if len(bad) and shown:
+            deviation = np.abs(expected[bad] - actual[bad])
+            deviation[np.isnan(deviation)] = np.inf
+            order = np.argsort(-deviation, kind='stable')[:shown]
+            self.logger.debug(f"{len(bad)} values outside tolerance in {self._table_label(key)}, "
+                              f"largest deviation {deviation[order[0]]}")
+            for cell in bad[order].tolist():
+                row1 = aligned1[cell_row[cell]]
+                differences.append(Difference(
+                    position=f"{self._row_label(key, ids1[row1], rows1[row1])}, column {column[cell]+1}",
+                    expected=str(expected[cell]),
+                    actual=str(actual[cell]),
+                    diff_type="content"
+                ))
+
+        missing = np.setdiff1d(np.arange(len(ids1)), matched1)
+        for row1 in missing[:shown].tolist():
+            differences.append(Difference(
+                position=self._row_label(key, ids1[row1], rows1[row1]),
+                expected=self._row_text(table1, row1),
+                actual=None,
+                diff_type="missing"
+            ))
+        extra = np.setdiff1d(np.arange(len(ids2)), matched2)
+        for row2 in extra[:shown].tolist():
+            differences.append(Difference(
+                position=f"{self._row_label(key, ids2[row2], rows2[row2])} (file2)",
+                expected=None,
+                actual=self._row_text(table2, row2),
+                diff_type="extra"
+            ))
+        return differences, int((~same).sum()) + len(bad) + len(missing) + len(extra)
+
+    @staticmethod
+    def _row_text(table, row):
+        """
+        @brief Render the values of a table row for reports
+        @param table dict: Table arrays
+        @param row int: Row number in the table
+        @return str: Values separated by spaces
+        """
+        offsets = table["offsets"]
+        return " ".join(map(str, table["values"][offsets[row]:offsets[row + 1]].tolist()))
+
+    @staticmethod
+    def _table_label(key):
+        """
+        @brief Describe a result table
+        @param key tuple: (subcase, title) of the table
+        @return str: Label such as 'SUBCASE 1, DISPLACEMENT VECTOR'
+        """
+        subcase, title = key
+        return f"SUBCASE {subcase}, {title}"
+
+    def _row_label(self, key, entity, row):
+        """
+        @brief Describe a row of a result table
+        @param key tuple: (subcase, title) of the table
+        @param entity int: Grid, element or mode ID of the row
+        @param row int: Number of the row among the rows of that ID (0-based)
+        @return str: Label such as 'SUBCASE 1, DISPLACEMENT VECTOR, ID 12'
+        """
+        label = f"{self._table_label(key)}, ID {entity}"
+        if row:
+            label += f" row {row+1}"
+        return label
@@ -1,326 +1,702 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
-"""
-@file json_comparator.py
-@brief JSON file comparator implementation with support for exact and key-based comparison
-@author Xiaotong Wang
-@date 2025
-"""
-
-import json
-from .text_comparator import TextComparator
-from .result import Difference
-
-class JsonComparator(TextComparator):
-    """
-    @brief Comparator for JSON files with support for exact and key-based comparison
-    @details This class extends TextComparator to provide specialized JSON comparison
-             capabilities, including:
-             - Exact comparison of JSON structures
-             - Key-based comparison for lists of objects
-             - Detailed difference reporting with path information
-    """
-    
-    def __init__(self, encoding="utf-8", chunk_size=8192, verbose=False, key_field=None, compare_mode="exact"):
-        """
-        @brief Initialize the JSON comparator
-        @param encoding str: File encoding
-        @param chunk_size int: Chunk size for reading files
-        @param verbose bool: Enable verbose logging
-        @param key_field str or list: Field name(s) to use as key for comparing JSON objects in lists
-        @param compare_mode str: Comparison mode: 'exact' (default) or 'key-based'
-        """
-        super().__init__(encoding, chunk_size, verbose)
-        self.key_field = key_field
-        self.compare_mode = compare_mode
-
-    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
-        """
-        @brief Read and parse JSON content from file
-        @param file_path Path: Path to the JSON file
-        @param start_line int: Starting line number
-        @param end_line int: Ending line number
-        @param start_column int: Starting column number
-        @param end_column int: Ending column number
-        @return dict or list: Parsed JSON content
-        @throws ValueError: If JSON is invalid or key fields are missing
-        """
-        # Read the text content using the parent class method
-        text_content = super().read_content(file_path, start_line, end_line, start_column, end_column)
-        
-        # Convert to a single string
-        json_text = ''.join(text_content)
-        try:
-            json_data = json.loads(json_text)
-            if self.key_field:
-                # Only keep the specified key field(s)
-                key_fields = self.key_field if isinstance(self.key_field, list) else [self.key_field]
-                filtered_data = {key: json_data[key] for key in key_fields if key in json_data}
-                return filtered_data
-            return json_data
-        except json.JSONDecodeError as e:
-            raise ValueError(f"Invalid JSON in {file_path}: {str(e)}")
-
-    def compare_content(self, content1, content2):
-        """
-        @brief Compare JSON content using the specified comparison mode
-        @param content1 dict or list: First JSON content to compare
-        @param content2 dict or list: Second JSON content to compare
-        @return tuple: (bool, list) - (identical, differences)
-        """
-        # Quick check for exact equality
-        if content1 == content2:
-            return True, []
-        
-        # Different comparison modes
-        differences = []
-        if self.compare_mode == "key-based" and self.key_field:
-            self._compare_json_key_based(content1, content2, "", differences)
-        else:
-            self._compare_json_exact(content1, content2, "", differences)
-            
-        return False, differences
-
-    def _compare_json_exact(self, obj1, obj2, path, differences, max_diffs=10):
-        """
-        @brief Perform exact JSON comparison
-        @param obj1: First JSON object to compare
-        @param obj2: Second JSON object to compare
-        @param path str: Current path in the JSON structure
-        @param differences list: List to store found differences
-        @param max_diffs int: Maximum number of differences to report
-        @details Compares JSON objects recursively, checking for:
-                 - Type mismatches
-                 - Missing or extra keys in dictionaries
-                 - Length mismatches in lists
-                 - Value mismatches
-        """
-        if len(differences) >= max_diffs:
-            return
-
-        # Type check
-        if type(obj1) != type(obj2):
-            differences.append(Difference(
-                position=path or "root",
-                expected=f"{type(obj1).__name__}: {obj1}",
-                actual=f"{type(obj2).__name__}: {obj2}",
-                diff_type="type_mismatch"
-            ))
-            return
-
-        # Dictionary comparison
-        if isinstance(obj1, dict):
-            keys1 = set(obj1.keys())
-            keys2 = set(obj2.keys())
-
-            # Check for missing keys
-            for key in keys1 - keys2:
-                differences.append(Difference(
-                    position=f"{path}.{key}" if path else key,
-                    expected=obj1[key],
-                    actual=None,
-                    diff_type="missing_key"
-                ))
-                if len(differences) >= max_diffs:
-                    return
-
-            # Check for extra keys
-            for key in keys2 - keys1:
-                differences.append(Difference(
-                    position=f"{path}.{key}" if path else key,
-                    expected=None,
-                    actual=obj2[key],
-                    diff_type="extra_key"
-                ))
-                if len(differences) >= max_diffs:
-                    return
-
-            # Compare common keys recursively
-            for key in keys1 & keys2:
-                new_path = f"{path}.{key}" if path else key
-                self._compare_json_exact(obj1[key], obj2[key], new_path, differences, max_diffs)
-
-        # List comparison
-        elif isinstance(obj1, list):
-            if len(obj1) != len(obj2):
-                differences.append(Difference(
-                    position=path or "root",
-                    expected=f"list with {len(obj1)} items",
-                    actual=f"list with {len(obj2)} items",
-                    diff_type="length_mismatch"
-                ))
-
-            # Compare items by position
-            for i in range(min(len(obj1), len(obj2))):
-                new_path = f"{path}[{i}]"
-                self._compare_json_exact(obj1[i], obj2[i], new_path, differences, max_diffs)
-
-        # Value comparison
-        elif obj1 != obj2:
-            differences.append(Difference(
-                position=path or "root",
-                expected=obj1,
-                actual=obj2,
-                diff_type="value_mismatch"
-            ))
-
-    def _compare_json_key_based(self, obj1, obj2, path, differences, max_diffs=10):
-        """
-        @brief Perform key-based JSON comparison for lists of objects
-        @param obj1: First JSON object to compare
-        @param obj2: Second JSON object to compare
-        @param path str: Current path in the JSON structure
-        @param differences list: List to store found differences
-        @param max_diffs int: Maximum number of differences to report
-        @details Similar to exact comparison but with special handling for lists
-                 of objects, using key fields to match items instead of position
-        """
-        if len(differences) >= max_diffs:
-            return
-
-        # Type check
-        if type(obj1) != type(obj2):
-            differences.append(Difference(
-                position=path or "root",
-                expected=f"{type(obj1).__name__}: {obj1}",
-                actual=f"{type(obj2).__name__}: {obj2}",
-                diff_type="type_mismatch"
-            ))
-            return
-
-        # Dictionary comparison (same as exact comparison)
-        if isinstance(obj1, dict):
-            keys1 = set(obj1.keys())
-            keys2 = set(obj2.keys())
-
-            # Check for missing keys
-            for key in keys1 - keys2:
-                differences.append(Difference(
-                    position=f"{path}.{key}" if path else key,
-                    expected=obj1[key],
-                    actual=None,
-                    diff_type="missing_key"
-                ))
-                if len(differences) >= max_diffs:
-                    return
-
-            # Check for extra keys
-            for key in keys2 - keys1:
-                differences.append(Difference(
-                    position=f"{path}.{key}" if path else key,
-                    expected=None,
-                    actual=obj2[key],
-                    diff_type="extra_key"
-                ))
-                if len(differences) >= max_diffs:
-                    return
-
-            # Compare common keys recursively
-            for key in keys1 & keys2:
-                new_path = f"{path}.{key}" if path else key
-                self._compare_json_key_based(obj1[key], obj2[key], new_path, differences, max_diffs)
-
-        # List comparison - the key difference for key-based comparison
-        elif isinstance(obj1, list) and isinstance(obj2, list):
-            # Check if we can do key-based comparison
-            if self.key_field and all(isinstance(item, dict) for item in obj1 + obj2):
-                self._compare_lists_by_key(obj1, obj2, path, differences, max_diffs)
-            else:
-                # Fall back to position-based comparison if key-based is not possible
-                if len(obj1) != len(obj2):
-                    differences.append(Difference(
-                        position=path or "root",
-                        expected=f"list with {len(obj1)} items",
-                        actual=f"list with {len(obj2)} items", 
-                        diff_type="length_mismatch"
-                    ))
-
-                # Compare items by position
-                for i in range(min(len(obj1), len(obj2))):
-                    new_path = f"{path}[{i}]"
-                    self._compare_json_key_based(obj1[i], obj2[i], new_path, differences, max_diffs)
-
-        # Value comparison
-        elif obj1 != obj2:
-            differences.append(Difference(
-                position=path or "root",
-                expected=obj1,
-                actual=obj2,
-                diff_type="value_mismatch"
-            ))
-
-    def _compare_lists_by_key(self, list1, list2, path, differences, max_diffs=10):
-        """
-        @brief Compare two lists of dictionaries using key field(s) to match items
-        @param list1 list: First list of dictionaries
-        @param list2 list: Second list of dictionaries
-        @param path str: Current path in the JSON structure
-        @param differences list: List to store found differences
-        @param max_diffs int: Maximum number of differences to report
-        @details Matches items in lists using specified key fields instead of position,
-                 allowing for reordered lists with the same content
-        """
-        # Convert key_field to list if it's a string
-        key_fields = self.key_field if isinstance(self.key_field, list) else [self.key_field]
-        
-        # Create dictionaries indexed by the key fields
-        dict1 = {}
-        dict2 = {}
-        
-        # Function to create compound key from an item
-        def get_key(item):
-            if not all(k in item for k in key_fields):
-                return None  # Skip items without all key fields
-            return tuple(str(item.get(k)) for k in key_fields)
-        
-        # Build dictionaries from lists
-        for i, item in enumerate(list1):
-            key = get_key(item)
-            if key:
-                dict1[key] = (i, item)
-        
-        for i, item in enumerate(list2):
-            key = get_key(item)
-            if key:
-                dict2[key] = (i, item)
-        
-        # Find keys in the first list that are missing from the second
-        for key in set(dict1.keys()) - set(dict2.keys()):
-            idx, item = dict1[key]
-            key_str = ".".join(f"{k}={v}" for k, v in zip(key_fields, key))
-            differences.append(Difference(
-                position=f"{path}[{idx}] (key: {key_str})",
-                expected=item,
-                actual=None,
-                diff_type="missing_item"
-            ))
-            if len(differences) >= max_diffs:
-                return
-        
-        # Find keys in the second list that are missing from the first
-        for key in set(dict2.keys()) - set(dict1.keys()):
-            idx, item = dict2[key]
-            key_str = ".".join(f"{k}={v}" for k, v in zip(key_fields, key))
-            differences.append(Difference(
-                position=f"{path}[{idx}] (key: {key_str})",
-                expected=None,
-                actual=item,
-                diff_type="extra_item"
-            ))
-            if len(differences) >= max_diffs:
-                return
-        
-        # Compare matching items
-        for key in set(dict1.keys()) & set(dict2.keys()):
-            idx1, item1 = dict1[key]
-            idx2, item2 = dict2[key]
-            key_str = ".".join(f"{k}={v}" for k, v in zip(key_fields, key))
-            new_path = f"{path}[key:{key_str}]"
-            
-            # Skip identical items
-            if item1 == item2:
-                continue
-                
-            # Recursive comparison of matched items
-            self._compare_json_key_based(item1, item2, new_path, differences, max_diffs)
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file json_comparator.py
+@brief JSON file comparator implementation with support for exact and key-based comparison
+@author Xiaotong Wang
+@date 2025
+"""
+
+import json
+from .text_comparator import TextComparator
+from .result import FirstDifference
+from .diff_engine import myers_opcodes
+from .json_hash import subtree_hashes, value_token
+from .json_stream import JsonStream
+
+# Values up to this many characters are decoded whole in streaming mode; larger arrays
+# and objects are walked member by member
+STREAM_ELEMENT_CHARS = 1 << 20
+
+# Items of two large arrays are matched by hash within windows of up to this many items
+# and characters in streaming mode
+STREAM_WINDOW_ITEMS = 4096
+STREAM_WINDOW_CHARS = 1 << 24
+
+class JsonComparator(TextComparator):
+    """
+    @brief Comparator for JSON files with support for exact and key-based comparison
+    @details This class extends TextComparator to provide specialized JSON comparison
+             capabilities, including:
+             - Exact comparison of JSON structures
+             - Key-based comparison for lists of objects
+             - Detailed difference reporting with path information
+             - Streaming comparison of documents too large to load whole
+             - Identical subtrees skipped by their hashes, array items matched by hash
+    """
+
+    # Content is parsed before comparison, so never diff raw lines
+    raw_line_compare = False
+
+    # Invalid documents are reported even when both files are the same
+    skip_identical_files = False
+    
+    def __init__(self, encoding="utf-8", chunk_size=8192, verbose=False, key_field=None, compare_mode="exact",
+                 line_index=False, max_differences=10, count_only=False, fail_fast=False, streaming=False):
+        """
+        @brief Initialize the JSON comparator
+        @param encoding str: File encoding
+        @param chunk_size int: Chunk size for reading files
+        @param verbose bool: Enable verbose logging
+        @param key_field str or list: Field name(s) to use as key for comparing JSON objects in lists
+        @param compare_mode str: Comparison mode: 'exact' (default) or 'key-based'
+        @param line_index bool: Seek to start_line through a sidecar line offset index
+        @param max_differences int: Number of differences listed in the result
+        @param count_only bool: Only count the differences, list none of them
+        @param fail_fast bool: Stop at the first difference
+        @param streaming bool: Walk both documents in lockstep instead of loading them whole
+        @throws ValueError: If streaming is combined with key fields
+        """
+        super().__init__(encoding, chunk_size, verbose, line_index=line_index,
+                         max_differences=max_differences, count_only=count_only, fail_fast=fail_fast)
+        self.key_field = key_field
+        self.compare_mode = compare_mode
+        self.streaming = streaming
+        self._subtree_hashes = {}  # Tokens of the arrays and objects being compared, by id()
+        if streaming and key_field:
+            raise ValueError("Streaming comparison is not supported together with key fields")
+
+    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Read and parse JSON content from file
+        @param file_path Path: Path to the JSON file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param start_column int: Starting column number
+        @param end_column int: Ending column number
+        @return dict or list: Parsed JSON content
+        @throws ValueError: If JSON is invalid or key fields are missing
+        """
+        if start_column > 0 or end_column is not None:
+            # Stream the selected lines into a single string
+            json_text = ''.join(self.iter_lines(file_path, start_line, end_line, start_column, end_column))
+        else:
+            json_text = self.read_text_range(file_path, start_line, end_line)
+        try:
+            json_data = json.loads(json_text)
+            if self.key_field:
+                # Only keep the specified key field(s)
+                key_fields = self.key_field if isinstance(self.key_field, list) else [self.key_field]
+                filtered_data = {key: json_data[key] for key in key_fields if key in json_data}
+                return filtered_data
+            return json_data
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid JSON in {file_path}: {str(e)}")
+
+    def compare_paths(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Compare two JSON files, streaming them in streaming mode
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start_line int: Starting line number
+        @param end_line int: Ending line number
+        @param start_column int: Starting column number
+        @param end_column int: Ending column number
+        @return tuple: (bool, list) - (identical, differences)
+        @details In streaming mode whole files are read incrementally and compared value by
+                 value in lockstep (see _compare_stream_values), so memory is bounded by the
+                 largest value decoded whole rather than by the document. Differences are
+                 reported in document order. Line and column ranges are read whole.
+        """
+        if not self.streaming or start_line != 0 or end_line is not None or start_column > 0 \
+                or end_column is not None:
+            return super().compare_paths(file1, file2, start_line, end_line, start_column, end_column)
+
+        collector = self._new_collector()
+        try:
+            with open(file1, 'r', encoding=self.encoding) as f1, open(file2, 'r', encoding=self.encoding) as f2:
+                stream1 = JsonStream(f1, file1)
+                stream2 = JsonStream(f2, file2)
+                self._compare_stream_values(stream1, stream2, "", collector)
+                stream1.expect_end()
+                stream2.expect_end()
+        except FirstDifference as stop:
+            self.logger.debug(f"Stopped at the first difference: {stop.difference}")
+            return False, self._limit_differences([stop.difference])
+        if not collector.total:
+            return True, []
+        return False, self._limit_differences(collector.differences, collector.total)
+
+    def _compare_stream_values(self, stream1, stream2, path, differences):
+        """
+        @brief Compare the next value of two JSON streams and consume both
+        @param stream1 JsonStream: First document
+        @param stream2 JsonStream: Second document
+        @param path str: Current path in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @details Values of up to STREAM_ELEMENT_CHARS characters are decoded and compared as
+                 by exact comparison. Larger arrays or objects on both sides are compared
+                 member by member instead; a large container facing another type is
+                 skipped without being built.
+        """
+        found1 = stream1.decode(STREAM_ELEMENT_CHARS)
+        found2 = stream2.decode(STREAM_ELEMENT_CHARS)
+        if found1 is not None and found2 is not None:
+            # Equal text is equal JSON; equal values are not enough, as 1 == 1.0 == True
+            same = stream1.buffer[stream1.pos:found1[1]] == stream2.buffer[stream2.pos:found2[1]]
+            stream1.consume(found1[1])
+            stream2.consume(found2[1])
+            if not same:
+                self._compare_trees(found1[0], found2[0], path, differences)
+            return
+
+        kind1, kind2 = stream1.peek(), stream2.peek()
+        if kind1 == kind2 == "[":
+            self._compare_stream_arrays(stream1, stream2, path, differences)
+        elif kind1 == kind2 == "{":
+            self._compare_stream_objects(stream1, stream2, path, differences)
+        elif kind1 not in ("[", "{") and kind2 not in ("[", "{"):
+            # Long strings or numbers: decoded whole, there is nothing to walk
+            self._compare_trees(stream1.read_value(), stream2.read_value(), path, differences)
+        else:
+            expected = self._stream_summary(stream1, found1)
+            actual = self._stream_summary(stream2, found2)
+            differences.add(
+                position=path or "root",
+                expected=expected,
+                actual=actual,
+                diff_type="type_mismatch"
+            )
+
+    @staticmethod
+    def _stream_summary(stream, found):
+        """
+        @brief Consume a value of a type mismatch and describe it
+        @param stream JsonStream: Document positioned at the value
+        @param found tuple: (value, end) if the value was decoded, None otherwise
+        @return str: Type and value, or type and length for a container too large to build
+        """
+        kind = stream.peek()
+        if found is None and kind in ("[", "{"):
+            start = stream.position
+            stream.skip_value(STREAM_ELEMENT_CHARS)
+            name = "list" if kind == "[" else "dict"
+            return f"{name}: {stream.position - start} characters"
+        if found is None:
+            value = stream.read_value()
+        else:
+            value = found[0]
+            stream.consume(found[1])
+        return f"{type(value).__name__}: {value}"
+
+    def _compare_stream_arrays(self, stream1, stream2, path, differences):
+        """
+        @brief Compare two arrays of JSON streams, matching their items by hash
+        @param stream1 JsonStream: First document, positioned at an array
+        @param stream2 JsonStream: Second document, positioned at an array
+        @param path str: Current path in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @details Items are decoded into a window on each side and matched by hash as by
+                 _compare_json_lists(), so inserted, removed and moved items are reported
+                 as without streaming; moves are only found within a window. The items
+                 after the last ones that line up are carried over to the next window. An
+                 item too large to decode flushes the windows and is compared by position.
+                 The length mismatch is reported after the item differences.
+        """
+        stream1.enter("[")
+        stream2.enter("[")
+        window1, window2 = [], []
+        base1 = base2 = 0
+        more1 = stream1.next_item("]", True)
+        more2 = stream2.next_item("]", True)
+        while True:
+            more1, full1 = self._fill_stream_window(stream1, window1, more1)
+            more2, full2 = self._fill_stream_window(stream2, window2, more2)
+            # A side that still has items but stopped short is at an item too large to decode
+            large = (more1 and not full1) or (more2 and not full2)
+            final = large or not (more1 or more2)
+            consumed1, consumed2 = self._match_stream_window(window1, window2, base1, base2, path,
+                                                             differences, not final)
+            if not (consumed1 or consumed2 or final):
+                # Nothing lines up in the full windows: report them as they are
+                consumed1, consumed2 = self._match_stream_window(window1, window2, base1, base2, path,
+                                                                 differences, False)
+            del window1[:consumed1], window2[:consumed2]
+            base1 += consumed1
+            base2 += consumed2
+            if not large:
+                if final:
+                    break
+                continue
+
+            # Compare the large item with the item at its position on the other side
+            if more1 and more2:
+                self._compare_stream_values(stream1, stream2, f"{path}[{base1}]", differences)
+            elif more1:
+                differences.add(position=f"{path}[{base1}]", expected=self._stream_summary(stream1, None),
+                                actual=None, diff_type="missing_item")
+            else:
+                differences.add(position=f"{path}[{base2}]", expected=None,
+                                actual=self._stream_summary(stream2, None), diff_type="extra_item")
+            base1 += more1
+            base2 += more2
+            more1 = more1 and stream1.next_item("]", False)
+            more2 = more2 and stream2.next_item("]", False)
+
+        if base1 != base2:
+            differences.add(
+                position=path or "root",
+                expected=f"list with {base1} items",
+                actual=f"list with {base2} items",
+                diff_type="length_mismatch"
+            )
+
+    @staticmethod
+    def _fill_stream_window(stream, window, more):
+        """
+        @brief Decode the next items of a streamed array into a window
+        @param stream JsonStream: Document positioned at an item, or past the array
+        @param window list: Decoded items not matched yet, added to
+        @param more bool: Whether the array has another item
+        @return tuple: (bool, bool) - whether the array has another item, and whether the
+                window is full
+        @details Filling stops early at an item longer than STREAM_ELEMENT_CHARS, which is
+                 left in the stream.
+        """
+        chars = 0
+        while more and len(window) < STREAM_WINDOW_ITEMS and chars < STREAM_WINDOW_CHARS:
+            found = stream.decode(STREAM_ELEMENT_CHARS)
+            if found is None:
+                return True, False
+            chars += found[1] - stream.pos
+            window.append(found[0])
+            stream.consume(found[1])
+            more = stream.next_item("]", False)
+        return more, more
+
+    def _match_stream_window(self, window1, window2, base1, base2, path, differences, keep_tail):
+        """
+        @brief Match the items of two windows of streamed arrays by hash
+        @param window1 list: Items of the first array, starting at index base1
+        @param window2 list: Items of the second array, starting at index base2
+        @param base1 int: Index of the first item of window1 in its array
+        @param base2 int: Index of the first item of window2 in its array
+        @param path str: Current path in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @param keep_tail bool: Leave the items after the last ones that line up unreported
+        @return tuple: (int, int) - Number of items of each window dealt with
+        """
+        compare = self._compare_json_key_based if self.compare_mode == "key-based" and self.key_field \
+            else self._compare_json_exact
+        self._subtree_hashes = subtree_hashes(window2, subtree_hashes(window1))
+        try:
+            return self._match_list_items(window1, window2, path, differences, compare,
+                                          base1, base2, keep_tail)
+        finally:
+            self._subtree_hashes = {}
+
+    def _compare_stream_objects(self, stream1, stream2, path, differences):
+        """
+        @brief Compare two objects of JSON streams member by member
+        @param stream1 JsonStream: First document, positioned at an object
+        @param stream2 JsonStream: Second document, positioned at an object
+        @param path str: Current path in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @details While both objects list the same keys in the same order their values are
+                 compared in lockstep. A value whose key comes at another place is decoded
+                 whole and kept until the key turns up in the other object; the keys that
+                 never do are missing or extra.
+        """
+        stream1.enter("{")
+        stream2.enter("{")
+        pending1, pending2 = {}, {}
+        more1 = stream1.next_item("}", True)
+        more2 = stream2.next_item("}", True)
+        while more1 or more2:
+            key1 = stream1.read_key() if more1 else None
+            key2 = stream2.read_key() if more2 else None
+            if more1 and more2 and key1 == key2:
+                self._compare_stream_values(stream1, stream2, f"{path}.{key1}" if path else key1, differences)
+            else:
+                if more1:
+                    value1 = stream1.read_value()
+                    if key1 in pending2:
+                        self._compare_trees(value1, pending2.pop(key1),
+                                            f"{path}.{key1}" if path else key1, differences)
+                    else:
+                        pending1[key1] = value1
+                if more2:
+                    value2 = stream2.read_value()
+                    if key2 in pending1:
+                        self._compare_trees(pending1.pop(key2), value2,
+                                            f"{path}.{key2}" if path else key2, differences)
+                    else:
+                        pending2[key2] = value2
+            more1 = more1 and stream1.next_item("}", False)
+            more2 = more2 and stream2.next_item("}", False)
+
+        for key, value in pending1.items():
+            differences.add(
+                position=f"{path}.{key}" if path else key,
+                expected=value,
+                actual=None,
+                diff_type="missing_key"
+            )
+        for key, value in pending2.items():
+            differences.add(
+                position=f"{path}.{key}" if path else key,
+                expected=None,
+                actual=value,
+                diff_type="extra_key"
+            )
+
+    def compare_content(self, content1, content2):
+        """
+        @brief Compare JSON content using the specified comparison mode
+        @param content1 dict or list: First JSON content to compare
+        @param content2 dict or list: Second JSON content to compare
+        @return tuple: (bool, list) - (identical, differences)
+        """
+        collector = self._new_collector()
+        self._compare_trees(content1, content2, "", collector)
+        if not collector.total:
+            return True, []
+        return False, self._limit_differences(collector.differences, collector.total)
+
+    def _compare_trees(self, obj1, obj2, path, differences):
+        """
+        @brief Compare two parsed JSON values using the specified comparison mode
+        @param obj1: First JSON value to compare
+        @param obj2: Second JSON value to compare
+        @param path str: Path of the values in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @details Every array and object of both values is hashed first, in one bottom-up
+                 pass (see subtree_hashes()), so the comparison skips identical subtrees
+                 without walking them.
+        """
+        self._subtree_hashes = subtree_hashes(obj2, subtree_hashes(obj1))
+        try:
+            if self.compare_mode == "key-based" and self.key_field:
+                self._compare_json_key_based(obj1, obj2, path, differences)
+            else:
+                self._compare_json_exact(obj1, obj2, path, differences)
+        finally:
+            self._subtree_hashes = {}
+
+    def _same_subtree(self, obj1, obj2):
+        """
+        @brief Check whether two JSON values are identical by their hashes
+        @param obj1: First JSON value
+        @param obj2: Second JSON value
+        @return bool: True if both values are equal and of the same types throughout
+        """
+        return value_token(obj1, self._subtree_hashes) == value_token(obj2, self._subtree_hashes)
+
+    def _compare_json_exact(self, obj1, obj2, path, differences):
+        """
+        @brief Perform exact JSON comparison
+        @param obj1: First JSON object to compare
+        @param obj2: Second JSON object to compare
+        @param path str: Current path in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @details Compares JSON objects recursively, checking for:
+                 - Type mismatches
+                 - Missing or extra keys in dictionaries
+                 - Length mismatches in lists
+                 - Value mismatches
+        """
+        # Type check
+        if type(obj1) != type(obj2):
+            differences.add(
+                position=path or "root",
+                expected=f"{type(obj1).__name__}: {obj1}",
+                actual=f"{type(obj2).__name__}: {obj2}",
+                diff_type="type_mismatch"
+            )
+            return
+
+        # Identical arrays and objects are recognized by their hashes without walking them
+        if isinstance(obj1, (dict, list)) and self._same_subtree(obj1, obj2):
+            return
+
+        # Dictionary comparison
+        if isinstance(obj1, dict):
+            keys1 = set(obj1.keys())
+            keys2 = set(obj2.keys())
+
+            # Check for missing keys
+            for key in keys1 - keys2:
+                differences.add(
+                    position=f"{path}.{key}" if path else key,
+                    expected=obj1[key],
+                    actual=None,
+                    diff_type="missing_key"
+                )
+
+            # Check for extra keys
+            for key in keys2 - keys1:
+                differences.add(
+                    position=f"{path}.{key}" if path else key,
+                    expected=None,
+                    actual=obj2[key],
+                    diff_type="extra_key"
+                )
+
+            # Compare common keys recursively
+            for key in keys1 & keys2:
+                new_path = f"{path}.{key}" if path else key
+                self._compare_json_exact(obj1[key], obj2[key], new_path, differences)
+
+        # List comparison
+        elif isinstance(obj1, list):
+            self._compare_json_lists(obj1, obj2, path, differences, self._compare_json_exact)
+
+        # Value comparison
+        elif obj1 != obj2:
+            differences.add(
+                position=path or "root",
+                expected=obj1,
+                actual=obj2,
+                diff_type="value_mismatch"
+            )
+
+    def _compare_json_key_based(self, obj1, obj2, path, differences):
+        """
+        @brief Perform key-based JSON comparison for lists of objects
+        @param obj1: First JSON object to compare
+        @param obj2: Second JSON object to compare
+        @param path str: Current path in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @details Similar to exact comparison but with special handling for lists
+                 of objects, using key fields to match items instead of position
+        """
+        # Type check
+        if type(obj1) != type(obj2):
+            differences.add(
+                position=path or "root",
+                expected=f"{type(obj1).__name__}: {obj1}",
+                actual=f"{type(obj2).__name__}: {obj2}",
+                diff_type="type_mismatch"
+            )
+            return
+
+        # Identical arrays and objects are recognized by their hashes without walking them
+        if isinstance(obj1, (dict, list)) and self._same_subtree(obj1, obj2):
+            return
+
+        # Dictionary comparison (same as exact comparison)
+        if isinstance(obj1, dict):
+            keys1 = set(obj1.keys())
+            keys2 = set(obj2.keys())
+
+            # Check for missing keys
+            for key in keys1 - keys2:
+                differences.add(
+                    position=f"{path}.{key}" if path else key,
+                    expected=obj1[key],
+                    actual=None,
+                    diff_type="missing_key"
+                )
+
+            # Check for extra keys
+            for key in keys2 - keys1:
+                differences.add(
+                    position=f"{path}.{key}" if path else key,
+                    expected=None,
+                    actual=obj2[key],
+                    diff_type="extra_key"
+                )
+
+            # Compare common keys recursively
+            for key in keys1 & keys2:
+                new_path = f"{path}.{key}" if path else key
+                self._compare_json_key_based(obj1[key], obj2[key], new_path, differences)
+
+        # List comparison - the key difference for key-based comparison
+        elif isinstance(obj1, list) and isinstance(obj2, list):
+            # Check if we can do key-based comparison
+            if self.key_field and all(isinstance(item, dict) for item in obj1 + obj2):
+                self._compare_lists_by_key(obj1, obj2, path, differences)
+            else:
+                # Fall back to matching items by hash if key-based is not possible
+                self._compare_json_lists(obj1, obj2, path, differences, self._compare_json_key_based)
+
+        # Value comparison
+        elif obj1 != obj2:
+            differences.add(
+                position=path or "root",
+                expected=obj1,
+                actual=obj2,
+                diff_type="value_mismatch"
+            )
+
+    def _compare_json_lists(self, list1, list2, path, differences, compare):
+        """
+        @brief Compare two lists, matching their items by hash
+        @param list1 list: First list
+        @param list2 list: Second list
+        @param path str: Current path in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @param compare callable: Comparison of a pair of items (exact or key-based)
+        @details The sequences of item hashes are diffed, so an inserted or removed item
+                 does not shift the comparison of the items after it. Of the items that do
+                 not line up, the ones found on both sides are reported as moved; the others
+                 are compared pairwise where both lists changed, and are missing or extra
+                 where only one did.
+        """
+        if len(list1) != len(list2):
+            differences.add(
+                position=path or "root",
+                expected=f"list with {len(list1)} items",
+                actual=f"list with {len(list2)} items",
+                diff_type="length_mismatch"
+            )
+        self._match_list_items(list1, list2, path, differences, compare)
+
+    def _match_list_items(self, list1, list2, path, differences, compare, offset1=0, offset2=0,
+                          keep_tail=False):
+        """
+        @brief Report the differences between the items of two lists matched by hash
+        @param list1 list: First list, or a window of it
+        @param list2 list: Second list, or a window of it
+        @param path str: Current path in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @param compare callable: Comparison of a pair of items (exact or key-based)
+        @param offset1 int: Index of the first item of list1 in its whole list
+        @param offset2 int: Index of the first item of list2 in its whole list
+        @param keep_tail bool: Leave the items after the last ones that line up unreported,
+                    as they may line up with items that follow the window
+        @return tuple: (int, int) - Number of items of each list dealt with
+        """
+        tokens1 = [value_token(item, self._subtree_hashes) for item in list1]
+        tokens2 = [value_token(item, self._subtree_hashes) for item in list2]
+        # Only the part between the common ends has to be diffed
+        start = 0
+        while start < min(len(tokens1), len(tokens2)) and tokens1[start] == tokens2[start]:
+            start += 1
+        end = 0
+        while end < min(len(tokens1), len(tokens2)) - start and tokens1[-1 - end] == tokens2[-1 - end]:
+            end += 1
+        opcodes = [(tag, i1 + start, i2 + start, j1 + start, j2 + start) for tag, i1, i2, j1, j2
+                   in myers_opcodes(tokens1[start:len(tokens1) - end], tokens2[start:len(tokens2) - end])]
+        done1, done2 = len(list1), len(list2)
+        if keep_tail and not end:
+            # Stop after the last items that line up
+            done1 = done2 = start
+            for tag, _, i2, _, j2 in opcodes:
+                if tag == 'equal':
+                    done1, done2 = i2, j2
+        opcodes = [opcode for opcode in opcodes if opcode[0] != 'equal' and opcode[2] <= done1
+                   and opcode[4] <= done2]
+
+        # Match the items that left their place on one side to the ones that appeared on the other
+        appeared = {}
+        for _, _, _, j1, j2 in reversed(opcodes):
+            for j in reversed(range(j1, j2)):
+                appeared.setdefault(tokens2[j], []).append(j)
+        moved1, moved2 = set(), set()
+        for _, i1, i2, _, _ in opcodes:
+            for i in range(i1, i2):
+                targets = appeared.get(tokens1[i])
+                if targets:
+                    j = targets.pop()
+                    moved1.add(i)
+                    moved2.add(j)
+                    differences.add(
+                        position=f"{path}[{i + offset1}]",
+                        expected=None,
+                        actual=f"{path}[{j + offset2}]",
+                        diff_type="moved"
+                    )
+
+        for _, i1, i2, j1, j2 in opcodes:
+            removed = [i for i in range(i1, i2) if i not in moved1]
+            added = [j for j in range(j1, j2) if j not in moved2]
+            for i, j in zip(removed, added):
+                compare(list1[i], list2[j], f"{path}[{i + offset1}]", differences)
+            for i in removed[len(added):]:
+                differences.add(
+                    position=f"{path}[{i + offset1}]",
+                    expected=list1[i],
+                    actual=None,
+                    diff_type="missing_item"
+                )
+            for j in added[len(removed):]:
+                differences.add(
+                    position=f"{path}[{j + offset2}]",
+                    expected=None,
+                    actual=list2[j],
+                    diff_type="extra_item"
+                )
+        return done1, done2
+
+    def _compare_lists_by_key(self, list1, list2, path, differences):
+        """
+        @brief Compare two lists of dictionaries using key field(s) to match items
+        @param list1 list: First list of dictionaries
+        @param list2 list: Second list of dictionaries
+        @param path str: Current path in the JSON structure
+        @param differences DifferenceCollector: Collector for the differences found
+        @details Matches items in lists using specified key fields instead of position,
+                 allowing for reordered lists with the same content
+        """
+        # Convert key_field to list if it's a string
+        key_fields = self.key_field if isinstance(self.key_field, list) else [self.key_field]
+        
+        # Create dictionaries indexed by the key fields
+        dict1 = {}
+        dict2 = {}
+        
+        # Function to create compound key from an item
+        def get_key(item):
+            if not all(k in item for k in key_fields):
+                return None  # Skip items without all key fields
+            return tuple(str(item.get(k)) for k in key_fields)
+        
+        # Build dictionaries from lists
+        for i, item in enumerate(list1):
+            key = get_key(item)
+            if key:
+                dict1[key] = (i, item)
+        
+        for i, item in enumerate(list2):
+            key = get_key(item)
+            if key:
+                dict2[key] = (i, item)
+        
+        # Find keys in the first list that are missing from the second
+        for key in set(dict1.keys()) - set(dict2.keys()):
+            idx, item = dict1[key]
+            key_str = ".".join(f"{k}={v}" for k, v in zip(key_fields, key))
+            differences.add(
+                position=f"{path}[{idx}] (key: {key_str})",
+                expected=item,
+                actual=None,
+                diff_type="missing_item"
+            )
+        
+        # Find keys in the second list that are missing from the first
+        for key in set(dict2.keys()) - set(dict1.keys()):
+            idx, item = dict2[key]
+            key_str = ".".join(f"{k}={v}" for k, v in zip(key_fields, key))
+            differences.add(
+                position=f"{path}[{idx}] (key: {key_str})",
+                expected=None,
+                actual=item,
+                diff_type="extra_item"
+            )
+        
+        # Compare matching items
+        for key in set(dict1.keys()) & set(dict2.keys()):
+            idx1, item1 = dict1[key]
+            idx2, item2 = dict2[key]
+            key_str = ".".join(f"{k}={v}" for k, v in zip(key_fields, key))
+            new_path = f"{path}[key:{key_str}]"
+            
+            # Skip identical items
+            if self._same_subtree(item1, item2):
+                continue
+                
+            # Recursive comparison of matched items
+            self._compare_json_key_based(item1, item2, new_path, differences)
\ No newline at end of file
@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file json_hash.py
+@brief Merkle hashes of the subtrees of parsed JSON documents
+@author Xiaotong Wang
+@date 2025
+"""
+
+import gc
+import hashlib
+import marshal
+
+# Bytes of a subtree hash
+_DIGEST_SIZE = 16
+
+def subtree_hashes(value, hashes=None):
+    """
+    @brief Hash every array and object of a parsed JSON document in one bottom-up pass
+    @param value: Parsed document (or any value within one)
+    @param hashes dict: Table to add the hashes to (None for a new one)
+    @return dict: Token of every array and object (see value_token), keyed by id(); only
+            valid while the document is alive
+    """
+    if hashes is None:
+        hashes = {}
+    # The pass allocates millions of small acyclic objects; collecting cycles in between
+    # would rescan the whole document again and again
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        value_token(value, hashes)
+    finally:
+        if enabled:
+            gc.enable()
+    return hashes
+
+def _hash_container(value, hashes):
+    """
+    @brief Hash an array or object whose nested containers may not be hashed yet
+    @param value list or dict: Container to hash
+    @param hashes dict: Tokens of arrays and objects by id(), added to
+    @return bytes: Tag and hash of the container
+    @details The container is hashed as the marshal serialization of its items with every
+             nested container replaced by its token, so its scalars are serialized in one
+             C call and only containers are visited in Python. marshal keeps 1, 1.0, True
+             and "1" apart, and its version 2 format has no back-references, so equal
+             values always serialize alike. The members of an object are sorted by key, so
+             their order does not matter.
+    """
+    if isinstance(value, dict):
+        tag = b"{"
+        items = [(key, _hash_container(item, hashes) if isinstance(item, (dict, list)) else item)
+                 for key, item in value.items()]
+        items.sort()
+    else:
+        tag = b"["
+        items = [_hash_container(item, hashes) if isinstance(item, (dict, list)) else item for item in value]
+    token = tag + hashlib.blake2b(marshal.dumps(items, 2), digest_size=_DIGEST_SIZE).digest()
+    hashes[id(value)] = token
+    return token
+
+def value_token(value, hashes):
+    """
+    @brief Get the canonical token of a JSON value
+    @param value: Parsed JSON value
+    @param hashes dict: Tokens of arrays and objects by id(), filled in for the ones not
+                hashed yet
+    @return bytes or tuple: Hash of an array or object, (type, value) of a scalar; tokens
+            are equal for equal values of the same types
+    """
+    if isinstance(value, (dict, list)):
+        token = hashes.get(id(value))
+        return token if token is not None else _hash_container(value, hashes)
+    return type(value), value
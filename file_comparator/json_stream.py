@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file json_stream.py
+@brief Incremental reading of JSON documents, one token or value at a time, from a text file
+@author Xiaotong Wang
+@date 2025
+"""
+
+import json
+import re
+
+# Characters read from the file per refill; a value longer than that is read in
+# refills as large as the part of it already buffered
+READ_CHARS = 1 << 20
+
+_SPACE = re.compile(r'[ \t\n\r]*')
+_NUMBER_CHARS = re.compile(r'[0-9.eE+-]*')
+_decoder = json.JSONDecoder()
+
+class JsonStream:
+    """
+    @brief Reader walking a JSON document held in a text file
+    @details Values are decoded from a buffer by the scanner of the json module, and the
+             consumed part of the buffer is dropped at every refill, so only the value
+             being decoded is held in memory. Arrays and objects too large to decode in
+             one piece are entered instead and their members read one by one.
+    """
+
+    def __init__(self, f, file_path):
+        """
+        @brief Initialize the reader at the start of a file
+        @param f file: File opened in text mode
+        @param file_path Path: Path of the file, for error messages
+        """
+        self.file = f
+        self.file_path = file_path
+        self.buffer = ""
+        self.pos = 0
+        self.offset = 0  # Characters of the file dropped from the front of the buffer
+        self.eof = False
+
+    @property
+    def position(self):
+        """
+        @brief Character offset of the reader in the file
+        @return int: Number of characters before the current position
+        """
+        return self.offset + self.pos
+
+    def _fill(self):
+        """
+        @brief Read more of the file into the buffer, dropping its consumed part
+        @return bool: False at the end of the file
+        """
+        if self.eof:
+            return False
+        data = self.file.read(max(READ_CHARS, len(self.buffer) - self.pos))
+        self.offset += self.pos
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        self.eof = not data
+        return not self.eof
+
+    def _error(self, message):
+        """
+        @brief Raise the error of an invalid document at the current position
+        @param message str: What was expected
+        @throws ValueError: Always
+        """
+        raise ValueError(f"Invalid JSON in {self.file_path}: {message} at character {self.position}")
+
+    def peek(self):
+        """
+        @brief Skip whitespace and look at the next character without consuming it
+        @return str: Next character, empty at the end of the file
+        """
+        while True:
+            self.pos = _SPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def decode(self, limit=None):
+        """
+        @brief Decode the next value without consuming it
+        @param limit int: Give up once the value is known to be longer than this many
+                    characters (None for no limit)
+        @return tuple: (value, end) - Value and the buffer position just past it, or None if
+                it is longer than limit
+        @throws ValueError: If the document is not valid JSON
+        @details A value that does not end within the buffer is decoded again after a
+                 refill, which doubles the buffered part of it, so the work stays linear
+                 in its length. A number may continue past the end of the buffer, so a
+                 value is only taken once a character follows it that cannot be part of a
+                 number, or at end of file.
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+                if self.eof or _NUMBER_CHARS.match(self.buffer, end).end() < len(self.buffer):
+                    return value, end
+            except json.JSONDecodeError as e:
+                if self.eof:
+                    raise ValueError(f"Invalid JSON in {self.file_path}: {e.msg} at character {self.offset + e.pos}")
+            if limit is not None and len(self.buffer) - self.pos > limit:
+                return None
+            self._fill()
+
+    def consume(self, end):
+        """
+        @brief Move past a value returned by decode()
+        @param end int: Buffer position returned with the value
+        """
+        self.pos = end
+
+    def read_value(self):
+        """
+        @brief Decode and consume the next value, whatever its length
+        @return Decoded value
+        @throws ValueError: If the document is not valid JSON
+        """
+        value, end = self.decode()
+        self.pos = end
+        return value
+
+    def enter(self, opener):
+        """
+        @brief Consume the opening bracket of an array or object
+        @param opener str: '[' or '{'
+        @throws ValueError: If the next value is not of that kind
+        """
+        if self.peek() != opener:
+            self._error(f"Expecting '{opener}'")
+        self.pos += 1
+
+    def next_item(self, closer, first):
+        """
+        @brief Move to the next member of an entered array or object
+        @param closer str: ']' or '}'
+        @param first bool: Whether no member of the container was read yet
+        @return bool: True before a member, False once the closing bracket is consumed
+        @throws ValueError: If a separator is missing
+        """
+        char = self.peek()
+        if char == closer:
+            self.pos += 1
+            return False
+        if not first:
+            if char != ",":
+                self._error(f"Expecting ',' or '{closer}'")
+            self.pos += 1
+        return True
+
+    def read_key(self):
+        """
+        @brief Read the name of an object member and its colon
+        @return str: Member name
+        @throws ValueError: If no member name follows
+        """
+        if self.peek() != '"':
+            self._error("Expecting property name enclosed in double quotes")
+        key = self.read_value()
+        if self.peek() != ":":
+            self._error("Expecting ':' delimiter")
+        self.pos += 1
+        return key
+
+    def skip_value(self, limit):
+        """
+        @brief Consume the next value without building it if it is a large container
+        @param limit int: Values up to this many characters are decoded and dropped; larger
+                    arrays and objects are entered and skipped member by member
+        """
+        found = self.decode(limit)
+        if found is not None:
+            self.pos = found[1]
+            return
+        char = self.peek()
+        if char not in ("[", "{"):
+            # A long string or number cannot be split
+            self.read_value()
+            return
+        self.pos += 1
+        self.skip_members("]" if char == "[" else "}", limit)
+
+    def skip_members(self, closer, limit, before_member=False):
+        """
+        @brief Consume the remaining members of an entered array or object and its closer
+        @param closer str: ']' or '}'
+        @param limit int: Length up to which members are decoded whole (see skip_value)
+        @param before_member bool: Whether next_item() already moved before a member;
+                    otherwise no member of the container was read yet
+        @return int: Number of members skipped
+        """
+        count = 0
+        more = before_member or self.next_item(closer, True)
+        while more:
+            if closer == "}":
+                self.read_key()
+            self.skip_value(limit)
+            count += 1
+            more = self.next_item(closer, False)
+        return count
+
+    def expect_end(self):
+        """
+        @brief Check that nothing but whitespace follows the document
+        @throws ValueError: If there is extra data
+        """
+        if self.peek():
+            self._error("Extra data")
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file line_index.py
+@brief Sidecar index of line offsets for seeking straight to a line range
+@author Xiaotong Wang
+@date 2025
+"""
+
+import os
+import numpy as np
+
+# Suffix of the sidecar file written next to the indexed file
+LINE_INDEX_SUFFIX = ".lineidx"
+
+# Offset of every LINE_INDEX_STRIDE-th line is stored; the lines in between are skipped by reading
+LINE_INDEX_STRIDE = 1024
+
+# Size of the blocks scanned for line breaks while building an index
+_SCAN_BLOCK = 1 << 24
+
+# First word of a sidecar file, followed by size, mtime_ns, stride and line count
+_MAGIC = 0x4C494458
+
+# Indexes already loaded in this process, keyed by path
+_loaded = {}
+
+def build_line_index(file_path, stride=LINE_INDEX_STRIDE):
+    """
+    @brief Scan a file once and collect the offset of every stride-th line
+    @param file_path Path: File to index
+    @param stride int: Distance in lines between two stored offsets
+    @return tuple: (np.ndarray, int) - int64 offsets of lines 0, stride, 2*stride, ... and line count
+    @details Line breaks are located block by block with a vectorized search over the raw
+             bytes, so the file is never split into Python line objects.
+    """
+    checkpoints = [np.zeros(1, dtype=np.int64)]
+    line_count = 0
+    position = 0
+    last_byte = b"\n"
+    with open(file_path, 'rb') as f:
+        while True:
+            block = f.read(_SCAN_BLOCK)
+            if not block:
+                break
+            # Line k starts after the k-th line break; keep the starts of lines stride, 2*stride, ...
+            breaks = np.flatnonzero(np.frombuffer(block, dtype=np.uint8) == 0x0A)
+            first = (-line_count - 1) % stride
+            checkpoints.append(breaks[first::stride].astype(np.int64) + position + 1)
+            line_count += len(breaks)
+            position += len(block)
+            last_byte = block[-1:]
+    if last_byte != b"\n":
+        line_count += 1
+
+    offsets = np.concatenate(checkpoints)
+    # A break at the very end of the file does not start another line
+    return offsets[offsets < max(position, 1)], line_count
+
+def load_line_index(file_path, stride=LINE_INDEX_STRIDE):
+    """
+    @brief Get the line index of a file, building and saving it if needed
+    @param file_path Path: Indexed file
+    @param stride int: Distance in lines between two stored offsets
+    @return tuple: (np.ndarray, int) - Stored line offsets and line count
+    @details The index is reused from memory or from the sidecar file as long as the size
+             and modification time of the file are unchanged. A fresh index is written to
+             the sidecar; if that fails (read-only directory) it is only kept in memory.
+    """
+    stat = os.stat(file_path)
+    stamp = (stat.st_size, stat.st_mtime_ns, stride)
+    path = os.path.abspath(file_path)
+    cached = _loaded.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1], cached[2]
+
+    sidecar = path + LINE_INDEX_SUFFIX
+    try:
+        data = np.fromfile(sidecar, dtype=np.int64)
+        if len(data) >= 5 and data[0] == _MAGIC and tuple(data[1:4].tolist()) == stamp:
+            _loaded[path] = (stamp, data[5:], int(data[4]))
+            return data[5:], int(data[4])
+    except (OSError, ValueError):
+        pass
+
+    offsets, line_count = build_line_index(file_path, stride)
+    _loaded[path] = (stamp, offsets, line_count)
+    header = np.array([_MAGIC, stat.st_size, stat.st_mtime_ns, stride, line_count], dtype=np.int64)
+    try:
+        np.concatenate([header, offsets]).tofile(sidecar + ".tmp")
+        os.replace(sidecar + ".tmp", sidecar)
+    except OSError:
+        pass
+    return offsets, line_count
+
+def seek_line(f, file_path, line_number, stride=LINE_INDEX_STRIDE):
+    """
+    @brief Position a binary file object at the start of a line
+    @param f file: File opened in binary mode
+    @param file_path Path: Path of the open file, used to find its index
+    @param line_number int: Line to seek to (0-based)
+    @return int: Byte offset of the line, the file size if the file has fewer lines
+    @details Seeks to the nearest stored offset before the line and reads past at most
+             stride - 1 lines.
+    """
+    offsets, line_count = load_line_index(file_path, stride)
+    if line_number >= line_count:
+        return f.seek(0, os.SEEK_END)
+    f.seek(int(offsets[line_number // stride]))
+    for _ in range(line_number % stride):
+        f.readline()
+    return f.tell()
+
+def line_byte_range(file_path, start_line=0, end_line=None, stride=LINE_INDEX_STRIDE):
+    """
+    @brief Find the bytes that hold a line range
+    @param file_path Path: Indexed file
+    @param start_line int: First line of the range (0-based)
+    @param end_line int: Last line of the range (0-based, None for end of file)
+    @return tuple: (int, int, int) - Start offset, end offset and number of lines in the range
+    """
+    _, line_count = load_line_index(file_path, stride)
+    stop_line = line_count if end_line is None else min(end_line + 1, line_count)
+    with open(file_path, 'rb') as f:
+        start = seek_line(f, file_path, start_line, stride)
+        end = seek_line(f, file_path, stop_line, stride)
+    return start, end, max(0, stop_line - start_line)
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file merkle.py
+@brief Merkle trees of block hashes for locating differing blocks without rereading unchanged files
+@author Xiaotong Wang
+@date 2025
+"""
+
+import hashlib
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+
+# Suffix of the sidecar file the leaf hashes of a file are saved to
+MERKLE_SUFFIX = ".merkle"
+
+# Bytes covered by one leaf of the tree
+MERKLE_BLOCK = 1 << 20
+
+# Bytes of a node hash: SHA-256 truncated, which is hardware accelerated on current CPUs
+_DIGEST_SIZE = 16
+
+# First word of a sidecar file, followed by size, mtime_ns, inode, block size and leaf count
+_MAGIC = 0x4D524B4C
+
+# Trees already loaded in this process, keyed by path
+_loaded = {}
+
+def _hash_leaves(file_path, size, block_size, num_threads):
+    """
+    @brief Hash every block of a file on a pool of threads
+    @param file_path Path: File to hash
+    @param size int: File size
+    @param block_size int: Bytes per block
+    @param num_threads int: Number of hashing threads
+    @return np.ndarray: (blocks, 2) uint64 array of block hashes
+    @details Blocks are read with positional reads (pread), so the threads share one file
+             descriptor without seeking. hashlib releases the GIL while hashing large
+             buffers, so reading and hashing run in parallel. Where pread is unavailable
+             the reads are serialized and only the hashing runs in parallel.
+    """
+    count = (size + block_size - 1) // block_size
+    fd = os.open(file_path, os.O_RDONLY | getattr(os, "O_BINARY", 0))
+    lock = threading.Lock()
+
+    def hash_block(index):
+        if hasattr(os, "pread"):
+            data = os.pread(fd, block_size, index * block_size)
+        else:
+            with lock:
+                os.lseek(fd, index * block_size, os.SEEK_SET)
+                data = os.read(fd, block_size)
+        return hashlib.sha256(data).digest()[:_DIGEST_SIZE]
+
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, num_threads)) as executor:
+            digests = b"".join(executor.map(hash_block, range(count)))
+    finally:
+        os.close(fd)
+    return np.frombuffer(digests, dtype=np.uint64).reshape(-1, 2)
+
+def _build_levels(leaves):
+    """
+    @brief Hash pairs of nodes up to the root
+    @param leaves np.ndarray: (blocks, 2) uint64 block hashes
+    @return list: Levels of the tree from the leaves to the root, each a (nodes, 2) uint64 array;
+            a node without a sibling is carried up unchanged
+    """
+    levels = [leaves]
+    while len(levels[-1]) > 1:
+        level = levels[-1]
+        data = level.tobytes()
+        pair = 2 * _DIGEST_SIZE
+        parents = [hashlib.sha256(data[i:i + pair]).digest()[:_DIGEST_SIZE]
+                   for i in range(0, len(data) - pair + 1, pair)]
+        if len(level) % 2:
+            parents.append(data[-_DIGEST_SIZE:])
+        levels.append(np.frombuffer(b"".join(parents), dtype=np.uint64).reshape(-1, 2))
+    return levels
+
+def load_tree(file_path, block_size=MERKLE_BLOCK, num_threads=4):
+    """
+    @brief Get the Merkle tree of a file, building and saving it if needed
+    @param file_path Path: File to hash
+    @param block_size int: Bytes per leaf block
+    @param num_threads int: Number of hashing threads when the tree has to be built
+    @return list: Levels of the tree from the leaves to the root (see _build_levels)
+    @details The leaf hashes are reused from memory or from the sidecar file as long as the
+             size, modification time and inode of the file are unchanged, so a baseline
+             compared again and again is read only once. A fresh tree is written to the
+             sidecar; if that fails (read-only directory) it is only kept in memory.
+    """
+    stat = os.stat(file_path)
+    stamp = (stat.st_size, stat.st_mtime_ns, stat.st_ino, block_size)
+    path = os.path.abspath(file_path)
+    cached = _loaded.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    sidecar = path + MERKLE_SUFFIX
+    leaves = None
+    try:
+        data = np.fromfile(sidecar, dtype=np.int64)
+        if len(data) >= 6 and data[0] == _MAGIC and tuple(data[1:5].tolist()) == stamp \
+                and len(data) == 6 + 2 * data[5]:
+            leaves = data[6:].view(np.uint64).reshape(-1, 2)
+    except (OSError, ValueError):
+        pass
+
+    if leaves is None:
+        leaves = _hash_leaves(file_path, stat.st_size, block_size, num_threads)
+        header = np.array([_MAGIC, stat.st_size, stat.st_mtime_ns, stat.st_ino, block_size, len(leaves)],
+                          dtype=np.int64)
+        try:
+            np.concatenate([header, leaves.view(np.int64).ravel()]).tofile(sidecar + ".tmp")
+            os.replace(sidecar + ".tmp", sidecar)
+        except OSError:
+            pass
+    levels = _build_levels(leaves)
+    _loaded[path] = (stamp, levels)
+    return levels
+
+def differing_blocks(tree1, tree2):
+    """
+    @brief Find the leaf blocks whose hashes differ between two trees of equal shape
+    @param tree1 list: Levels of the first tree (see load_tree)
+    @param tree2 list: Levels of the second tree, built from a file of the same size
+    @return np.ndarray: Sorted indices of the differing blocks
+    @details The roots are compared first and only the children of differing nodes are
+             compared on the next level down, so equal subtrees are never visited.
+    """
+    if len(tree1[0]) != len(tree2[0]):
+        raise ValueError("Merkle trees of files with different sizes cannot be compared")
+    if not len(tree1[0]):
+        return np.empty(0, dtype=np.int64)
+    nodes = np.zeros(1, dtype=np.int64)
+    for level1, level2 in zip(reversed(tree1), reversed(tree2)):
+        if len(level1) > 1:
+            nodes = np.concatenate((2 * nodes, 2 * nodes + 1))
+            nodes = np.sort(nodes[nodes < len(level1)])
+        nodes = nodes[(level1[nodes] != level2[nodes]).any(axis=1)]
+        if not len(nodes):
+            break
+    return nodes
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file numeric.py
+@brief Helpers for tokenizing numbers in text and comparing them with tolerances
+@author Xiaotong Wang
+@date 2025
+"""
+
+import re
+import numpy as np
+
+# A number that stands on its own: not glued to identifiers such as CQUAD4. Besides the usual
+# forms, Fortran/Nastran exponents are accepted: 1.0D+03 and the implicit 1.5-3 (= 1.5e-3).
+NUMBER_PATTERN = re.compile(
+    r'(?<![\w.])'
+    r'([+-]?(?:(?:\d+\.\d*|\.\d+)(?:[eEdD][+-]?\d+|[+-]\d+)?|\d+(?:[eEdD][+-]?\d+)?))'
+    r'(?![\w.])'
+)
+
+# Fortran exponent markers that float() does not understand: a D exponent letter, or an
+# exponent sign directly after the mantissa (implicit E)
+_FORTRAN_EXPONENT = re.compile(r'(?<=[\d.])(?:[dD]|(?=[+-]\d))')
+
+def split_numbers(line):
+    """
+    @brief Split a line into its non-numeric skeleton and its numeric tokens
+    @param line str: Line of text
+    @return tuple: (str, list) - Skeleton with every number replaced by a marker, number tokens
+    """
+    parts = NUMBER_PATTERN.split(line)
+    return "\0".join(parts[0::2]), parts[1::2]
+
+def to_float_text(token):
+    """
+    @brief Rewrite a Fortran style number into a form float() accepts
+    @param token str: Number token, e.g. '1.5-3' or '2.0D+01'
+    @return str: Equivalent token with a standard exponent, e.g. '1.5E-3'
+    """
+    return _FORTRAN_EXPONENT.sub('E', token)
+
+def parse_numbers(tokens):
+    """
+    @brief Convert a list of number tokens into a float array in one call
+    @param tokens list: Number tokens as matched by NUMBER_PATTERN
+    @return np.ndarray: float64 array with one value per token
+    @throws ValueError: If a token is not a number
+    @details NumPy converts the whole list at once; only if that fails (Fortran exponent
+             forms are present) are the tokens rewritten, with a single regex pass over
+             all of them, before converting again.
+    """
+    if not tokens:
+        return np.empty(0, dtype=np.float64)
+    try:
+        return np.array(tokens, dtype=np.float64)
+    except ValueError:
+        return np.array(_FORTRAN_EXPONENT.sub('E', "\0".join(tokens)).split("\0"), dtype=np.float64)
+
+def try_parse_numbers(tokens):
+    """
+    @brief Convert tokens to floats, tolerating tokens that are not numbers
+    @param tokens list: Candidate number tokens
+    @return tuple: (np.ndarray, np.ndarray) - float64 values (NaN where invalid), validity mask
+    """
+    try:
+        values = parse_numbers(tokens)
+        return values, np.ones(len(values), dtype=bool)
+    except ValueError:
+        pass
+    values = np.full(len(tokens), np.nan)
+    valid = np.zeros(len(tokens), dtype=bool)
+    for k, token in enumerate(tokens):
+        try:
+            values[k] = float(to_float_text(token))
+            valid[k] = True
+        except ValueError:
+            pass
+    return values, valid
+
+def numbers_close(values1, values2, rtol=1e-5, atol=1e-8):
+    """
+    @brief Element-wise tolerance check between two float arrays
+    @param values1 np.ndarray: Expected values
+    @param values2 np.ndarray: Actual values
+    @param rtol float: Relative tolerance
+    @param atol float: Absolute tolerance
+    @return np.ndarray: Boolean mask, True where the values match
+    @details Same semantics as the HDF5 comparison: np.isclose with NaN == NaN.
+    """
+    return np.isclose(values1, values2, rtol=rtol, atol=atol, equal_nan=True)
+
+def new_error_statistics():
+    """
+    @brief Create empty mismatch statistics for one field or column
+    @return dict: Mismatch count and largest absolute and relative errors (None until known)
+    """
+    return {"mismatches": 0, "max_abs_error": None, "max_rel_error": None}
+
+def update_error_statistics(statistics, values1, values2):
+    """
+    @brief Add differing values to the statistics of a field or column
+    @param statistics dict: Statistics as created by new_error_statistics()
+    @param values1 np.ndarray: Differing values of the first file
+    @param values2 np.ndarray: Corresponding values of the second file
+    @details Every value counts as a mismatch; errors are only measured for numeric values.
+    """
+    statistics["mismatches"] += len(values1)
+    if values1.dtype.kind not in 'iufc':
+        return
+    with np.errstate(invalid='ignore', divide='ignore', over='ignore'):
+        error = np.abs(values1.astype(np.complex128 if values1.dtype.kind == 'c' else np.float64) - values2)
+        relative = error / np.abs(values1)
+    for key, values in (("max_abs_error", error), ("max_rel_error", relative[values1 != 0])):
+        # NaN on one side only has no meaningful size; it still counts as a mismatch
+        values = values[~np.isnan(values)]
+        if len(values):
+            largest = float(values.max())
+            statistics[key] = largest if statistics[key] is None else max(statistics[key], largest)
+
+def merge_error_statistics(statistics, other):
+    """
+    @brief Add statistics gathered separately, e.g. by another process, to others
+    @param statistics dict: Statistics per field or column, updated in place
+    @param other dict: Statistics of the same fields or columns
+    """
+    for name, values in other.items():
+        merged = statistics.setdefault(name, new_error_statistics())
+        merged["mismatches"] += values["mismatches"]
+        for key in ("max_abs_error", "max_rel_error"):
+            if values[key] is not None:
+                merged[key] = values[key] if merged[key] is None else max(merged[key], values[key])
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file records.py
+@brief Record layouts for binary files holding arrays of fixed-size structured records
+@author Xiaotong Wang
+@date 2025
+"""
+
+import os
+import numpy as np
+
+# Bytes of a Fortran sequential record marker (gfortran and ifort default)
+FORTRAN_MARKER = np.dtype('<i4')
+
+def parse_dtype(spec):
+    """
+    @brief Build a structured NumPy dtype from a record specification
+    @param spec str: NumPy dtype string such as "<i4,<f8,(3,)<f4", or named fields such as
+                "id:<i4,x:<f8,v:(3,)<f4"
+    @return np.dtype: Structured dtype of one record
+    @throws ValueError: If the specification is not a valid dtype
+    """
+    try:
+        if ':' not in spec:
+            dtype = np.dtype(spec)
+        else:
+            names, types = [], []
+            depth = 0
+            part = ""
+            for char in spec + ",":
+                if char == "," and depth == 0:
+                    name, _, field_type = part.partition(":")
+                    names.append(name.strip())
+                    types.append(field_type.strip())
+                    part = ""
+                    continue
+                depth += {"(": 1, ")": -1}.get(char, 0)
+                part += char
+            # Shapes such as (3,)<f4 are only understood in the comma-separated form; the
+            # trailing comma keeps a single field structured
+            dtype = np.dtype(",".join(types) + ",")
+            dtype.names = tuple(names)
+    except (TypeError, ValueError) as e:
+        raise ValueError(f"Invalid record dtype '{spec}': {e}")
+    if dtype.names is None:
+        dtype = np.dtype([("f0", dtype)])
+    return dtype
+
+def leaf_fields(dtype, prefix=()):
+    """
+    @brief List the non-structured fields of a record, descending into nested structures
+    @param dtype np.dtype: Structured record dtype
+    @param prefix tuple: Names of the enclosing fields
+    @return list: Tuples of field names from the record down to each leaf field
+    """
+    fields = []
+    for name in dtype.names:
+        field_type = dtype.fields[name][0]
+        if field_type.names is not None:
+            fields.extend(leaf_fields(field_type, prefix + (name,)))
+        elif field_type.subdtype is not None and field_type.subdtype[0].names is not None:
+            raise ValueError(f"Arrays of structures are not supported (field {name})")
+        else:
+            fields.append(prefix + (name,))
+    return fields
+
+def map_records(file_path, dtype, header_bytes=0, fortran=False):
+    """
+    @brief Memory-map the records of a file
+    @param file_path Path: File holding the records
+    @param dtype np.dtype: Structured dtype of one record
+    @param header_bytes int: Bytes before the first record
+    @param fortran bool: Records are written by Fortran sequential unformatted I/O, each
+                    with a 4-byte length marker before and after it
+    @return tuple: (np.memmap, np.dtype) - Mapped records and the layout of one mapped entry;
+            with Fortran markers each entry holds ('head', 'data', 'tail'), data being an
+            array of the records written by one WRITE statement
+    @throws ValueError: If the file does not hold a whole number of records
+    @details All Fortran records must have the same length, read from the first marker.
+             Nothing is read besides that marker: pages are loaded as they are accessed.
+    """
+    size = os.path.getsize(file_path) - header_bytes
+    layout = dtype
+    if fortran and size > 0:
+        marker = np.fromfile(file_path, dtype=FORTRAN_MARKER, count=1, offset=header_bytes)
+        payload = int(marker[0]) if len(marker) else 0
+        if payload <= 0 or payload % dtype.itemsize:
+            raise ValueError(f"{file_path}: Fortran record of {payload} bytes does not hold whole "
+                             f"records of {dtype.itemsize} bytes")
+        layout = np.dtype([('head', FORTRAN_MARKER), ('data', dtype, (payload // dtype.itemsize,)),
+                           ('tail', FORTRAN_MARKER)])
+    if size < 0 or size % layout.itemsize:
+        raise ValueError(f"{file_path}: {size} bytes after the header are not a whole number of "
+                         f"records of {layout.itemsize} bytes")
+    count = size // layout.itemsize
+    if count == 0:
+        return np.empty(0, dtype=layout), layout
+    return np.memmap(file_path, dtype=layout, mode='r', offset=header_bytes, shape=(count,)), layout
+
+def unwrap_records(entries, fortran, path, first=0):
+    """
+    @brief Get the records of a block of mapped entries
+    @param entries np.ndarray: Block of entries as mapped by map_records()
+    @param fortran bool: Whether the entries are Fortran records with markers
+    @param path Path: File the entries come from, for error messages
+    @param first int: Index of the first entry of the block in the file
+    @return np.ndarray: Flat array of records
+    @throws ValueError: If a Fortran record marker does not match the record length
+    """
+    if not fortran:
+        return entries
+    payload = entries.dtype.fields['data'][0].itemsize
+    bad = np.flatnonzero((entries['head'] != payload) | (entries['tail'] != payload))
+    if len(bad):
+        raise ValueError(f"{path}: Fortran record {first + int(bad[0])} has markers "
+                         f"{int(entries['head'][bad[0]])}/{int(entries['tail'][bad[0]])}, "
+                         f"expected {payload}; records of varying length are not supported")
+    return entries['data'].reshape(-1)
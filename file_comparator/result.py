@@ -1,191 +1,348 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
-"""
-@file result.py
-@brief Classes for representing file comparison results and differences
-@author Xiaotong Wang
-@date 2025
-"""
-
-class Difference:
-    """
-    @brief Represents a single difference between files
-    @details This class encapsulates information about a single difference found
-             during file comparison, including position, expected and actual content,
-             and the type of difference.
-    """
-    
-    def __init__(self, position=None, expected=None, actual=None, diff_type="content"):
-        """
-        @brief Initialize a Difference object
-        @param position: Position of the difference (can be line number, byte position, etc.)
-        @param expected: Expected content at the position
-        @param actual: Actual content found at the position
-        @param diff_type: Type of difference ("content", "missing", "extra", etc.)
-        """
-        self.position = position  # Can be line number, byte position, etc.
-        self.expected = expected  # Expected content
-        self.actual = actual      # Actual content
-        self.diff_type = diff_type  # Type of difference: "content", "missing", "extra", etc.
-    
-    def __str__(self):
-        """
-        @brief Convert the difference to a string representation
-        @return str: Human-readable description of the difference
-        """
-        if self.diff_type == "content":
-            return f"At {self.position}: expected '{self.expected}', got '{self.actual}'"
-        elif self.diff_type == "missing":
-            return f"Missing content at {self.position}: '{self.expected}'"
-        elif self.diff_type == "extra":
-            return f"Extra content at {self.position}: '{self.actual}'"
-        else:
-            return f"Difference at {self.position}"
-    
-    def to_dict(self):
-        """
-        @brief Convert the difference to a dictionary representation
-        @return dict: Dictionary containing the difference details
-        """
-        return {
-            "position": self.position,
-            "expected": self.expected,
-            "actual": self.actual,
-            "diff_type": self.diff_type
-        }
-
-class ComparisonResult:
-    """
-    @brief Represents the result of a file comparison
-    @details This class encapsulates all information about a file comparison,
-             including file paths, comparison range, differences found,
-             and additional metadata like file sizes and similarity index.
-    """
-    
-    def __init__(self, file1=None, file2=None, start_line=0, end_line=None, 
-                 start_column=0, end_column=None):
-        """
-        @brief Initialize a ComparisonResult object
-        @param file1: Path to the first file
-        @param file2: Path to the second file
-        @param start_line: Starting line number for comparison (0-based)
-        @param end_line: Ending line number for comparison (0-based, None for end of file)
-        @param start_column: Starting column number for comparison (0-based)
-        @param end_column: Ending column number for comparison (0-based, None for end of line)
-        """
-        self.file1 = file1
-        self.file2 = file2
-        self.file1_size = None
-        self.file2_size = None
-        self.start_line = start_line
-        self.end_line = end_line
-        self.start_column = start_column
-        self.end_column = end_column
-        self.identical = None
-        self.differences = []
-        self.error = None
-        self.similarity = None  # Similarity index for binary comparisons
-    
-    def __str__(self):
-        """
-        @brief Convert the comparison result to a string representation
-        @return str: Human-readable description of the comparison result
-        """
-        if self.error:
-            return f"Error during comparison: {self.error}"
-        lines = []
-        if self.identical:
-            range_str = self._get_range_str()
-            lines.append(f"Files are identical{range_str}.")
-        else:
-            lines.append(f"Files are different. Found {len(self.differences)} differences:")
-            for i, diff in enumerate(self.differences, 1):
-                lines.append(f"{i}. {diff}")
-            if self.similarity is not None:
-                lines.append(f"Similarity Index: {self.similarity:.2f}")
-        return "\n".join(lines)
-    
-    def _get_range_str(self):
-        """
-        @brief Get a string representation of the comparison range
-        @return str: Description of the line and column ranges being compared
-        """
-        parts = []
-        if self.start_line > 0 or self.end_line is not None:
-            line_range = f"lines {self.start_line+1}"
-            if self.end_line is not None:
-                line_range += f"-{self.end_line+1}"
-            parts.append(line_range)
-            
-        if self.start_column > 0 or self.end_column is not None:
-            col_range = f"columns {self.start_column+1}"
-            if self.end_column is not None:
-                col_range += f"-{self.end_column+1}"
-            parts.append(col_range)
-            
-        if parts:
-            return " in " + ", ".join(parts)
-        return ""
-    
-    def to_dict(self):
-        """
-        @brief Convert the comparison result to a dictionary representation
-        @return dict: Dictionary containing all comparison details
-        """
-        return {
-            "file1": self.file1,
-            "file2": self.file2,
-            "file1_size": self.file1_size,
-            "file2_size": self.file2_size,
-            "range": {
-                "start_line": self.start_line,
-                "end_line": self.end_line,
-                "start_column": self.start_column,
-                "end_column": self.end_column
-            },
-            "identical": self.identical,
-            "differences": [diff.to_dict() for diff in self.differences],
-            "similarity": self.similarity,
-            "error": self.error
-        }
-    
-    def to_html(self):
-        """
-        @brief Convert the comparison result to HTML format
-        @details Generates a complete HTML document with styling for displaying
-                 the comparison results in a web browser
-        @return str: HTML representation of the comparison result
-        """
-        if self.error:
-            return f"<div class='error'>Error during comparison: {self.error}</div>"
-            
-        html = ["<html><head><style>",
-                "body { font-family: Arial, sans-serif; }",
-                ".identical { color: green; }",
-                ".different { color: red; }",
-                ".diff-item { margin: 10px 0; padding: 5px; border: 1px solid #ccc; }",
-                "</style></head><body>"]
-        
-        if self.identical:
-            range_str = self._get_range_str()
-            html.append(f"<h2 class='identical'>Files are identical{range_str}.</h2>")
-        else:
-            html.append(f"<h2 class='different'>Files are different. Found {len(self.differences)} differences:</h2>")
-            if self.similarity is not None:
-                html.append(f"<p>Similarity Index: {self.similarity:.2f}</p>")
-            html.append("<div class='diff-list'>")
-            
-            for i, diff in enumerate(self.differences, 1):
-                html.append(f"<div class='diff-item'>")
-                html.append(f"<h3>Difference {i}</h3>")
-                html.append(f"<p>Position: {diff.position}</p>")
-                html.append(f"<p>Expected: <pre>{diff.expected}</pre></p>")
-                html.append(f"<p>Actual: <pre>{diff.actual}</pre></p>")
-                html.append(f"<p>Type: {diff.diff_type}</p>")
-                html.append("</div>")
-                
-            html.append("</div>")
-            
-        html.append("</body></html>")
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file result.py
+@brief Classes for representing file comparison results and differences
+@author Xiaotong Wang
+@date 2025
+"""
+
+class Difference:
+    """
+    @brief Represents a single difference between files
+    @details This class encapsulates information about a single difference found
+             during file comparison, including position, expected and actual content,
+             and the type of difference.
+    """
+    
+    def __init__(self, position=None, expected=None, actual=None, diff_type="content"):
+        """
+        @brief Initialize a Difference object
+        @param position: Position of the difference (can be line number, byte position, etc.)
+        @param expected: Expected content at the position
+        @param actual: Actual content found at the position
+        @param diff_type: Type of difference ("content", "missing", "extra", "moved", etc.)
+        """
+        self.position = position  # Can be line number, byte position, etc.
+        self.expected = expected  # Expected content
+        self.actual = actual      # Actual content
+        self.diff_type = diff_type  # Type of difference: "content", "missing", "extra", etc.
+    
+    def __str__(self):
+        """
+        @brief Convert the difference to a string representation
+        @return str: Human-readable description of the difference
+        """
+        if self.diff_type == "content":
+            return f"At {self.position}: expected '{self.expected}', got '{self.actual}'"
+        elif self.diff_type == "missing":
+            return f"Missing content at {self.position}: '{self.expected}'"
+        elif self.diff_type == "extra":
+            return f"Extra content at {self.position}: '{self.actual}'"
+        elif self.diff_type == "moved":
+            return f"Moved content at {self.position} to {self.actual}"
+        elif self.position is None:
+            # Notes such as the marker for differences left out of the list
+            return self.diff_type
+        else:
+            return f"Difference at {self.position}"
+    
+    def to_dict(self):
+        """
+        @brief Convert the difference to a dictionary representation
+        @return dict: Dictionary containing the difference details
+        """
+        return {
+            "position": self.position,
+            "expected": self.expected,
+            "actual": self.actual,
+            "diff_type": self.diff_type
+        }
+
+class FirstDifference(Exception):
+    """
+    @brief Raised in fail-fast mode to abandon a comparison at its first difference
+    @details Lets deeply recursive comparisons stop without checking a flag at every
+             level; BaseComparator.compare_paths() turns it back into a result.
+    """
+
+    def __init__(self, difference):
+        """
+        @brief Initialize with the difference that stopped the comparison
+        @param difference Difference: First difference found
+        """
+        super().__init__(str(difference))
+        self.difference = difference
+
+class DifferenceCollector:
+    """
+    @brief Keeps the first differences found and counts all of them
+    @details Recursive comparisons report every difference they find with add(); only
+             the first `limit` are built and kept, so the exact total is known without
+             creating millions of Difference objects. Differences counted in bulk (e.g. by a vectorized
+             reduction) are added with add_count(). In fail-fast mode the first
+             appended difference raises FirstDifference instead.
+    """
+
+    def __init__(self, limit=10, fail_fast=False):
+        """
+        @brief Initialize an empty collector
+        @param limit int: Number of differences to keep
+        @param fail_fast bool: Raise FirstDifference on the first difference
+        """
+        self.limit = limit
+        self.fail_fast = fail_fast
+        self.total = 0
+        self.differences = []
+
+    def append(self, difference):
+        """
+        @brief Count a difference and keep it if the limit is not reached yet
+        @param difference Difference: Difference found
+        @throws FirstDifference: In fail-fast mode
+        """
+        if self.fail_fast:
+            raise FirstDifference(difference)
+        self.total += 1
+        if len(self.differences) < self.limit:
+            self.differences.append(difference)
+
+    def add(self, position, expected, actual, diff_type):
+        """
+        @brief Count a difference, building its Difference object only if it is kept
+        @param position: Location of the difference
+        @param expected: Expected value
+        @param actual: Actual value
+        @param diff_type str: Type of difference
+        @throws FirstDifference: In fail-fast mode
+        """
+        if self.full:
+            self.add_count(1)
+            return
+        self.append(Difference(position=position, expected=expected, actual=actual, diff_type=diff_type))
+
+    def add_count(self, count):
+        """
+        @brief Count differences that are not kept
+        @param count int: Number of differences
+        """
+        self.total += count
+
+    @property
+    def full(self):
+        """
+        @brief Whether further differences would only be counted
+        @return bool: True once `limit` differences are kept; never in fail-fast mode,
+                where the next difference stops the comparison
+        """
+        return not self.fail_fast and len(self.differences) >= self.limit
+
+class ComparisonResult:
+    """
+    @brief Represents the result of a file comparison
+    @details This class encapsulates all information about a file comparison,
+             including file paths, comparison range, differences found,
+             and additional metadata like file sizes and similarity index.
+    """
+    
+    def __init__(self, file1=None, file2=None, start_line=0, end_line=None, 
+                 start_column=0, end_column=None):
+        """
+        @brief Initialize a ComparisonResult object
+        @param file1: Path to the first file
+        @param file2: Path to the second file
+        @param start_line: Starting line number for comparison (0-based)
+        @param end_line: Ending line number for comparison (0-based, None for end of file)
+        @param start_column: Starting column number for comparison (0-based)
+        @param end_column: Ending column number for comparison (0-based, None for end of line)
+        """
+        self.file1 = file1
+        self.file2 = file2
+        self.file1_size = None
+        self.file2_size = None
+        self.start_line = start_line
+        self.end_line = end_line
+        self.start_column = start_column
+        self.end_column = end_column
+        self.range_unit = "lines"  # "records" when start_line/end_line select binary records (end exclusive)
+        self.identical = None
+        self.differences = []
+        self.total_differences = None  # Exact number of differences, may exceed len(differences)
+        self.stopped_early = False  # Comparison stopped at the first difference (fail-fast mode)
+        self.error = None
+        self.similarity = None  # Similarity index for binary comparisons
+        self.similarity_error = None  # Half-width of the 95% interval of an estimated similarity index
+        self.differing_bytes = None  # Number of differing bytes for binary comparisons
+        self.field_statistics = None  # Per-field mismatch counts and largest errors for binary record and typed CSV comparisons
+    
+    def __str__(self):
+        """
+        @brief Convert the comparison result to a string representation
+        @return str: Human-readable description of the comparison result
+        """
+        if self.error:
+            return f"Error during comparison: {self.error}"
+        lines = []
+        if self.identical:
+            range_str = self._get_range_str()
+            lines.append(f"Files are identical{range_str}.")
+        elif not self.differences:
+            lines.append(f"{self._different_summary()}.")
+        else:
+            lines.append(f"{self._different_summary()}:")
+            for i, diff in enumerate(self.differences, 1):
+                lines.append(f"{i}. {diff}")
+            if self.similarity is not None:
+                lines.append(f"Similarity Index: {self._similarity_str()}")
+        if not self.identical and self.differing_bytes:
+            lines.append(f"Differing bytes: {self.differing_bytes}")
+        if not self.identical:
+            lines.extend(self._field_statistics_lines())
+        return "\n".join(lines)
+
+    def _field_statistics_lines(self):
+        """
+        @brief Describe the fields (record fields or CSV columns) that differ
+        @return list: One line per differing field, empty if there are none
+        """
+        lines = []
+        for name, statistics in (self.field_statistics or {}).items():
+            if not statistics["mismatches"]:
+                continue
+            line = f"Field {name}: {statistics['mismatches']} mismatches"
+            if statistics["max_abs_error"] is not None:
+                line += f", max abs error {statistics['max_abs_error']:.6g}"
+            if statistics["max_rel_error"] is not None:
+                line += f", max rel error {statistics['max_rel_error']:.6g}"
+            lines.append(line)
+        return lines
+    
+    def _different_summary(self):
+        """
+        @brief Get the headline of a result with differences
+        @return str: Number of differences found, or that the comparison stopped early
+        """
+        if self.stopped_early:
+            return "Files are different. Stopped at the first difference"
+        return f"Files are different. Found {self._difference_count()} differences"
+
+    def _difference_count(self):
+        """
+        @brief Get the number of differences to report
+        @return int: Exact total if known, otherwise the number of listed differences;
+                None if the comparison stopped at the first difference
+        """
+        if self.stopped_early:
+            return None
+        if self.total_differences is not None:
+            return self.total_differences
+        return len(self.differences)
+
+    def _similarity_str(self):
+        """
+        @brief Format the similarity index
+        @return str: Similarity index, with its error bound if it was estimated
+        """
+        if self.similarity_error is None:
+            return f"{self.similarity:.2f}"
+        return f"{self.similarity:.2f} ± {self.similarity_error:.2f} (estimated)"
+
+    def _get_range_str(self):
+        """
+        @brief Get a string representation of the comparison range
+        @return str: Description of the line and column ranges being compared
+        """
+        parts = []
+        if self.range_unit == "records" and (self.start_line > 0 or self.end_line is not None):
+            # Numbered from 0 like the records in the differences
+            record_range = f"records {self.start_line}"
+            if self.end_line is not None:
+                record_range += f"-{self.end_line - 1}"
+            parts.append(record_range)
+        elif self.start_line > 0 or self.end_line is not None:
+            line_range = f"lines {self.start_line+1}"
+            if self.end_line is not None:
+                line_range += f"-{self.end_line+1}"
+            parts.append(line_range)
+            
+        if self.start_column > 0 or self.end_column is not None:
+            col_range = f"columns {self.start_column+1}"
+            if self.end_column is not None:
+                col_range += f"-{self.end_column+1}"
+            parts.append(col_range)
+            
+        if parts:
+            return " in " + ", ".join(parts)
+        return ""
+    
+    def to_dict(self):
+        """
+        @brief Convert the comparison result to a dictionary representation
+        @return dict: Dictionary containing all comparison details
+        """
+        return {
+            "file1": self.file1,
+            "file2": self.file2,
+            "file1_size": self.file1_size,
+            "file2_size": self.file2_size,
+            "range": {
+                "start_line": self.start_line,
+                "end_line": self.end_line,
+                "start_column": self.start_column,
+                "end_column": self.end_column
+            },
+            "identical": self.identical,
+            "differences": [diff.to_dict() for diff in self.differences],
+            "total_differences": self._difference_count(),
+            "stopped_early": self.stopped_early,
+            "similarity": self.similarity,
+            "similarity_error": self.similarity_error,
+            "differing_bytes": self.differing_bytes,
+            "field_statistics": self.field_statistics,
+            "error": self.error
+        }
+    
+    def to_html(self):
+        """
+        @brief Convert the comparison result to HTML format
+        @details Generates a complete HTML document with styling for displaying
+                 the comparison results in a web browser
+        @return str: HTML representation of the comparison result
+        """
+        if self.error:
+            return f"<div class='error'>Error during comparison: {self.error}</div>"
+            
+        html = ["<html><head><style>",
+                "body { font-family: Arial, sans-serif; }",
+                ".identical { color: green; }",
+                ".different { color: red; }",
+                ".diff-item { margin: 10px 0; padding: 5px; border: 1px solid #ccc; }",
+                "</style></head><body>"]
+        
+        if self.identical:
+            range_str = self._get_range_str()
+            html.append(f"<h2 class='identical'>Files are identical{range_str}.</h2>")
+        else:
+            html.append(f"<h2 class='different'>{self._different_summary()}:</h2>")
+            if self.differing_bytes:
+                html.append(f"<p>Differing bytes: {self.differing_bytes}</p>")
+            if self.similarity is not None:
+                html.append(f"<p>Similarity Index: {self._similarity_str()}</p>")
+            for line in self._field_statistics_lines():
+                html.append(f"<p>{line}</p>")
+            html.append("<div class='diff-list'>")
+            
+            for i, diff in enumerate(self.differences, 1):
+                html.append(f"<div class='diff-item'>")
+                html.append(f"<h3>Difference {i}</h3>")
+                html.append(f"<p>Position: {diff.position}</p>")
+                html.append(f"<p>Expected: <pre>{diff.expected}</pre></p>")
+                html.append(f"<p>Actual: <pre>{diff.actual}</pre></p>")
+                html.append(f"<p>Type: {diff.diff_type}</p>")
+                html.append("</div>")
+                
+            html.append("</div>")
+            
+        html.append("</body></html>")
         return "\n".join(html)
\ No newline at end of file
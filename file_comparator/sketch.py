@@ -0,0 +1,259 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file sketch.py
+@brief Bottom-k MinHash sketches of content-defined shingles for approximate similarity
+@author Xiaotong Wang
+@date 2025
+"""
+
+import math
+import os
+import numpy as np
+
+# Suffix of the sidecar file a whole-file sketch is saved to
+SKETCH_SUFFIX = ".minhash"
+
+# Number of smallest shingle hashes kept; the standard error of the estimate is at most 1/(2*sqrt(k))
+SKETCH_SIZE = 4096
+
+# Bytes hashed into one shingle, starting at its anchor
+SHINGLE_BYTES = 32
+
+# A position is an anchor when the hash of its 4 bytes falls below 2**32 >> ANCHOR_BITS,
+# i.e. on average every 2**ANCHOR_BITS bytes
+ANCHOR_BITS = 8
+
+# Anchors closer than this to the previous candidate are dropped, which bounds the number
+# of shingles in repetitive data
+MIN_ANCHOR_GAP = 32
+
+# Sketches with fewer hashes than this are too sparse for a useful estimate, e.g. for short
+# or low-entropy data with hardly any anchors
+MIN_SKETCH_HASHES = 64
+
+# Size of the blocks a file is read in
+_READ_BLOCK = 1 << 24
+
+# Size of the blocks a file is read in when every position is hashed
+_DENSE_READ_BLOCK = 1 << 20
+
+# First word of a sidecar file, followed by size, mtime_ns and sketch size
+_MAGIC = 0x4D484B53
+
+# Sketches already loaded in this process, keyed by path
+_loaded = {}
+
+def _shingle_hashes(block, first, dense=False):
+    """
+    @brief Hash the shingles anchored in one block of data
+    @param block np.ndarray: uint8 data, starting with the carry-over of the previous block
+    @param first bool: Whether this is the first block of the file
+    @param dense bool: Hash the shingle at every position instead of at the anchors only
+    @return np.ndarray: uint64 hashes of the shingles that fit completely in the block
+    @details Anchors are chosen from the content alone (a multiplicative hash of the 4 bytes
+             at every offset), so shingles survive insertions and deletions elsewhere in
+             the file. A block is assumed to start with MIN_ANCHOR_GAP + SHINGLE_BYTES
+             bytes that were already seen, unless it is the first one.
+    """
+    n = len(block)
+    if n < SHINGLE_BYTES:
+        return np.empty(0, dtype=np.uint64)
+    low = 0 if first else MIN_ANCHOR_GAP
+    if dense:
+        # The shingles starting up to MIN_ANCHOR_GAP were hashed with the previous block
+        return _mix_words(_word_view(block)[low + (not first):], n - SHINGLE_BYTES + 1 - low - (not first))
+
+    # Test the little-endian 4-byte word at every offset; the words starting at offsets
+    # r, r + 4, ... are read in place through one unaligned view per r
+    candidate = np.empty(n - 3, dtype=bool)
+    for offset in range(4):
+        count = len(candidate[offset::4])
+        words = block[offset:offset + 4 * count].view('<u4') * np.uint32(0x9E3779B1)
+        candidate[offset::4] = words < np.uint32(1 << (32 - ANCHOR_BITS))
+
+    # Keep candidates with no other candidate in the MIN_ANCHOR_GAP - 1 bytes before them;
+    # the window is built by doubling so the data is only passed over a few times
+    window = candidate.copy()
+    width = 1
+    while 2 * width < MIN_ANCHOR_GAP - 1:
+        window[width:] |= window[:-width].copy()
+        width *= 2
+    # window[i] covers candidates in [i - width + 1, i]; combine two windows for the full gap
+    before = np.zeros_like(candidate)
+    before[1:] = window[:-1]
+    rest = MIN_ANCHOR_GAP - 1 - width
+    before[1 + rest:] |= window[:-1 - rest]
+    anchors = np.flatnonzero(candidate & ~before)
+    anchors = anchors[(anchors >= low) & (anchors <= n - SHINGLE_BYTES)]
+    return _mix_shingles(block, anchors)
+
+def _mix_shingles(block, anchors):
+    """
+    @brief Hash the shingles starting at the given positions of a block
+    @param block np.ndarray: uint8 data
+    @param anchors np.ndarray: Start of every shingle, each at most len(block) - SHINGLE_BYTES
+    @return np.ndarray: uint64 hash of every shingle
+    """
+    if not len(anchors):
+        return np.empty(0, dtype=np.uint64)
+
+    # Mix the four 64-bit words of every shingle into one well-spread hash
+    shingles = block[anchors[:, None] + np.arange(SHINGLE_BYTES)].view('<u8')
+    hashes = np.full(len(anchors), 0x84222325CBF29CE4, dtype=np.uint64)
+    for column in range(SHINGLE_BYTES // 8):
+        hashes = (hashes ^ shingles[:, column]) * np.uint64(0x9E3779B97F4A7C15)
+        hashes ^= hashes >> np.uint64(31)
+    return hashes
+
+def _word_view(block):
+    """
+    @brief Read the little-endian 64-bit word starting at every offset of a block
+    @param block np.ndarray: uint8 data of at least 8 bytes
+    @return np.ndarray: uint64 words, len(block) - 7 of them
+    """
+    words = np.empty(len(block) - 7, dtype=np.uint64)
+    for offset in range(8):
+        count = len(words[offset::8])
+        words[offset::8] = block[offset:offset + 8 * count].view('<u8')
+    return words
+
+def _mix_words(words, count):
+    """
+    @brief Hash the shingles starting at every one of the first count offsets
+    @param words np.ndarray: uint64 words at consecutive offsets, see _word_view()
+    @param count int: Number of shingles, each needing SHINGLE_BYTES - 7 words from its start
+    @return np.ndarray: uint64 hash of every shingle, the same as _mix_shingles() gives
+    """
+    hashes = np.full(max(count, 0), 0x84222325CBF29CE4, dtype=np.uint64)
+    for column in range(SHINGLE_BYTES // 8):
+        hashes = (hashes ^ words[8 * column:8 * column + len(hashes)]) * np.uint64(0x9E3779B97F4A7C15)
+        hashes ^= hashes >> np.uint64(31)
+    return hashes
+
+def _number_occurrences(hashes, seen):
+    """
+    @brief Make repeated shingle hashes distinct by mixing in their occurrence number
+    @param hashes np.ndarray: uint64 shingle hashes in file order
+    @param seen dict: Occurrences of every hash in the blocks before; updated
+    @return np.ndarray: uint64 hashes of (shingle, occurrence number) pairs
+    """
+    if not len(hashes):
+        return hashes
+    distinct, inverse, counts = np.unique(hashes, return_inverse=True, return_counts=True)
+    before = np.array([seen.get(value, 0) for value in distinct.tolist()], dtype=np.uint64)
+    seen.update(zip(distinct.tolist(), (before + counts.astype(np.uint64)).tolist()))
+
+    # Rank of every hash among the equal ones of this block, in file order
+    order = np.argsort(inverse, kind='stable')
+    rank = np.empty(len(hashes), dtype=np.uint64)
+    rank[order] = np.arange(len(hashes), dtype=np.uint64) - np.repeat(
+        (np.cumsum(counts) - counts).astype(np.uint64), counts)
+    numbered = hashes ^ ((before[inverse] + rank + np.uint64(1)) * np.uint64(0xC2B2AE3D27D4EB4F))
+    numbered *= np.uint64(0x9E3779B97F4A7C15)
+    return numbered ^ (numbered >> np.uint64(29))
+
+def build_sketch(file_path, start=0, end=None, size=SKETCH_SIZE, dense=False):
+    """
+    @brief Stream a byte range of a file once and keep its smallest shingle hashes
+    @param file_path Path: File to sketch
+    @param start int: First byte of the range
+    @param end int: End of the range (exclusive, None for end of file)
+    @param size int: Number of hashes to keep
+    @param dense bool: Hash the shingle at every position, for data with too few anchors
+    @return np.ndarray: Sorted, distinct uint64 hashes, at most size of them
+    @details Dense sketches number the occurrences of every shingle, so repeated content
+             is weighted by how often it occurs instead of counting once.
+    """
+    read_block = _DENSE_READ_BLOCK if dense else _READ_BLOCK
+    sketch = np.empty(0, dtype=np.uint64)
+    carry = np.empty(0, dtype=np.uint8)
+    overlap = MIN_ANCHOR_GAP + SHINGLE_BYTES
+    remaining = None if end is None else max(0, end - start)
+    first = True
+    seen = {}
+    with open(file_path, 'rb') as f:
+        f.seek(start)
+        while remaining is None or remaining > 0:
+            data = f.read(read_block if remaining is None else min(read_block, remaining))
+            if not data:
+                break
+            if remaining is not None:
+                remaining -= len(data)
+            block = np.concatenate((carry, np.frombuffer(data, dtype=np.uint8)))
+            hashes = _shingle_hashes(block, first, dense)
+            if dense:
+                hashes = _number_occurrences(hashes, seen)
+            if len(hashes):
+                # Sort and drop repeats directly, which is much faster than np.unique here
+                merged = np.sort(np.concatenate((sketch, hashes)))
+                sketch = merged[np.append(True, merged[1:] != merged[:-1])][:size]
+            carry = block[-overlap:]
+            first = False
+    return sketch
+
+def load_sketch(file_path, size=SKETCH_SIZE):
+    """
+    @brief Get the sketch of a whole file, building and saving it if needed
+    @param file_path Path: File to sketch
+    @param size int: Number of hashes to keep
+    @return np.ndarray: Sorted, distinct uint64 hashes
+    @details The sketch is reused from memory or from the sidecar file as long as the size
+             and modification time of the file are unchanged. A fresh sketch is written to
+             the sidecar; if that fails (read-only directory) it is only kept in memory.
+    """
+    stat = os.stat(file_path)
+    stamp = (stat.st_size, stat.st_mtime_ns, size)
+    path = os.path.abspath(file_path)
+    cached = _loaded.get(path)
+    if cached and cached[0] == stamp:
+        return cached[1]
+
+    sidecar = path + SKETCH_SUFFIX
+    try:
+        data = np.fromfile(sidecar, dtype=np.int64)
+        if len(data) >= 4 and data[0] == _MAGIC and tuple(data[1:4].tolist()) == stamp:
+            sketch = data[4:].view(np.uint64)
+            _loaded[path] = (stamp, sketch)
+            return sketch
+    except (OSError, ValueError):
+        pass
+
+    sketch = build_sketch(file_path, size=size)
+    _loaded[path] = (stamp, sketch)
+    header = np.array([_MAGIC, stat.st_size, stat.st_mtime_ns, size], dtype=np.int64)
+    try:
+        np.concatenate([header, sketch.view(np.int64)]).tofile(sidecar + ".tmp")
+        os.replace(sidecar + ".tmp", sidecar)
+    except OSError:
+        pass
+    return sketch
+
+def estimate_similarity(sketch1, sketch2, size=SKETCH_SIZE):
+    """
+    @brief Estimate the similarity index of two files from their sketches
+    @param sketch1 np.ndarray: Sketch of the first file
+    @param sketch2 np.ndarray: Sketch of the second file
+    @param size int: Number of hashes the sketches were built with
+    @return tuple: (float, float) - Estimated similarity and the half-width of its 95% interval
+    @details The smallest hashes of the union are taken from both sketches; the share of
+             them present in both estimates the Jaccard index J of the two shingle sets,
+             with standard error sqrt(J(1 - J) / k). It is reported as the Dice coefficient
+             2J / (1 + J), which like the exact index is twice the shared part over the
+             total. The shingles only sample the data, so the result is always an estimate,
+             and one from sketches under MIN_SKETCH_HASHES hashes is a poor one.
+    @throws ValueError: If either sketch is empty
+    """
+    if not len(sketch1) or not len(sketch2):
+        raise ValueError("Cannot estimate the similarity from an empty sketch")
+    union = np.union1d(sketch1, sketch2)[:size]
+    shared = np.count_nonzero(np.isin(union, sketch1, assume_unique=True) &
+                              np.isin(union, sketch2, assume_unique=True))
+    jaccard = shared / len(union)
+    similarity = 2 * jaccard / (1 + jaccard)
+
+    # Keep the variance away from zero at the ends of the range
+    p = min(max(jaccard, 1 / (len(union) + 1)), 1 - 1 / (len(union) + 1))
+    error = 1.96 * math.sqrt(p * (1 - p) / len(union)) * 2 / (1 + jaccard) ** 2
+    return similarity, min(error, 1.0)
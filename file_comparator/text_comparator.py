@@ -1,177 +1,624 @@
-#!/usr/bin/env python3
-# -*- coding: utf-8 -*-
-
-"""
-@file text_comparator.py
-@brief Text file comparator implementation with line-by-line comparison
-@author Xiaotong Wang
-@date 2025
-"""
-
-import difflib
-from .base_comparator import BaseComparator
-from .result import Difference
-
-class TextComparator(BaseComparator):
-    """
-    @brief Comparator for text files with line-by-line comparison
-    @details This class implements text file comparison using Python's difflib
-             for detailed difference detection. It supports line and column-based
-             range selection for comparison.
-    """
-    
-    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
-        """
-        @brief Read text content with specified range
-        @param file_path Path: Path to the text file to read
-        @param start_line int: Starting line number (0-based)
-        @param end_line int: Ending line number (0-based, None for end of file)
-        @param start_column int: Starting column number (0-based)
-        @param end_column int: Ending column number (0-based, None for end of line)
-        @return list: List of text lines within the specified range
-        @throws ValueError: If line or column ranges are invalid
-        @throws UnicodeDecodeError: If file encoding is incorrect
-        @throws FileNotFoundError: If file doesn't exist
-        @throws IOError: If there are other file reading errors
-        """
-        try:
-            self.logger.debug(f"Reading text file: {file_path}")
-            with open(file_path, 'r', encoding=self.encoding) as f:
-                lines = f.readlines()
-                
-            if start_line < 0:
-                raise ValueError("Start line cannot be negative")
-                
-            if end_line is not None:
-                if end_line < start_line:
-                    raise ValueError("End line cannot be before start line")
-                if end_line >= len(lines):
-                    self.logger.warning(f"End line {end_line} exceeds file length {len(lines)}, capping at {len(lines)-1}")
-                    end_line = len(lines) - 1
-            else:
-                end_line = len(lines) - 1
-                
-            if start_line >= len(lines):
-                raise ValueError(f"Start line {start_line} is beyond file length {len(lines)}")
-                
-            selected_lines = lines[start_line:end_line+1]
-            
-            if start_column < 0:
-                raise ValueError("Start column cannot be negative")
-                
-            if start_column > 0 or end_column is not None:
-                self.logger.debug(f"Applying column range: {start_column} to {end_column}")
-                processed_lines = []
-                for line in selected_lines:
-                    if end_column is not None and end_column < start_column:
-                        raise ValueError("End column cannot be before start column")
-                    # Make sure we don't exceed line length
-                    effective_end = end_column
-                    if effective_end is not None and effective_end >= len(line):
-                        effective_end = len(line) - 1
-                    # Apply column range, handle if start_column is beyond line length
-                    if start_column >= len(line):
-                        processed_lines.append("")
-                    else:
-                        processed_lines.append(line[start_column:None if effective_end is None else effective_end+1])
-                return processed_lines
-            
-            return selected_lines
-            
-        except UnicodeDecodeError as e:
-            raise ValueError(f"File encoding error for {file_path}. Try specifying a different encoding. Error: {str(e)}")
-        except FileNotFoundError:
-            raise ValueError(f"File not found: {file_path}")
-        except IOError as e:
-            raise ValueError(f"Error reading file {file_path}: {str(e)}")
-    
-    def compare_content(self, content1, content2):
-        """
-        @brief Compare text content and return detailed differences
-        @param content1 list: First list of text lines to compare
-        @param content2 list: Second list of text lines to compare
-        @return tuple: (bool, list) - (identical, differences)
-        @details Uses difflib to generate a detailed comparison of the text content.
-                 Returns a tuple containing a boolean indicating if the content is identical
-                 and a list of Difference objects describing any differences found.
-                 Limits the number of differences reported to 10 to avoid overwhelming output.
-        """
-        self.logger.debug(f"Comparing text content")
-        
-        if content1 == content2:
-            return True, []
-            
-        differences = []
-        
-        # Use difflib for more detailed comparison
-        diff = list(difflib.unified_diff(content1, content2, n=0))
-        
-        # Process the diff output to create structured differences
-        line_diffs = []
-        for line in diff[2:]:  # Skip the first two header lines
-            if line.startswith('@@'):
-                continue
-            elif line.startswith('-'):
-                line_diffs.append(('remove', line[1:]))
-            elif line.startswith('+'):
-                line_diffs.append(('add', line[1:]))
-            else:
-                line_diffs.append(('context', line[1:]))
-        
-        # Convert diff to our difference format
-        line_num1 = 0
-        line_num2 = 0
-        for i, (action, line) in enumerate(line_diffs):
-            if action == 'remove':
-                # Look ahead for a corresponding 'add'
-                add_match = None
-                for j in range(i+1, min(i+5, len(line_diffs))):
-                    if line_diffs[j][0] == 'add':
-                        add_match = line_diffs[j][1]
-                        del line_diffs[j]
-                        break
-                
-                if add_match is not None:
-                    # Content difference
-                    differences.append(Difference(
-                        position=f"line {line_num1+1}",
-                        expected=line,
-                        actual=add_match,
-                        diff_type="content"
-                    ))
-                else:
-                    # Missing line
-                    differences.append(Difference(
-                        position=f"line {line_num1+1}",
-                        expected=line,
-                        actual=None,
-                        diff_type="missing"
-                    ))
-                line_num1 += 1
-                
-            elif action == 'add':
-                # Extra line
-                differences.append(Difference(
-                    position=f"line {line_num2+1}",
-                    expected=None,
-                    actual=line,
-                    diff_type="extra"
-                ))
-                line_num2 += 1
-                
-            elif action == 'context':
-                line_num1 += 1
-                line_num2 += 1
-        
-        # Limit the number of differences reported
-        max_diffs = 10
-        if len(differences) > max_diffs:
-            differences = differences[:max_diffs]
-            differences.append(Difference(
-                position=None,
-                expected=None,
-                actual=None,
-                diff_type=f"more differences not shown (total: {len(differences)})"
-            ))
-            
-        return False, differences
\ No newline at end of file
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+@file text_comparator.py
+@brief Text file comparator implementation with line-by-line comparison
+@author Xiaotong Wang
+@date 2025
+"""
+
+import codecs
+import mmap
+import os
+from itertools import islice, zip_longest
+from .base_comparator import BaseComparator
+import numpy as np
+from .diff_engine import get_diff_engine, parallel_opcodes
+from .line_index import line_byte_range, seek_line
+from .numeric import NUMBER_PATTERN, numbers_close, parse_numbers, split_numbers
+from .result import Difference, DifferenceCollector
+
+# Every ASCII character, and the bytes it must encode to for raw line comparison
+_ASCII_BYTES = bytes(range(128))
+_ASCII_TEXT = _ASCII_BYTES.decode("ascii")
+
+class TextComparator(BaseComparator):
+    """
+    @brief Comparator for text files with line-by-line comparison
+    @details This class implements text file comparison on top of a pluggable diff
+             engine (Myers O(ND) by default, difflib for reference) for detailed
+             difference detection. It supports line and column-based range selection
+             for comparison.
+    """
+
+    # Whether compare_paths() may diff undecoded byte lines; subclasses that parse the
+    # text into another structure turn this off
+    raw_line_compare = True
+
+    # Whether compare_paths() may report byte-identical files without decoding them;
+    # subclasses whose parser rejects invalid documents turn this off so that the error
+    # is always reported
+    skip_identical_files = True
+
+    # Size of the slices used when checking two files for byte equality
+    RAW_COMPARE_BLOCK = 1 << 20
+
+    # Inputs shorter than this are diffed in-process even when several threads are allowed
+    PARALLEL_MIN_LINES = 100000
+
+    def __init__(self, encoding="utf-8", chunk_size=8192, verbose=False, diff_algorithm="myers", num_threads=1,
+                 numeric_tolerance=False, rtol=1e-5, atol=1e-8, line_index=False, max_differences=10,
+                 count_only=False, fail_fast=False):
+        """
+        @brief Initialize the text comparator
+        @param encoding str: File encoding (default: "utf-8")
+        @param chunk_size int: Size of chunks for reading large files (default: 8192)
+        @param verbose bool: Enable verbose logging (default: False)
+        @param diff_algorithm str: Diff engine to use: 'myers' (default) or 'difflib'
+        @param num_threads int: Worker processes for diffing large inputs (default: 1)
+        @param numeric_tolerance bool: Compare numbers inside lines with rtol/atol (default: False)
+        @param rtol float: Relative tolerance for numeric fields (default: 1e-5)
+        @param atol float: Absolute tolerance for numeric fields (default: 1e-8)
+        @param line_index bool: Seek to start_line through a sidecar line offset index (default: False);
+                    ignored for encodings that are not ASCII-compatible
+        @param max_differences int: Number of differences listed in the result (default: 10)
+        @param count_only bool: Only count the differing lines, list none of them (default: False)
+        @param fail_fast bool: Stream both files and stop at the first differing line (default: False)
+        """
+        super().__init__(encoding, chunk_size, verbose, max_differences, count_only, fail_fast)
+        get_diff_engine(diff_algorithm)  # Fail early on unknown algorithms
+        self.diff_algorithm = diff_algorithm
+        self.num_threads = num_threads
+        self.numeric_tolerance = numeric_tolerance
+        self.rtol = rtol
+        self.atol = atol
+        self.line_index = line_index
+        if line_index and not self._ascii_compatible():
+            # The index holds the offsets of raw b'\n' bytes, and seeking past a byte order
+            # mark or a shift state would leave the decoder out of step
+            self.logger.warning(f"Line index disabled for encoding {encoding}: it only supports "
+                                f"ASCII-compatible encodings")
+            self.line_index = False
+    
+    def read_content(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Read text content with specified range
+        @param file_path Path: Path to the text file to read
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @param start_column int: Starting column number (0-based)
+        @param end_column int: Ending column number (0-based, None for end of line)
+        @return list: List of text lines within the specified range
+        @throws ValueError: If line or column ranges are invalid
+        @throws UnicodeDecodeError: If file encoding is incorrect
+        @throws FileNotFoundError: If file doesn't exist
+        @throws IOError: If there are other file reading errors
+        """
+        return list(self.iter_lines(file_path, start_line, end_line, start_column, end_column))
+
+    def iter_lines(self, file_path, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Lazily yield text lines within the specified range
+        @param file_path Path: Path to the text file to read
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @param start_column int: Starting column number (0-based)
+        @param end_column int: Ending column number (0-based, None for end of line)
+        @return generator: Text lines within the specified range, column range applied
+        @throws ValueError: If line or column ranges are invalid or the file cannot be read
+        @details The file is streamed line by line and reading stops as soon as end_line
+                 has been yielded, so memory use is bounded by the selected window
+                 rather than by the file size. Lines before start_line are skipped
+                 without being kept, or seeked over when the line index is enabled.
+        """
+        if start_line < 0:
+            raise ValueError("Start line cannot be negative")
+        if end_line is not None and end_line < start_line:
+            raise ValueError("End line cannot be before start line")
+        if start_column < 0:
+            raise ValueError("Start column cannot be negative")
+        if end_column is not None and end_column < start_column:
+            raise ValueError("End column cannot be before start column")
+
+        apply_columns = start_column > 0 or end_column is not None
+        if apply_columns:
+            self.logger.debug(f"Applying column range: {start_column} to {end_column}")
+
+        try:
+            self.logger.debug(f"Reading text file: {file_path}")
+            with open(file_path, 'r', encoding=self.encoding) as f:
+                skip = self._seek_start_line(f.buffer, file_path, start_line)
+                stop = None if end_line is None else skip + end_line - start_line + 1
+                lines_read = 0
+                for line in islice(f, skip, stop):
+                    lines_read += 1
+                    if apply_columns:
+                        line = self._slice_columns(line, start_column, end_column)
+                    yield line
+
+            if lines_read == 0 and start_line > 0:
+                raise ValueError(f"Start line {start_line} is beyond the end of file {file_path}")
+            if end_line is not None and lines_read < end_line - start_line + 1:
+                file_length = start_line + lines_read
+                self.logger.warning(f"End line {end_line} exceeds file length {file_length}, capping at {file_length-1}")
+
+        except UnicodeDecodeError as e:
+            raise ValueError(f"File encoding error for {file_path}. Try specifying a different encoding. Error: {str(e)}")
+        except FileNotFoundError:
+            raise ValueError(f"File not found: {file_path}")
+        except IOError as e:
+            raise ValueError(f"Error reading file {file_path}: {str(e)}")
+
+    def _seek_start_line(self, f, file_path, start_line):
+        """
+        @brief Move a freshly opened file to start_line if the line index is enabled
+        @param f file: Binary file object (the buffer of a text file before any read)
+        @param file_path Path: Path of the open file
+        @param start_line int: Line to start reading at (0-based)
+        @return int: Number of lines the caller still has to skip
+        """
+        if not self.line_index or start_line == 0:
+            return start_line
+        seek_line(f, file_path, start_line)
+        self.logger.debug(f"Seeked to line {start_line} of {file_path} through the line index")
+        return 0
+
+    def read_text_range(self, file_path, start_line=0, end_line=None):
+        """
+        @brief Read a line range as one decoded string without splitting it into lines
+        @param file_path Path: Path to the text file to read
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @return str: Text of the selected lines
+        @throws ValueError: If the line range is invalid or the file cannot be read
+        @details The byte range of the lines comes from the line index (or is the whole
+                 file) and is decoded straight from a memoryview of the memory-mapped file,
+                 so the only copy made is the decoded string; line endings are kept as they
+                 are in the file. Without the line index a partial range is read line by
+                 line. Used by the structured comparators that parse a whole document.
+        """
+        if start_line < 0:
+            raise ValueError("Start line cannot be negative")
+        if end_line is not None and end_line < start_line:
+            raise ValueError("End line cannot be before start line")
+        if not self.line_index and (start_line > 0 or end_line is not None):
+            return ''.join(self.iter_lines(file_path, start_line, end_line))
+        try:
+            if start_line == 0 and end_line is None:
+                start, end = 0, os.path.getsize(file_path)
+            else:
+                start, end, line_count = line_byte_range(file_path, start_line, end_line)
+                if line_count == 0 and start_line > 0:
+                    raise ValueError(f"Start line {start_line} is beyond the end of file {file_path}")
+                if end_line is not None and line_count < end_line - start_line + 1:
+                    file_length = start_line + line_count
+                    self.logger.warning(f"End line {end_line} exceeds file length {file_length}, capping at {file_length-1}")
+            if start == end:
+                return ""
+            with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as m:
+                with memoryview(m) as view, view[start:end] as selected:
+                    return str(selected, self.encoding)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"File encoding error for {file_path}. Try specifying a different encoding. Error: {str(e)}")
+        except FileNotFoundError:
+            raise ValueError(f"File not found: {file_path}")
+        except IOError as e:
+            raise ValueError(f"Error reading file {file_path}: {str(e)}")
+
+    @staticmethod
+    def _slice_columns(line, start_column, end_column):
+        """
+        @brief Apply a column range to a single line
+        @param line str: Line to slice
+        @param start_column int: Starting column number (0-based)
+        @param end_column int: Ending column number (0-based, None for end of line)
+        @return str: Part of the line within the column range
+        """
+        # Apply column range, handle if start_column is beyond line length
+        if start_column >= len(line):
+            return ""
+        # Make sure we don't exceed line length
+        effective_end = end_column
+        if effective_end is not None and effective_end >= len(line):
+            effective_end = len(line) - 1
+        return line[start_column:None if effective_end is None else effective_end+1]
+    
+    def compare_content(self, content1, content2):
+        """
+        @brief Compare text content and return detailed differences
+        @param content1 list: First list of text lines to compare
+        @param content2 list: Second list of text lines to compare
+        @return tuple: (bool, list) - (identical, differences)
+        @details Runs the configured diff engine over the two line lists and converts its
+                 opcodes into Difference objects. With numeric tolerance enabled, numbers
+                 are compared with rtol/atol instead of character by character.
+                 Every differing line is counted, but Difference objects are only built
+                 for the first max_differences of them.
+        """
+        self.logger.debug(f"Comparing text content using {self.diff_algorithm} diff")
+        
+        if content1 == content2:
+            return True, []
+
+        if self.numeric_tolerance:
+            collector = self._new_collector()
+            self._compare_numeric_lines(content1, content2, collector)
+            if not collector.total:
+                return True, []
+            return False, self._limit_differences(collector.differences, collector.total)
+            
+        opcodes, total = self._limit_opcodes(self._diff_lines(content1, content2))
+        return False, self._limit_differences(self._opcodes_to_differences(opcodes, content1, content2), total)
+
+    def _compare_numeric_lines(self, lines1, lines2, collector):
+        """
+        @brief Compare lines field by field with numeric tolerance
+        @param lines1 list: Lines of the first file
+        @param lines2 list: Lines of the second file
+        @param collector DifferenceCollector: Receives the differing lines
+        @details Lines are diffed exactly first, so only lines that changed are tokenized.
+                 Inside every changed block the lines are split into a skeleton (their
+                 non-numeric text) and their numbers, and the skeletons are diffed again to
+                 align lines that only differ in values. The numbers of all aligned lines
+                 are then checked in one vectorized np.isclose call and only lines with a
+                 value outside rtol/atol are reported.
+        """
+        changed = [op for op in self._diff_lines(lines1, lines2) if op[0] != 'equal']
+        if not changed:
+            return
+
+        # Tokenize the changed lines of both files in one pass each
+        rows1 = [i for _, i1, i2, _, _ in changed for i in range(i1, i2)]
+        rows2 = [j for _, _, _, j1, j2 in changed for j in range(j1, j2)]
+        skeletons1, values1, offsets1 = self._tokenize_lines([lines1[i] for i in rows1])
+        skeletons2, values2, offsets2 = self._tokenize_lines([lines2[j] for j in rows2])
+
+        # Align the changed lines of every block by skeleton
+        diff_engine = get_diff_engine(self.diff_algorithm)
+        block_ops = []
+        tokens1 = []
+        tokens2 = []
+        row1 = row2 = 0
+        for _, i1, i2, j1, j2 in changed:
+            ops = diff_engine(skeletons1[row1:row1 + i2 - i1], skeletons2[row2:row2 + j2 - j1])
+            block_ops.append((row1, row2, i1, j1, ops))
+            for tag, s1, s2, t1, t2 in ops:
+                if tag == 'equal':
+                    tokens1.append(np.arange(offsets1[row1 + s1], offsets1[row1 + s2]))
+                    tokens2.append(np.arange(offsets2[row2 + t1], offsets2[row2 + t2]))
+            row1 += i2 - i1
+            row2 += j2 - j1
+
+        # Check all aligned values at once; aligned lines hold the same number of values
+        bad_rows1 = np.empty(0, dtype=np.int64)
+        if tokens1:
+            index1 = np.concatenate(tokens1)
+            index2 = np.concatenate(tokens2)
+            close = numbers_close(values1[index1], values2[index2], self.rtol, self.atol)
+            bad_rows1 = np.unique(np.searchsorted(offsets1, index1[~close], side='right') - 1)
+        self.logger.debug(f"{len(bad_rows1)} aligned lines have values outside tolerance")
+
+        for row1, row2, i1, j1, ops in block_ops:
+            for tag, s1, s2, t1, t2 in ops:
+                if tag != 'equal':
+                    opcode = (tag, i1 + s1, i1 + s2, j1 + t1, j1 + t2)
+                    if collector.full:
+                        collector.add_count(max(s2 - s1, t2 - t1))
+                        continue
+                    for difference in self._opcodes_to_differences([opcode], lines1, lines2):
+                        collector.append(difference)
+                    continue
+                start, stop = np.searchsorted(bad_rows1, [row1 + s1, row1 + s2])
+                if collector.full:
+                    collector.add_count(int(stop - start))
+                    continue
+                for row in bad_rows1[start:stop].tolist():
+                    i = i1 + row - row1
+                    j = j1 + t1 + (row - row1 - s1)
+                    collector.append(Difference(
+                        position=self._line_position(i, j),
+                        expected=lines1[i],
+                        actual=lines2[j],
+                        diff_type="content"
+                    ))
+
+    @staticmethod
+    def _tokenize_lines(lines):
+        """
+        @brief Split lines into numeric skeletons and a flat array of their numbers
+        @param lines list: Lines to tokenize
+        @return tuple: (list, np.ndarray, np.ndarray) - skeletons, values, and per-line
+                offsets such that the numbers of line i are values[offsets[i]:offsets[i+1]]
+        @details The lines are joined and scanned with a single regex call, and all numbers
+                 are converted by one NumPy call, instead of handling every token in Python.
+        """
+        if not lines:
+            return [], np.empty(0, dtype=np.float64), np.zeros(1, dtype=np.int64)
+
+        text = "\x01".join(lines)
+        if "\0" not in text and text.count("\x01") == len(lines) - 1:
+            parts = NUMBER_PATTERN.split(text)
+            skeletons = "\0".join(parts[0::2]).split("\x01")
+            counts = [skeleton.count("\0") for skeleton in skeletons]
+            tokens = parts[1::2]
+        else:
+            # The separator characters occur in the text, fall back to line by line
+            split_lines = [split_numbers(line) for line in lines]
+            skeletons = [skeleton for skeleton, _ in split_lines]
+            counts = [len(line_tokens) for _, line_tokens in split_lines]
+            tokens = [token for _, line_tokens in split_lines for token in line_tokens]
+
+        offsets = np.zeros(len(lines) + 1, dtype=np.int64)
+        np.cumsum(counts, out=offsets[1:])
+        return skeletons, parse_numbers(tokens), offsets
+
+    def _diff_lines(self, lines1, lines2):
+        """
+        @brief Run the configured diff engine over two line lists
+        @param lines1 list: Lines of the first file
+        @param lines2 list: Lines of the second file
+        @return list: difflib-style (tag, i1, i2, j1, j2) opcodes
+        @details Large inputs are split at unique anchor lines and the segments are diffed
+                 in a process pool of num_threads workers.
+        """
+        if self.num_threads > 1 and max(len(lines1), len(lines2)) >= self.PARALLEL_MIN_LINES:
+            self.logger.debug(f"Diffing {len(lines1)} and {len(lines2)} lines with {self.num_threads} processes")
+            return parallel_opcodes(lines1, lines2, self.diff_algorithm, self.num_threads)
+        return get_diff_engine(self.diff_algorithm)(lines1, lines2)
+
+    def _limit_opcodes(self, opcodes):
+        """
+        @brief Cut diff opcodes down to the differences that will be listed
+        @param opcodes list: difflib-style (tag, i1, i2, j1, j2) opcodes
+        @return tuple: (list, int) - Opcodes covering the first difference_limit differing
+                lines, and the exact number of differing lines
+        @details Every non-equal opcode accounts for max(i2 - i1, j2 - j1) differences
+                 (see _opcodes_to_differences()), so the total is counted from the opcodes
+                 without building or decoding any line.
+        """
+        limit = self.difference_limit
+        limited = []
+        total = 0
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                continue
+            if total < limit:
+                remaining = limit - total
+                limited.append((tag, i1, i1 + min(i2 - i1, remaining), j1, j1 + min(j2 - j1, remaining)))
+            total += max(i2 - i1, j2 - j1)
+        return limited, total
+
+    def compare_paths(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Compare two text files, deciding on raw bytes where possible
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @param start_column int: Starting column number (0-based)
+        @param end_column int: Ending column number (0-based, None for end of line)
+        @return tuple: (bool, list) - (identical, differences)
+        @details When the whole file is compared, both files are memory-mapped and
+                 compared byte for byte first; identical files are never decoded or parsed
+                 (unless skip_identical_files is off). For plain text, without a column
+                 range and in an ASCII-compatible encoding, the selected lines are then
+                 diffed as raw bytes and only the lines that differ are decoded for the
+                 report. In fail-fast mode plain text is streamed
+                 instead and reading stops at the first differing line. Structured
+                 subclasses (raw_line_compare off) decode and parse both files otherwise.
+        """
+        if self.skip_identical_files and start_line == 0 and end_line is None \
+                and self._files_identical(file1, file2):
+            self.logger.debug("Files are byte-identical, skipping decoding")
+            return True, []
+
+        if self.fail_fast and self.raw_line_compare:
+            return self._compare_until_first(file1, file2, start_line, end_line, start_column, end_column)
+
+        if not (self.raw_line_compare and not self.numeric_tolerance and start_column == 0
+                and end_column is None and self._ascii_compatible()):
+            return super().compare_paths(file1, file2, start_line, end_line, start_column, end_column)
+
+        self.logger.debug("Comparing undecoded lines")
+        lines1 = self._read_byte_lines(file1, start_line, end_line)
+        lines2 = self._read_byte_lines(file2, start_line, end_line)
+        if lines1 == lines2:
+            return True, []
+
+        # Text mode translates CRLF, so do the same before diffing if any CR is present
+        if b'\r' in b''.join(lines1) or b'\r' in b''.join(lines2):
+            lines1 = [line[:-2] + b'\n' if line.endswith(b'\r\n') else line for line in lines1]
+            lines2 = [line[:-2] + b'\n' if line.endswith(b'\r\n') else line for line in lines2]
+            if lines1 == lines2:
+                return True, []
+
+        self.logger.debug(f"Comparing text content using {self.diff_algorithm} diff")
+        opcodes, total = self._limit_opcodes(self._diff_lines(lines1, lines2))
+        decoded1, decoded2 = self._decode_differing_lines(opcodes, lines1, lines2, file1, file2)
+        return False, self._limit_differences(self._opcodes_to_differences(opcodes, decoded1, decoded2), total)
+
+    def _compare_until_first(self, file1, file2, start_line=0, end_line=None, start_column=0, end_column=None):
+        """
+        @brief Stream two text files in lockstep up to their first differing line
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @param start_column int: Starting column number (0-based)
+        @param end_column int: Ending column number (0-based, None for end of line)
+        @return tuple: (bool, list) - (identical, differences)
+        @details Lines are compared by position rather than diffed, which is enough to decide
+                 whether the files are identical. With numeric tolerance, lines that differ
+                 are checked with rtol/atol before they count as a difference. Lines are
+                 numbered from the start of the range, as in compare_content().
+        """
+        self.logger.debug("Streaming lines up to the first difference")
+        lines1 = self.iter_lines(file1, start_line, end_line, start_column, end_column)
+        lines2 = self.iter_lines(file2, start_line, end_line, start_column, end_column)
+        for i, (line1, line2) in enumerate(zip_longest(lines1, lines2)):
+            if line1 == line2:
+                continue
+            if line1 is None:
+                difference = Difference(position=f"line {i+1}", expected=None, actual=line2, diff_type="extra")
+            elif line2 is None:
+                difference = Difference(position=f"line {i+1}", expected=line1, actual=None, diff_type="missing")
+            else:
+                if self.numeric_tolerance:
+                    collector = DifferenceCollector(1)
+                    self._compare_numeric_lines([line1], [line2], collector)
+                    if not collector.total:
+                        continue
+                difference = Difference(position=f"line {i+1}", expected=line1, actual=line2, diff_type="content")
+            return False, self._limit_differences([difference])
+        return True, []
+
+    def _files_identical(self, file1, file2):
+        """
+        @brief Check whether two files have exactly the same bytes
+        @param file1 Path: Path to the first file
+        @param file2 Path: Path to the second file
+        @return bool: True if both files are byte-identical
+        @details Sizes are checked first; equal-sized files are memory-mapped and compared
+                 slice by slice so the check stops at the first differing block.
+        """
+        size = os.path.getsize(file1)
+        if size != os.path.getsize(file2):
+            return False
+        if size == 0:
+            return True
+        with open(file1, 'rb') as f1, open(file2, 'rb') as f2:
+            with mmap.mmap(f1.fileno(), 0, access=mmap.ACCESS_READ) as m1, \
+                    mmap.mmap(f2.fileno(), 0, access=mmap.ACCESS_READ) as m2:
+                for offset in range(0, size, self.RAW_COMPARE_BLOCK):
+                    end = offset + self.RAW_COMPARE_BLOCK
+                    if m1[offset:end] != m2[offset:end]:
+                        return False
+        return True
+
+    def _ascii_compatible(self):
+        """
+        @brief Check whether the encoding is a stateless superset of ASCII
+        @return bool: True if lines can be split on raw b'\\n' and decoded one by one
+        @details UTF-16/32, encodings writing a byte order mark and UTF-7 do not store
+                 ASCII text as its own bytes; the ISO-2022 family does, but switches
+                 character sets with escape sequences that may span lines.
+        """
+        try:
+            name = codecs.lookup(self.encoding).name
+            return _ASCII_TEXT.encode(self.encoding) == _ASCII_BYTES and not name.startswith("iso2022")
+        except (LookupError, UnicodeError):
+            return False
+
+    def _read_byte_lines(self, file_path, start_line=0, end_line=None):
+        """
+        @brief Read the selected lines of a file without decoding them
+        @param file_path Path: Path to the file to read
+        @param start_line int: Starting line number (0-based)
+        @param end_line int: Ending line number (0-based, None for end of file)
+        @return list: Raw byte lines within the range
+        @throws ValueError: If the line range is invalid or the file cannot be read
+        """
+        if start_line < 0:
+            raise ValueError("Start line cannot be negative")
+        if end_line is not None and end_line < start_line:
+            raise ValueError("End line cannot be before start line")
+        try:
+            with open(file_path, 'rb') as f:
+                skip = self._seek_start_line(f, file_path, start_line)
+                lines = list(islice(f, skip, None if end_line is None else skip + end_line - start_line + 1))
+        except FileNotFoundError:
+            raise ValueError(f"File not found: {file_path}")
+        except IOError as e:
+            raise ValueError(f"Error reading file {file_path}: {str(e)}")
+
+        if not lines and start_line > 0:
+            raise ValueError(f"Start line {start_line} is beyond the end of file {file_path}")
+        if end_line is not None and len(lines) < end_line - start_line + 1:
+            file_length = start_line + len(lines)
+            self.logger.warning(f"End line {end_line} exceeds file length {file_length}, capping at {file_length-1}")
+        return lines
+
+    def _decode_differing_lines(self, opcodes, lines1, lines2, file1, file2):
+        """
+        @brief Decode only the lines touched by a diff
+        @param opcodes list: Diff opcodes computed on the byte lines
+        @param lines1 list: Byte lines of the first file
+        @param lines2 list: Byte lines of the second file
+        @param file1 Path: First file (for error messages)
+        @param file2 Path: Second file (for error messages)
+        @return tuple: (dict, dict) - Decoded differing lines of both files, keyed by line index
+        """
+        decoded1 = {}
+        decoded2 = {}
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag != 'equal':
+                for i in range(i1, i2):
+                    decoded1[i] = self._decode_line(lines1[i], file1)
+                for j in range(j1, j2):
+                    decoded2[j] = self._decode_line(lines2[j], file2)
+        return decoded1, decoded2
+
+    def _decode_line(self, line, file_path):
+        """
+        @brief Decode one raw line with the configured encoding
+        @param line bytes: Raw line
+        @param file_path Path: File the line comes from (for error messages)
+        @return str: Decoded line
+        @throws ValueError: If the line cannot be decoded
+        """
+        try:
+            return line.decode(self.encoding)
+        except UnicodeDecodeError as e:
+            raise ValueError(f"File encoding error for {file_path}. Try specifying a different encoding. Error: {str(e)}")
+
+    def _opcodes_to_differences(self, opcodes, lines1, lines2):
+        """
+        @brief Convert diff opcodes into Difference objects
+        @param opcodes list: difflib-style (tag, i1, i2, j1, j2) opcodes
+        @param lines1 sequence: Lines of the first file, indexable by line index
+        @param lines2 sequence: Lines of the second file, indexable by line index
+        @return list: Difference objects
+        @details Replaced lines are paired one to one as content differences; unpaired
+                 lines are reported as missing (numbered in the first file) or extra
+                 (numbered in the second file).
+        """
+        differences = []
+        for tag, i1, i2, j1, j2 in opcodes:
+            if tag == 'equal':
+                continue
+            paired = min(i2 - i1, j2 - j1) if tag == 'replace' else 0
+            for k in range(paired):
+                differences.append(Difference(
+                    position=self._line_position(i1 + k, j1 + k),
+                    expected=lines1[i1 + k],
+                    actual=lines2[j1 + k],
+                    diff_type="content"
+                ))
+            for i in range(i1 + paired, i2):
+                differences.append(Difference(
+                    position=f"line {i+1}",
+                    expected=lines1[i],
+                    actual=None,
+                    diff_type="missing"
+                ))
+            for j in range(j1 + paired, j2):
+                differences.append(Difference(
+                    position=f"line {j+1}",
+                    expected=None,
+                    actual=lines2[j],
+                    diff_type="extra"
+                ))
+        return differences
+
+    @staticmethod
+    def _line_position(line1, line2):
+        """
+        @brief Describe a pair of matched lines
+        @param line1 int: Line index in the first file (0-based)
+        @param line2 int: Line index in the second file (0-based)
+        @return str: Position string, naming both line numbers when they differ
+        """
+        if line1 == line2:
+            return f"line {line1+1}"
+        return f"line {line1+1} (file2 line {line2+1})"
\ No newline at end of file
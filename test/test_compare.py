@@ -1,5 +1,8 @@
+import json
 import subprocess
 import os
+import random
+import struct
 import sys
 import unittest
 from pathlib import Path
@@ -13,14 +16,14 @@ class TestFileComparison(unittest.TestCase):
         cls.compare_script = os.path.join(cls.workspace, "compare_text.py")
         cls.test_dir = os.path.join(cls.workspace, "test")
 
-    def run_comparison(self, file1, file2, expected_output=None, expected_error=None):
+    def run_comparison(self, file1, file2, expected_output=None, expected_error=None, extra_args=None):
         """Run file comparison and return result"""
         cmd = [
             sys.executable,
             self.compare_script,
             os.path.join("test", file1),
             os.path.join("test", file2)
-        ]
+        ] + (extra_args or [])
         
         result = subprocess.run(
             cmd,
@@ -126,5 +129,991 @@ class TestFileComparison(unittest.TestCase):
                 if os.path.exists(f):
                     os.remove(f)
 
+    def test_identical_invalid_json_files(self):
+        """Test that byte-identical documents are still parsed and checked"""
+        invalid1 = os.path.join(self.test_dir, "invalid1.json")
+        invalid2 = os.path.join(self.test_dir, "invalid2.json")
+
+        try:
+            for path in [invalid1, invalid2]:
+                with open(path, "w") as f:
+                    f.write('{"a": 1,')
+
+            self.assertFalse(
+                self.run_comparison("invalid1.json", "invalid2.json", expected_error="Invalid JSON"),
+                "Failed to report invalid identical JSON files"
+            )
+        finally:
+            # Clean up
+            for f in [invalid1, invalid2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_utf16_line_numbers(self):
+        """Test that lines of a UTF-16 file are numbered after decoding"""
+        utf1 = os.path.join(self.test_dir, "utf1.txt")
+        utf2 = os.path.join(self.test_dir, "utf2.txt")
+
+        try:
+            lines = [f"line {i}\n" for i in range(1, 21)]
+            with open(utf1, "w", encoding="utf-16") as f:
+                f.writelines(lines)
+            lines[6] = "changed\n"
+            with open(utf2, "w", encoding="utf-16") as f:
+                f.writelines(lines)
+
+            self.assertFalse(
+                self.run_comparison("utf1.txt", "utf2.txt", "At line 7: expected 'line 7",
+                                    extra_args=["--encoding", "utf-16"]),
+                "Failed to number the lines of UTF-16 files"
+            )
+            self.assertFalse(
+                self.run_comparison("utf1.txt", "utf2.txt", "Line index disabled for encoding utf-16",
+                                    extra_args=["--encoding", "utf-16", "--start-line", "5", "--line-index"]),
+                "Failed to read a UTF-16 line range with the line index requested"
+            )
+        finally:
+            # Clean up
+            for f in [utf1, utf2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_line_range_comparison(self):
+        """Test that only the selected line range is compared"""
+        range1 = os.path.join(self.test_dir, "range1.txt")
+        range2 = os.path.join(self.test_dir, "range2.txt")
+
+        try:
+            with open(range1, "w") as f1, open(range2, "w") as f2:
+                for i in range(1, 101):
+                    f1.write(f"line {i}\n")
+                    f2.write(f"line {i}\n" if i != 80 else "changed\n")
+
+            self.assertTrue(
+                self.run_comparison("range1.txt", "range2.txt", "Files are identical in lines 10-50.",
+                                    extra_args=["--start-line", "10", "--end-line", "50"]),
+                "Failed to ignore differences outside the line range"
+            )
+            self.assertFalse(
+                self.run_comparison("range1.txt", "range2.txt", "expected 'line 80",
+                                    extra_args=["--start-line", "70", "--end-line", "90"]),
+                "Failed to detect difference inside the line range"
+            )
+        finally:
+            # Clean up
+            for f in [range1, range2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_line_index_range_comparison(self):
+        """Test that line ranges read through the sidecar line index match plain reads"""
+        range1 = os.path.join(self.test_dir, "range1.json")
+        range2 = os.path.join(self.test_dir, "range2.json")
+
+        try:
+            with open(range1, "w") as f1, open(range2, "w") as f2:
+                for i in range(1, 3001):
+                    f1.write(f"line {i}\n")
+                    f2.write(f"line {i}\n" if i != 2500 else "changed\n")
+                f1.write('{"values": [1, 2,\n 3]}\n')
+                f2.write('{"values": [1, 2,\n 3]}\n')
+
+            for _ in range(2):
+                # The first run builds the sidecar index, the second one reuses it
+                self.assertTrue(
+                    self.run_comparison("range1.json", "range2.json", "Files are identical in lines 3001-3002.",
+                                        extra_args=["--start-line", "3001", "--end-line", "3002", "--line-index"]),
+                    "Failed to parse the JSON document selected through the line index"
+                )
+                self.assertFalse(
+                    self.run_comparison("range1.json", "range2.json", "expected 'line 2500",
+                                        extra_args=["--file-type", "text", "--start-line", "2000",
+                                                    "--end-line", "2600", "--line-index"]),
+                    "Failed to detect difference inside the indexed line range"
+                )
+            self.assertTrue(os.path.exists(range1 + ".lineidx"), "Sidecar line index was not written")
+        finally:
+            # Clean up
+            for f in [range1, range2, range1 + ".lineidx", range2 + ".lineidx"]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_difference_cap_and_count(self):
+        """Test that differences beyond --max-differences are counted but not listed"""
+        count1 = os.path.join(self.test_dir, "count1.txt")
+        count2 = os.path.join(self.test_dir, "count2.txt")
+
+        try:
+            with open(count1, "w") as f1, open(count2, "w") as f2:
+                for i in range(100):
+                    f1.write(f"value {i:02d}\n")
+                    f2.write(f"value {i:02d}\n" if i % 4 else f"VALUE {i:02d}\n")
+
+            self.assertFalse(
+                self.run_comparison("count1.txt", "count2.txt", "more differences not shown (total: 25)",
+                                    extra_args=["--file-type", "text", "--max-differences", "5"]),
+                "Failed to report the total behind the listed differences"
+            )
+            self.assertFalse(
+                self.run_comparison("count1.txt", "count2.txt", "Found 25 differences.",
+                                    extra_args=["--file-type", "text", "--count-only"]),
+                "Failed to count differences in count-only mode"
+            )
+            self.assertFalse(
+                self.run_comparison("count1.txt", "count2.txt", "Found 25 differences.",
+                                    extra_args=["--file-type", "binary", "--chunk-size", "9", "--count-only"]),
+                "Failed to count differing binary chunks"
+            )
+        finally:
+            # Clean up
+            for f in [count1, count2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_fail_fast_stops_at_first_difference(self):
+        """Test that fail-fast mode reports only the first difference"""
+        fast1 = os.path.join(self.test_dir, "fast1.csv")
+        fast2 = os.path.join(self.test_dir, "fast2.csv")
+
+        try:
+            with open(fast1, "w") as f1, open(fast2, "w") as f2:
+                for i in range(1000):
+                    f1.write(f"{i},a,{i * 2}\n")
+                    f2.write(f"{i},a,{i * 2}\n" if i % 100 != 7 else f"{i},b,{i * 2}\n")
+
+            for file_type, expected in [("text", "At line 8: expected '7,a,14"),
+                                        ("csv", "Difference at row 8, column 2"),
+                                        ("binary", "Stopped at the first difference:")]:
+                result = subprocess.run(
+                    [sys.executable, self.compare_script, fast1, fast2, "--file-type", file_type, "--fail-fast"],
+                    cwd=self.workspace,
+                    capture_output=True,
+                    text=True
+                )
+                self.assertNotEqual(result.returncode, 0)
+                self.assertIn("Stopped at the first difference", result.stdout)
+                self.assertIn(expected, result.stdout)
+                self.assertNotIn("2.", result.stdout, f"{file_type} comparison did not stop at the first difference")
+
+            # Lines are numbered from the start of the range with or without fail-fast
+            for extra_args in [[], ["--fail-fast"]]:
+                self.assertFalse(
+                    self.run_comparison("fast1.csv", "fast2.csv", "At line 6: expected '7,a,14",
+                                        extra_args=["--file-type", "text", "--start-line", "3",
+                                                    "--end-line", "50"] + extra_args),
+                    "Failed to number lines from the start of the range"
+                )
+        finally:
+            # Clean up
+            for f in [fast1, fast2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_binary_mismatch_runs(self):
+        """Test that adjacent differing bytes are reported as one run across chunks"""
+        run1 = os.path.join(self.test_dir, "run1.bin")
+        run2 = os.path.join(self.test_dir, "run2.bin")
+
+        try:
+            data = bytes(range(256)) * 4
+            changed = bytearray(data)
+            changed[100:140] = bytes(40)
+            changed[500] ^= 0xFF
+            with open(run1, "wb") as f1, open(run2, "wb") as f2:
+                f1.write(data)
+                f2.write(bytes(changed))
+
+            result = subprocess.run(
+                [sys.executable, self.compare_script, run1, run2, "--file-type", "binary", "--chunk-size", "16"],
+                cwd=self.workspace,
+                capture_output=True,
+                text=True
+            )
+            self.assertIn("Found 2 differences:", result.stdout)
+            # The preview of the run is completed from the chunk after the one it starts in
+            preview = ' '.join(f"{b:02x}" for b in range(100, 116))
+            self.assertIn(f"At bytes 100-139 (40 bytes): expected '{preview} ...', got '{'00 ' * 15}00 ...'",
+                          result.stdout)
+            self.assertIn("At byte 500:", result.stdout)
+            self.assertIn("Differing bytes: 41", result.stdout)
+        finally:
+            # Clean up
+            for f in [run1, run2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_binary_similarity_index(self):
+        """Test that the similarity index is based on the exact LCS length"""
+        sim1 = os.path.join(self.test_dir, "sim1.bin")
+        sim2 = os.path.join(self.test_dir, "sim2.bin")
+
+        try:
+            # The longest common subsequence of ABCBDAB and BDCABA has 4 bytes
+            with open(sim1, "wb") as f1, open(sim2, "wb") as f2:
+                f1.write(b"ABCBDAB")
+                f2.write(b"BDCABA")
+
+            self.assertFalse(
+                self.run_comparison("sim1.bin", "sim2.bin", "Similarity Index: 0.62",
+                                    extra_args=["--file-type", "binary", "--similarity"]),
+                "Failed to compute the similarity index from the LCS length"
+            )
+        finally:
+            # Clean up
+            for f in [sim1, sim2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_binary_similarity_estimate(self):
+        """Test that the approximate similarity index is estimated from saved sketches"""
+        sim1 = os.path.join(self.test_dir, "sim1.bin")
+        sim2 = os.path.join(self.test_dir, "sim2.bin")
+
+        try:
+            # A one-byte insertion leaves all but a few shingles in common
+            data = random.Random(0).randbytes(200000)
+            with open(sim1, "wb") as f1, open(sim2, "wb") as f2:
+                f1.write(data)
+                f2.write(data[:100000] + b"x" + data[100000:])
+
+            self.assertFalse(
+                self.run_comparison("sim1.bin", "sim2.bin", "Similarity Index: 1.00 ± 0.00 (estimated)",
+                                    extra_args=["--file-type", "binary", "--similarity",
+                                                "--similarity-mode", "approx"]),
+                "Failed to estimate the similarity index"
+            )
+            self.assertTrue(os.path.exists(sim1 + ".minhash"), "Sketch was not saved")
+        finally:
+            # Clean up
+            for f in [sim1, sim2, sim1 + ".minhash", sim2 + ".minhash"]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_binary_similarity_estimate_sparse(self):
+        """Test that short and anchorless data is not estimated as identical"""
+        sim1 = os.path.join(self.test_dir, "sim1.bin")
+        sim2 = os.path.join(self.test_dir, "sim2.bin")
+
+        try:
+            # Shorter than a shingle: computed exactly, like --similarity-mode exact
+            rng = random.Random(0)
+            with open(sim1, "wb") as f1, open(sim2, "wb") as f2:
+                f1.write(rng.randbytes(100))
+                f2.write(rng.randbytes(100))
+            outputs = []
+            for mode in ["exact", "approx"]:
+                result = subprocess.run(
+                    [sys.executable, self.compare_script, sim1, sim2, "--file-type", "binary",
+                     "--similarity", "--similarity-mode", mode],
+                    cwd=self.workspace,
+                    capture_output=True,
+                    text=True
+                )
+                outputs.append([line for line in result.stdout.splitlines() if "Similarity" in line])
+            self.assertNotIn("Similarity Index: 1.00", outputs[1][0])
+            self.assertEqual(outputs[0], outputs[1], "Sparse sketches were not compared exactly")
+
+            # No anchors at all: every position is hashed instead
+            for tail, expected in [(b"\x04" * 262144, "Similarity Index: 0.00 ±"),
+                                   (b"\x03" * 262144 + b"\x04" * 1000, "Similarity Index: 1.00 ±")]:
+                with open(sim1, "wb") as f1, open(sim2, "wb") as f2:
+                    f1.write(b"\x03" * 262144)
+                    f2.write(tail)
+                self.assertFalse(
+                    self.run_comparison("sim1.bin", "sim2.bin", expected,
+                                        extra_args=["--file-type", "binary", "--similarity",
+                                                    "--similarity-mode", "approx"]),
+                    "Failed to estimate the similarity of anchorless data"
+                )
+        finally:
+            # Clean up
+            for f in [sim1, sim2, sim1 + ".minhash", sim2 + ".minhash"]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_binary_chunked_diff(self):
+        """Test that the content-defined chunking diff reports an insertion instead of shifted bytes"""
+        cdc1 = os.path.join(self.test_dir, "cdc1.bin")
+        cdc2 = os.path.join(self.test_dir, "cdc2.bin")
+
+        try:
+            data = random.Random(0).randbytes(200000)
+            with open(cdc1, "wb") as f1, open(cdc2, "wb") as f2:
+                f1.write(data)
+                f2.write(data[:10] + b"\x00" * 8 + data[10:])
+
+            for expected in ["Found 1 differences",
+                             "Extra content at bytes 10-17 (8 bytes): '00 00 00 00 00 00 00 00'"]:
+                for extra_args in [[], ["--fail-fast"]]:
+                    self.assertFalse(
+                        self.run_comparison("cdc1.bin", "cdc2.bin", expected,
+                                            extra_args=["--file-type", "binary", "--binary-diff", "cdc"] + extra_args),
+                        "Failed to locate the inserted bytes"
+                    )
+        finally:
+            # Clean up
+            for f in [cdc1, cdc2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_binary_merkle_tree(self):
+        """Test that differing blocks are located through saved Merkle trees"""
+        tree1 = os.path.join(self.test_dir, "tree1.bin")
+        tree2 = os.path.join(self.test_dir, "tree2.bin")
+
+        try:
+            data = bytearray(random.Random(0).randbytes(3 << 20))
+            with open(tree1, "wb") as f1:
+                f1.write(data)
+            data[2500000] ^= 0xFF
+            with open(tree2, "wb") as f2:
+                f2.write(data)
+
+            # The second run reads the trees back from the sidecar files
+            for _ in range(2):
+                self.assertFalse(
+                    self.run_comparison("tree1.bin", "tree2.bin", "At byte 2500000",
+                                        extra_args=["--file-type", "binary", "--merkle"]),
+                    "Failed to locate the differing block"
+                )
+                self.assertTrue(os.path.exists(tree1 + ".merkle"), "Merkle tree was not saved")
+        finally:
+            # Clean up
+            for f in [tree1, tree2, tree1 + ".merkle", tree2 + ".merkle"]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_sparse_binary_files(self):
+        """Test that data behind a hole in sparse files is compared"""
+        sparse1 = os.path.join(self.test_dir, "sparse1.bin")
+        sparse2 = os.path.join(self.test_dir, "sparse2.bin")
+
+        try:
+            for path, tail in [(sparse1, b"abc"), (sparse2, b"abd")]:
+                with open(path, "wb") as f:
+                    f.write(b"head")
+                    f.seek(64 << 20)
+                    f.write(tail)
+                    f.truncate(128 << 20)
+
+            self.assertFalse(
+                self.run_comparison("sparse1.bin", "sparse2.bin", "At byte 67108866: expected '63', got '64'",
+                                    extra_args=["--file-type", "binary"]),
+                "Failed to compare the data extents of sparse files"
+            )
+        finally:
+            # Clean up
+            for f in [sparse1, sparse2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_binary_record_mode(self):
+        """Test that record files are compared field by field with per-field tolerances"""
+        rec1 = os.path.join(self.test_dir, "rec1.bin")
+        rec2 = os.path.join(self.test_dir, "rec2.bin")
+
+        try:
+            with open(rec1, "wb") as f1, open(rec2, "wb") as f2:
+                for i in range(100):
+                    f1.write(struct.pack("<id", i, i * 0.5))
+                    f2.write(struct.pack("<id", i, i * 0.5 + (0.01 if i in (3, 7) else 0.0)))
+
+            args = ["--file-type", "binary", "--record-dtype", "id:<i4,value:<f8"]
+            self.assertFalse(
+                self.run_comparison("rec1.bin", "rec2.bin", "At record 3, field value: expected '1.5', got '1.51'",
+                                    extra_args=args),
+                "Failed to report the differing record field"
+            )
+            self.assertFalse(
+                self.run_comparison("rec1.bin", "rec2.bin", "Field value: 2 mismatches, max abs error 0.01",
+                                    extra_args=args),
+                "Failed to report the field statistics"
+            )
+            self.assertTrue(
+                self.run_comparison("rec1.bin", "rec2.bin", "Files are identical",
+                                    extra_args=args + ["--record-field-tol", "value=0,0.02"]),
+                "Per-field tolerance was not applied"
+            )
+        finally:
+            # Clean up
+            for f in [rec1, rec2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_binary_fortran_records(self):
+        """Test that Fortran records are counted, selected and reported in one unit"""
+        rec1 = os.path.join(self.test_dir, "fortran1.bin")
+        rec2 = os.path.join(self.test_dir, "fortran2.bin")
+
+        try:
+            def write(path, writes, changed):
+                with open(path, "wb") as f:
+                    for w in range(writes):
+                        # One WRITE of three records
+                        payload = b"".join(struct.pack("<id", 3 * w + k, 3 * w + k + (0.25 if (w, k) == changed else 0))
+                                           for k in range(3))
+                        f.write(struct.pack("<i", len(payload)) + payload + struct.pack("<i", len(payload)))
+
+            write(rec1, 10, (4, 2))
+            write(rec2, 11, None)
+
+            args = ["--file-type", "binary", "--record-dtype", "id:<i4,value:<f8", "--fortran-records"]
+            self.assertFalse(
+                self.run_comparison("fortran1.bin", "fortran2.bin",
+                                    "At record 4, item 2, field value: expected '14.25', got '14.0'",
+                                    extra_args=args + ["--start-line", "4"]),
+                "Failed to locate the differing record of a Fortran WRITE"
+            )
+            self.assertFalse(
+                self.run_comparison("fortran1.bin", "fortran2.bin",
+                                    '"expected": "7 records",\n      "actual": "8 records"',
+                                    extra_args=args + ["--start-line", "4", "--output-format", "json"]),
+                "Failed to count the Fortran records of a partial range"
+            )
+            self.assertTrue(
+                self.run_comparison("fortran1.bin", "fortran2.bin", "Files are identical in records 5-8.",
+                                    extra_args=args + ["--start-line", "6", "--end-line", "10"]),
+                "Failed to select Fortran records"
+            )
+        finally:
+            # Clean up
+            for f in [rec1, rec2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_csv_rows_streamed(self):
+        """Test that CSV rows are compared in lockstep with row counts and cell ranges"""
+        csv1 = os.path.join(self.test_dir, "rows1.csv")
+        csv2 = os.path.join(self.test_dir, "rows2.csv")
+
+        try:
+            with open(csv1, "w", newline="") as f1, open(csv2, "w", newline="") as f2:
+                f1.write('id,note,value\n1,"two\nlines",10\n2,plain,20\n')
+                f2.write('id,note,value\n1,"two\nlines",11\n2,plain,20\n3,extra,30\n')
+
+            self.assertFalse(
+                self.run_comparison("rows1.csv", "rows2.csv", "Difference at row count",
+                                    extra_args=["--file-type", "csv"]),
+                "Failed to report the extra row"
+            )
+            self.assertFalse(
+                self.run_comparison("rows1.csv", "rows2.csv", "Difference at row 2, column 3",
+                                    extra_args=["--file-type", "csv"]),
+                "Failed to compare the cells of rows with quoted line breaks"
+            )
+            self.assertFalse(
+                self.run_comparison("rows1.csv", "rows2.csv", "Difference at row 2, column 2",
+                                    extra_args=["--file-type", "csv", "--start-column", "2"]),
+                "Failed to apply the column range to cells"
+            )
+            self.assertFalse(
+                self.run_comparison("rows1.csv", "rows2.csv", "more differences not shown (total: 2)",
+                                    extra_args=["--file-type", "csv", "--max-differences", "1"]),
+                "Failed to count the differences beyond the row count"
+            )
+        finally:
+            # Clean up
+            for f in [csv1, csv2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_csv_key_columns(self):
+        """Test that CSV rows are matched by key, in memory and through the external sort"""
+        csv1 = os.path.join(self.test_dir, "keys1.csv")
+        csv2 = os.path.join(self.test_dir, "keys2.csv")
+
+        try:
+            with open(csv1, "w", newline="") as f1, open(csv2, "w", newline="") as f2:
+                f1.write("id,name,value\n" + "".join(f"{i},item{i},{i * 10}\n" for i in range(20)))
+                # Row 3 removed, row 7 changed, row 99 added and the rest reordered
+                rows = [f"{i},item{i},{71 if i == 7 else i * 10}\n" for i in range(20) if i != 3]
+                f2.write("id,name,value\n" + "".join(reversed(rows)) + "99,item99,990\n")
+
+            for memory_rows in ["1000", "2"]:
+                args = ["--file-type", "csv", "--csv-key-columns", "id", "--csv-memory-rows", memory_rows]
+                self.assertFalse(
+                    self.run_comparison("keys1.csv", "keys2.csv", "Found 3 differences", extra_args=args),
+                    "Failed to match rows by key"
+                )
+                self.assertFalse(
+                    self.run_comparison("keys1.csv", "keys2.csv", "Missing content at key 3: '3,item3,30'",
+                                        extra_args=args),
+                    "Failed to report the removed row"
+                )
+                self.assertFalse(
+                    self.run_comparison("keys1.csv", "keys2.csv", "Extra content at key 99: '99,item99,990'",
+                                        extra_args=args),
+                    "Failed to report the added row"
+                )
+                self.assertFalse(
+                    self.run_comparison("keys1.csv", "keys2.csv", "Difference at key 7, column 3",
+                                        extra_args=args),
+                    "Failed to report the changed row"
+                )
+                self.assertFalse(
+                    self.run_comparison("keys1.csv", "keys2.csv", "1. Missing content at key 3",
+                                        extra_args=args),
+                    "Failed to list the differences in key order"
+                )
+
+            self.assertFalse(
+                self.run_comparison("keys1.csv", "keys2.csv", "Column numbers start at 1",
+                                    extra_args=["--file-type", "csv", "--csv-key-columns", "0"]),
+                "Failed to reject key column 0"
+            )
+        finally:
+            # Clean up
+            for f in [csv1, csv2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_csv_typed_columns(self):
+        """Test that typed CSV comparison compares numbers with per-column tolerances"""
+        csv1 = os.path.join(self.test_dir, "typed1.csv")
+        csv2 = os.path.join(self.test_dir, "typed2.csv")
+
+        try:
+            with open(csv1, "w", newline="") as f1, open(csv2, "w", newline="") as f2:
+                f1.write("id,name,price,qty\n007,bolt,1.0,10\n8,nut,2.50,20\n9,washer,3,30\n")
+                f2.write("id,name,price,qty\n007,bolt,1.00,10\n8,nut,2.5001,20\n9,washer,3.0,31\n")
+
+            self.assertFalse(
+                self.run_comparison("typed1.csv", "typed2.csv", "Difference at row 2, column 3",
+                                    extra_args=["--file-type", "csv"]),
+                "Failed to compare cells as text without --csv-typed"
+            )
+            self.assertFalse(
+                self.run_comparison("typed1.csv", "typed2.csv", "Found 2 differences",
+                                    extra_args=["--file-type", "csv", "--csv-typed"]),
+                "Failed to compare numbers as numbers"
+            )
+            self.assertFalse(
+                self.run_comparison("typed1.csv", "typed2.csv", "Field qty: 1 mismatches, max abs error 1",
+                                    extra_args=["--file-type", "csv", "--csv-typed"]),
+                "Failed to report the per-column statistics"
+            )
+            self.assertFalse(
+                self.run_comparison("typed1.csv", "typed2.csv", "Difference at row 4, column 4",
+                                    extra_args=["--file-type", "csv", "--csv-typed", "--csv-column-tol", "price=1e-3"]),
+                "Failed to apply the column tolerance"
+            )
+            self.assertFalse(
+                self.run_comparison("typed1.csv", "typed2.csv", "Found 1 differences",
+                                    extra_args=["--file-type", "csv", "--csv-typed", "--csv-column-tol", "price=1e-3"]),
+                "Failed to count only the differences beyond the column tolerance"
+            )
+        finally:
+            # Clean up
+            for f in [csv1, csv2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_csv_parallel_ranges(self):
+        """Test that CSV files compared in parallel byte ranges give the serial result"""
+        csv1 = os.path.join(self.test_dir, "ranges1.csv")
+        csv2 = os.path.join(self.test_dir, "ranges2.csv")
+
+        try:
+            with open(csv1, "w", newline="") as f1, open(csv2, "w", newline="") as f2:
+                for f in (f1, f2):
+                    f.write("id,note,value\n")
+                for i in range(100000):
+                    # Quoted line breaks must not be taken for record boundaries
+                    note = f'"line\nbreak {i}"' if i % 1000 == 0 else f"note {i}"
+                    f1.write(f"{i},{note},{i * 0.5}\n")
+                    f2.write(f"{i},{note},{i * 0.5 + (1 if i in (10, 45000, 99999) else 0)}\n")
+
+            for threads in ["1", "4"]:
+                args = ["--file-type", "csv", "--num-threads", threads]
+                self.assertFalse(
+                    self.run_comparison("ranges1.csv", "ranges2.csv", "Found 3 differences", extra_args=args),
+                    "Failed to count the differences of all ranges"
+                )
+                self.assertFalse(
+                    self.run_comparison("ranges1.csv", "ranges2.csv", "Difference at row 45002, column 3",
+                                        extra_args=args),
+                    "Failed to number rows across ranges"
+                )
+                self.assertFalse(
+                    self.run_comparison("ranges1.csv", "ranges2.csv", "Difference at row 100001, column 3",
+                                        extra_args=args + ["--csv-typed"]),
+                    "Failed to compare the last range in typed mode"
+                )
+            self.assertFalse(
+                self.run_comparison("ranges1.csv", "ranges2.csv", "ranges on 4 processes",
+                                    extra_args=["--file-type", "csv", "--num-threads", "4"]),
+                "Failed to split the files into ranges"
+            )
+        finally:
+            # Clean up
+            for f in [csv1, csv2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_csv_selected_columns(self):
+        """Test that only the selected CSV columns are compared, looked up in each header"""
+        csv1 = os.path.join(self.test_dir, "columns1.csv")
+        csv2 = os.path.join(self.test_dir, "columns2.csv")
+
+        try:
+            with open(csv1, "w", newline="") as f1, open(csv2, "w", newline="") as f2:
+                f1.write("id,name,value,note\n1,a,1.5,x\n2,b,2.5,\"quoted, note\"\n3,c,3.5,z\n")
+                # Columns reordered, notes changed and the value of id 3 changed
+                f2.write("note,value,id,name\nchanged,1.5,1,a\n\"other, note\",2.5,2,b\nz,3.75,3,c\n")
+
+            for extra in [[], ["--csv-typed"], ["--csv-key-columns", "id"]]:
+                self.assertTrue(
+                    self.run_comparison("columns1.csv", "columns2.csv", "Files are identical",
+                                        extra_args=["--file-type", "csv", "--csv-columns", "id,name"] + extra),
+                    "Failed to ignore the columns that are not selected"
+                )
+            self.assertFalse(
+                self.run_comparison("columns1.csv", "columns2.csv", "Difference at row 4, column 2",
+                                    extra_args=["--file-type", "csv", "--csv-columns", "name,value"]),
+                "Failed to compare the selected columns"
+            )
+            self.assertFalse(
+                self.run_comparison("columns1.csv", "columns2.csv", "Found 1 differences",
+                                    extra_args=["--file-type", "csv", "--csv-columns", "id,value", "--csv-key-columns", "id"]),
+                "Failed to compare the selected columns by key"
+            )
+            self.assertFalse(
+                self.run_comparison("columns1.csv", "columns2.csv", "Column 'price' not found",
+                                    extra_args=["--file-type", "csv", "--csv-columns", "price"]),
+                "Failed to report an unknown column"
+            )
+        finally:
+            # Clean up
+            for f in [csv1, csv2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_json_streaming(self):
+        """Test that streamed JSON documents are compared value by value in lockstep"""
+        json1 = os.path.join(self.test_dir, "stream1.json")
+        json2 = os.path.join(self.test_dir, "stream2.json")
+
+        try:
+            # The items array is larger than what is decoded whole, so it is walked item by item
+            items = [{"id": i, "name": f"item {i}", "values": [i, i * 0.5]} for i in range(30000)]
+            with open(json1, "w") as f:
+                json.dump({"meta": {"count": 30000, "unit": "mm"}, "items": items}, f)
+            items[7]["values"][1] = -1
+            items[25000]["name"] = True
+            with open(json2, "w") as f:
+                # Keys reordered, one changed
+                json.dump({"items": items + [{"id": 30000}], "meta": {"unit": "m", "count": 30000}}, f)
+
+            args = ["--file-type", "json", "--json-streaming"]
+            for expected in ["Found 5 differences", "Difference at items[7].values[1]",
+                             "Difference at items[25000].name", "Difference at items[30000]",
+                             "Difference at meta.unit"]:
+                self.assertFalse(
+                    self.run_comparison("stream1.json", "stream2.json", expected, extra_args=args),
+                    "Failed to compare streamed JSON documents"
+                )
+            self.assertTrue(
+                self.run_comparison("stream1.json", "stream1.json", "Files are identical", extra_args=args),
+                "Failed to compare identical streamed JSON documents"
+            )
+        finally:
+            # Clean up
+            for f in [json1, json2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_json_moved_items(self):
+        """Test that list items are matched by subtree hash instead of by position, streamed or not"""
+        json1 = os.path.join(self.test_dir, "moved1.json")
+        json2 = os.path.join(self.test_dir, "moved2.json")
+
+        try:
+            # Padded so that the list is too large to be decoded whole in streaming mode
+            items = [{"id": i, "values": [i, i * 0.5], "pad": "x" * 100000} for i in range(50)]
+            with open(json1, "w") as f:
+                json.dump({"items": items}, f)
+            # One item inserted at the front, one moved to the end and one changed
+            changed = [{"id": -1}] + items[:10] + items[11:] + [items[10]]
+            changed[32] = dict(items[32], values=[32, 0])
+            with open(json2, "w") as f:
+                json.dump({"items": changed}, f)
+
+            for args in [["--file-type", "json"], ["--file-type", "json", "--json-streaming"]]:
+                for expected in ["Found 4 differences", "Difference at items",
+                                 "Moved content at items[10] to items[50]",
+                                 "Difference at items[0]", "Difference at items[32].values[1]"]:
+                    self.assertFalse(
+                        self.run_comparison("moved1.json", "moved2.json", expected, extra_args=args),
+                        "Failed to match moved JSON list items"
+                    )
+        finally:
+            # Clean up
+            for f in [json1, json2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_json_booleans_are_not_numbers(self):
+        """Test that true is not reported equal to 1, nor 1.0 to 1"""
+        json1 = os.path.join(self.test_dir, "types1.json")
+        json2 = os.path.join(self.test_dir, "types2.json")
+
+        try:
+            for doc1, doc2, expected in [([1], [True], "Difference at [0]"),
+                                         ({"a": True}, {"a": 1}, "Difference at a"),
+                                         ({"a": [1.0]}, {"a": [1]}, "Difference at a[0]")]:
+                with open(json1, "w") as f1, open(json2, "w") as f2:
+                    json.dump(doc1, f1)
+                    json.dump(doc2, f2)
+                self.assertFalse(
+                    self.run_comparison("types1.json", "types2.json", expected,
+                                        extra_args=["--file-type", "json"]),
+                    "Failed to tell JSON values of different types apart"
+                )
+        finally:
+            # Clean up
+            for f in [json1, json2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_diff_algorithms_agree(self):
+        """Test that the Myers and difflib engines report the same differences"""
+        outputs = []
+        for algorithm in ["myers", "difflib"]:
+            result = subprocess.run(
+                [sys.executable, self.compare_script, os.path.join("test", "1.bdf"),
+                 os.path.join("test", "2.bdf"), "--file-type", "text", "--output-format", "json",
+                 "--diff-algorithm", algorithm],
+                cwd=self.workspace,
+                capture_output=True,
+                text=True
+            )
+            outputs.append(result.stdout)
+        self.assertIn('"line 91"', outputs[0])
+        self.assertEqual(outputs[0], outputs[1], "Diff engines disagree on BDF differences")
+
+    def test_only_differing_lines_are_decoded(self):
+        """Test that identical files and unchanged lines are compared without decoding"""
+        raw1 = os.path.join(self.test_dir, "raw1.txt")
+        raw2 = os.path.join(self.test_dir, "raw2.txt")
+
+        try:
+            # Line 1 is not valid UTF-8 but is the same in both files
+            with open(raw1, "wb") as f1, open(raw2, "wb") as f2:
+                f1.write(b"\xff\xfe binary label\nvalue = 1\n")
+                f2.write(b"\xff\xfe binary label\nvalue = 1\n")
+
+            self.assertTrue(
+                self.run_comparison("raw1.txt", "raw2.txt", "Files are identical."),
+                "Failed to compare byte-identical files"
+            )
+
+            with open(raw2, "wb") as f2:
+                f2.write(b"\xff\xfe binary label\nvalue = 2\n")
+
+            self.assertFalse(
+                self.run_comparison("raw1.txt", "raw2.txt", "At line 2: expected 'value = 1"),
+                "Failed to report the differing line"
+            )
+        finally:
+            # Clean up
+            for f in [raw1, raw2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_parallel_diff_matches_serial(self):
+        """Test that the anchor-split parallel diff reports the same differences"""
+        big1 = os.path.join(self.test_dir, "big1.txt")
+        big2 = os.path.join(self.test_dir, "big2.txt")
+
+        try:
+            with open(big1, "w") as f1, open(big2, "w") as f2:
+                for i in range(120000):
+                    f1.write(f"record {i}\n")
+                    if i % 9973 == 0:
+                        f2.write(f"edited {i}\n")
+                    elif i % 31337 != 0:
+                        f2.write(f"record {i}\n")
+
+            outputs = []
+            for threads in ["1", "4"]:
+                result = subprocess.run(
+                    [sys.executable, self.compare_script, os.path.join("test", "big1.txt"),
+                     os.path.join("test", "big2.txt"), "--output-format", "json",
+                     "--num-threads", threads],
+                    cwd=self.workspace,
+                    capture_output=True,
+                    text=True
+                )
+                outputs.append(result.stdout)
+            self.assertIn('"record 0\\n"', outputs[0])
+            self.assertEqual(outputs[0], outputs[1], "Parallel diff differs from serial diff")
+        finally:
+            # Clean up
+            for f in [big1, big2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_numeric_tolerance_text(self):
+        """Test that numbers in text lines are compared with tolerance"""
+        num1 = os.path.join(self.test_dir, "num1.bdf")
+        num2 = os.path.join(self.test_dir, "num2.bdf")
+
+        try:
+            with open(num1, "w") as f1, open(num2, "w") as f2:
+                f1.write("GRID,1,,0.9659258262890683,0.0,10.0\nFORCE,1,9,,50.0,1.0,0.0,1.-5\n")
+                f2.write("GRID,1,,0.9659258262890684,0.0,10.0\nFORCE,1,9,,50.0,1.0,0.0,1.0E-05\n")
+
+            self.assertFalse(
+                self.run_comparison("num1.bdf", "num2.bdf", "Files are different",
+                                    extra_args=["--file-type", "text"]),
+                "Failed to detect textual differences without numeric tolerance"
+            )
+            self.assertTrue(
+                self.run_comparison("num1.bdf", "num2.bdf", "Files are identical.",
+                                    extra_args=["--file-type", "text", "--text-numeric"]),
+                "Failed to accept values within tolerance"
+            )
+
+            with open(num2, "w") as f2:
+                f2.write("GRID,1,,0.9659258262890684,0.0,10.0\nFORCE,1,9,,70.0,1.0,0.0,1.0E-05\n")
+
+            self.assertFalse(
+                self.run_comparison("num1.bdf", "num2.bdf", "At line 2: expected 'FORCE,1,9,,50.0",
+                                    extra_args=["--file-type", "text", "--text-numeric", "--text-rtol", "1e-3"]),
+                "Failed to report values outside tolerance"
+            )
+        finally:
+            # Clean up
+            for f in [num1, num2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_bdf_cards_matched_by_id(self):
+        """Test that BDF cards are matched by type and ID across formats and order"""
+        deck1 = os.path.join(self.test_dir, "deck1.bdf")
+        deck2 = os.path.join(self.test_dir, "deck2.bdf")
+
+        try:
+            with open(deck1, "w") as f1, open(deck2, "w") as f2:
+                f1.write("BEGIN BULK\n"
+                         "GRID    1               0.      0.      10.\n"
+                         "GRID*                  2                             1.0             2.0\n"
+                         "*                    3.0\n"
+                         "CQUAD4  1       1       1       2       3       4\n"
+                         "ENDDATA\n")
+                f2.write("BEGIN BULK\n"
+                         "$ reordered and in free-field format\n"
+                         "CQUAD4,1,1,1,2,3,4\n"
+                         "GRID,2,,1.0,2.0,3.000001\n"
+                         "GRID,1,,0.0,0.0,10.0\n"
+                         "ENDDATA\n")
+
+            self.assertTrue(
+                self.run_comparison("deck1.bdf", "deck2.bdf", "Files are identical."),
+                "Failed to match reordered and reformatted cards"
+            )
+            self.assertFalse(
+                self.run_comparison("deck1.bdf", "deck2.bdf", '"GRID 2, field 6 (line 3)"',
+                                    extra_args=["--bdf-rtol", "0", "--bdf-atol", "0",
+                                                "--output-format", "json"]),
+                "Failed to report the field outside tolerance"
+            )
+
+            with open(deck2, "w") as f2:
+                f2.write("BEGIN BULK\n"
+                         "CQUAD4,1,1,1,2,3,4\n"
+                         "GRID,2,,1.0,2.0,3.0\n"
+                         "GRID,1,,0.0,0.0,10.0\n"
+                         "GRID,3,,0.0,0.0,0.0\n"
+                         "ENDDATA\n")
+
+            self.assertFalse(
+                self.run_comparison("deck1.bdf", "deck2.bdf", '"extra_card"',
+                                    extra_args=["--output-format", "json"]),
+                "Failed to report the extra card"
+            )
+        finally:
+            # Clean up
+            for f in [deck1, deck2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_bdf_long_free_field_and_tab_cards(self):
+        """Test that free-field lines longer than one card and tab-separated lines are parsed in full"""
+        deck1 = os.path.join(self.test_dir, "deck1.bdf")
+        deck2 = os.path.join(self.test_dir, "deck2.bdf")
+
+        try:
+            with open(deck1, "w") as f1, open(deck2, "w") as f2:
+                f1.write("BEGIN BULK\n"
+                         "CTETRA,1,1,1,2,3,4,5,6,7,8,9,10\n"
+                         "GRID*\t2\t\t1.0\t2.0\n"
+                         "*\t3.0\n"
+                         "ENDDATA\n")
+                f2.write("BEGIN BULK\n"
+                         "CTETRA  1       1       1       2       3       4       5       6\n"
+                         "        7       8       9       10\n"
+                         "GRID*,2,,1.0,2.0,+G\n"
+                         "*G,3.0\n"
+                         "ENDDATA\n")
+
+            self.assertTrue(
+                self.run_comparison("deck1.bdf", "deck2.bdf", "Files are identical."),
+                "Failed to parse long free-field and tab-separated cards"
+            )
+
+            with open(deck2, "w") as f2:
+                f2.write("BEGIN BULK\n"
+                         "CTETRA,1,1,1,2,3,4,5,6,7,99,98,97\n"
+                         "GRID*\t2\t\t1.0\t2.0\n"
+                         "*\t3.5\n"
+                         "ENDDATA\n")
+
+            for expected in ["Found 4 differences", "Difference at CTETRA 1, field 12",
+                             "Difference at GRID 2, field 6"]:
+                self.assertFalse(
+                    self.run_comparison("deck1.bdf", "deck2.bdf", expected),
+                    "Failed to compare the fields past the first card"
+                )
+        finally:
+            # Clean up
+            for f in [deck1, deck2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
+    def test_f06_result_tables(self):
+        """Test that F06 result tables are compared by value, ignoring page headers"""
+        out1 = os.path.join(self.test_dir, "out1.f06")
+        out2 = os.path.join(self.test_dir, "out2.f06")
+
+        def write_f06(path, date, t1):
+            with open(path, "w") as f:
+                f.write(f"1    MSC NASTRAN JOB                      {date}  MSC Nastran  PAGE     5\n"
+                        "0                                                          SUBCASE 1\n"
+                        "                         D I S P L A C E M E N T   V E C T O R\n"
+                        "      POINT ID.   TYPE          T1             T2             T3\n"
+                        "             1      G      0.000000E+00   0.000000E+00   0.000000E+00\n"
+                        f"             2      G      {t1}   2.000000E-01   0.000000E+00\n")
+
+        try:
+            write_f06(out1, "JUNE  19, 2020", "1.000000E-01")
+            write_f06(out2, "MAY    1, 2021", "1.000001E-01")
+
+            self.assertTrue(
+                self.run_comparison("out1.f06", "out2.f06", "Files are identical."),
+                "Failed to ignore page headers and values within tolerance"
+            )
+            self.assertFalse(
+                self.run_comparison("out1.f06", "out2.f06",
+                                    "At SUBCASE 1, DISPLACEMENT VECTOR, ID 2, column 1: expected '0.1', got '0.1000001'",
+                                    extra_args=["--f06-rtol", "1e-9"]),
+                "Failed to report the value outside tolerance"
+            )
+        finally:
+            # Clean up
+            for f in [out1, out2]:
+                if os.path.exists(f):
+                    os.remove(f)
+
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file